@@ -10,6 +10,18 @@ def _ensure_registration():
     Ensure that model type resolvers and validation tools are registered with Odin.
 
     This provides support for Django Models and use of Django Validators in Odin resources.
+
+    Registration is not performed when baldr is imported (this requires the Django ORM and would be
+    paid by every process that only uses ``baldr.resources``). It is performed when Django imports
+    the models of installed apps (add ``baldr`` to ``INSTALLED_APPS`` before any apps that define
+    mappings) or when ``baldr.models`` is imported.
     """
     from . import models  # NoQA
-_ensure_registration()
+
+
+def preload(urlconf=None, freeze=None):
+    """
+    Warm up all API's in the master process of a pre-fork server. See ``baldr.preloading``.
+    """
+    from .preloading import preload
+    return preload(urlconf, freeze)
@@ -4,18 +4,62 @@ from django.conf import settings
 from django.conf.urls import url, include
 from django.core.exceptions import PermissionDenied
 from django.http import HttpResponse, Http404
+from django.http.response import HttpResponseBase
 from django.utils.functional import cached_property
 from django.views.decorators.csrf import csrf_exempt
+import importlib
+import re
 import sys
+import timeit
+import weakref
 from odin.codecs import json_codec
 from odin.compatibility import deprecated
 from odin.exceptions import ValidationError, CodecDecodeError
-from baldr import content_type_resolvers
+from baldr import canned_errors, content_type_resolvers, decoders, encoders, metrics, ndjson_codec
+from baldr.identity_map import IdentityMap
+from baldr.queries import QueryBudget
 from baldr.exceptions import ImmediateErrorHttpResponse, ImmediateHttpResponse
 from baldr.resources import Error, Listing
 
 
-CODECS = {json_codec.CONTENT_TYPE: json_codec}
+class CodecRegistry(dict):
+    """
+    Codecs keyed by content type.
+
+    Codecs with expensive dependencies (eg pyarrow) are registered by module name and only imported
+    the first time their content type is negotiated; a codec that cannot be imported is unavailable.
+    """
+    def __init__(self, codecs=None, lazy_codecs=None):
+        super(CodecRegistry, self).__init__(codecs or {})
+        self.lazy_codecs = dict(lazy_codecs or {})
+
+    def __missing__(self, content_type):
+        module_name = self.lazy_codecs.pop(content_type, None)
+        if module_name is None:
+            raise KeyError(content_type)
+        try:
+            codec = importlib.import_module(module_name)
+        except ImportError:
+            raise KeyError(content_type)
+        self[content_type] = codec
+        return codec
+
+    def load(self):
+        """
+        Import all lazily registered codecs (eg before forking workers).
+        """
+        for content_type in list(self.lazy_codecs):
+            try:
+                self[content_type]
+            except KeyError:
+                pass
+        return self
+
+
+CODECS = CodecRegistry(
+    {json_codec.CONTENT_TYPE: json_codec, ndjson_codec.CONTENT_TYPE: ndjson_codec},
+    {'application/vnd.apache.arrow.stream': 'baldr.arrow_codec'}
+)
 # Attempt to load other codecs that have dependencies
 try:
     from odin.codecs import msgpack_codec
@@ -26,6 +70,12 @@ else:
 
 logger = logging.getLogger('baldr.request')
 
+# Resource API's and API collections that have been created; used by ``baldr.preload``.
+resource_apis = weakref.WeakSet()
+api_collections = weakref.WeakSet()
+
+NOT_ACCEPTABLE_CONTENT = b"Content cannot be returned in the format requested."
+
 
 class ResourceApiCommon(object):
     # The resource this API is modelled on.
@@ -50,9 +100,68 @@ class ResourceApiCommon(object):
 
     # Codecs that are supported for Encoding/Decoding resources.
     registered_codecs = CODECS
+    # Encode responses using compiled encoders (for codecs that support them). See ``baldr.encoders``.
+    compiled_encoders = True
+    # Decode request bodies using compiled decoders (for codecs that support them). See ``baldr.decoders``.
+    compiled_decoders = True
     url_prefix = r''
 
+    # Registry that request metrics are recorded in; set to ``None`` to disable metrics.
+    metrics = metrics.registry
+
+    # Optional ``baldr.profiling.RequestProfiler`` used to profile individual requests.
+    profiler = None
+
+    # Maximum number of database queries a request may execute, this can be overridden for a route
+    # using the ``max_queries`` route option. See ``baldr.queries``.
+    max_queries = None
+    # Action applied when the query budget is exceeded; ``log``, ``warn`` or ``raise``. Default is
+    # ``settings.BALDR_QUERY_BUDGET_ACTION``.
+    query_budget_action = None
+    # Number of times an identical query can be repeated within a request before it is reported as
+    # a likely N+1 query pattern.
+    n_plus_one_threshold = 5
+
+    # Compress responses using a coding negotiated from the ``Accept-Encoding`` header, this can be
+    # overridden for a route using the ``compress`` route option. Default is
+    # ``settings.BALDR_COMPRESS_RESPONSES``. See ``baldr.compression``.
+    compress_responses = None
+    # Responses smaller than this (in bytes) are not compressed; can be overridden for a route using
+    # the ``compress_min_size`` route option.
+    compress_min_size = 1024
+    # Compression level; ``None`` uses the default level of the coding.
+    compress_level = None
+
+    # Maximum number of requests handled concurrently by this API, either a number or a
+    # ``ConcurrencyLimiter``; routes can be limited using the ``max_concurrency`` route option.
+    # See ``baldr.concurrency``.
+    max_concurrency = None
+    # Number of requests that can wait for a concurrency limit before requests are shed.
+    concurrency_queue_size = 8
+    # Maximum time (in seconds) a request will wait for a concurrency limit.
+    concurrency_timeout = 1.0
+    # Value of the ``Retry-After`` header of responses to shed requests.
+    concurrency_retry_after = 1
+
+    # Coalesce identical concurrent GET requests so only one is handled; either ``True`` (coalesce
+    # requests within this process) or a coalescing backend. Can be overridden for a route using the
+    # ``coalesce`` route option. See ``baldr.coalescing``.
+    coalesce_requests = None
+    # Request headers (in ``META`` format) that must match for requests to be coalesced.
+    coalesce_vary_headers = ('HTTP_AUTHORIZATION', 'HTTP_COOKIE', 'HTTP_ACCEPT_ENCODING')
+    # Maximum time (in seconds) a coalesced request waits for a response.
+    coalesce_timeout = 5.0
+
+    # Registry of pre-encoded client error responses; set to ``None`` to encode errors on every
+    # request. See ``baldr.canned_errors``.
+    canned_errors = canned_errors.registry
+
+    # Attach an identity map to requests so model instances are only loaded once per request.
+    # See ``baldr.identity_map``.
+    use_identity_map = True
+
     def __init__(self, api_name=None):
+        resource_apis.add(self)
         if api_name:
             self.api_name = api_name
         elif not hasattr(self, 'api_name'):
@@ -102,6 +211,32 @@ class ResourceApiCommon(object):
             if content_type:
                 return content_type
 
+    @staticmethod
+    def get_return_preference(request):
+        """
+        Resolve the ``return`` preference of a ``Prefer`` header (RFC 7240).
+
+        :returns: ``'minimal'``, ``'representation'`` or ``None`` if no preference is supplied.
+
+        """
+        for preference in request.META.get('HTTP_PREFER', '').split(','):
+            name, _, value = preference.split(';')[0].partition('=')
+            if name.strip().lower() == 'return':
+                value = value.strip().strip('"').lower()
+                if value in ('minimal', 'representation'):
+                    return value
+
+    def use_return_preference(self, request, preference):
+        """
+        Determine if the client prefers a response style (``'minimal'`` or ``'representation'``),
+        if so the preference is recorded as applied and a ``Preference-Applied`` header is included
+        in the response.
+        """
+        if self.get_return_preference(request) == preference:
+            request.preference_applied = 'return=%s' % preference
+            return True
+        return False
+
     @staticmethod
     def handle_500(request, exception):
         """
@@ -139,8 +274,26 @@ class ResourceApiCommon(object):
         """
         Helper method that ensures that decodes any body content into a string object (this is needed by the json
         module for example).
+
+        Bodies sent with a ``Content-Encoding`` are decompressed, the decompressed size is limited to
+        ``settings.BALDR_MAX_DECOMPRESSION_RATIO`` times the compressed size.
         """
         body = request.body
+        content_encoding = request.META.get('HTTP_CONTENT_ENCODING')
+        if content_encoding and body:
+            from baldr import compression
+            try:
+                body = compression.decompress(
+                    content_encoding, body,
+                    getattr(settings, 'BALDR_MAX_DECOMPRESSION_RATIO', 100),
+                    getattr(settings, 'BALDR_MAX_DECOMPRESSED_SIZE', None)
+                )
+            except KeyError:
+                raise ImmediateErrorHttpResponse(415, 41500, "Unsupported content encoding.", content_encoding)
+            except compression.DecompressionLimitExceeded as dle:
+                raise ImmediateErrorHttpResponse(413, 41300, "Decompressed request body is too large.", str(dle))
+            except compression.DecompressionError as de:
+                raise ImmediateErrorHttpResponse(400, 40095, "Unable to decompress request body.", str(de))
         if isinstance(body, bytes):
             return body.decode('UTF8')
         return body
@@ -157,7 +310,10 @@ class ResourceApiCommon(object):
             raise ImmediateErrorHttpResponse(400, 40099, "Unable to decode request body.", str(ude))
 
         try:
-            resource = request.request_codec.loads(body, resource=resource, full_clean=False)
+            if self.compiled_decoders:
+                resource = decoders.loads(request.request_codec, body, resource, full_clean=False)
+            else:
+                resource = request.request_codec.loads(body, resource=resource, full_clean=False)
         except ValueError as ve:
             raise ImmediateErrorHttpResponse(400, 40098, "Unable to load resource.", str(ve))
         except CodecDecodeError as cde:
@@ -172,78 +328,217 @@ class ResourceApiCommon(object):
     def dispatch_to_view(self, view, request, *args, **kwargs):
         raise NotImplementedError()
 
+    def get_route_options(self, view, request):
+        """
+        Options defined for the route that handles a request.
+        """
+        return {}
+
+    def get_query_budget(self, view, request):
+        """
+        Get a ``QueryBudget`` for the request; or ``None`` if queries are not being counted.
+        """
+        max_queries = self.get_route_options(view, request).get('max_queries', self.max_queries)
+        if max_queries is None and not getattr(settings, 'BALDR_COUNT_QUERIES', False):
+            return
+
+        name = "%s %s %s" % (request.method, self.api_name, view)
+        return QueryBudget(name, max_queries, self.query_budget_action, self.n_plus_one_threshold)
+
+    def create_response(self, request, resource, status=200, headers=None):
+        """
+        Encode a resource into an ``HttpResponse`` using the response codec of the request.
+        """
+        response_codec = request.response_codec
+        if getattr(request, 'embed_resource', False):
+            # The resource is embedded in an enclosing response (eg a batch) that encodes it.
+            response = HttpResponse(status=status, content_type=response_codec.CONTENT_TYPE)
+            response.resource = resource
+        elif (isinstance(resource, Error) and self.canned_errors is not None and
+                (resource.status < 500 or resource.status == 501)):
+            # Client errors and 501 (a fixed message for methods that have not been implemented) are
+            # canned; other server errors can include details of the exception so are always encoded.
+            return self.canned_errors.resource_response(response_codec, resource, status, headers)
+        else:
+            if self.compiled_encoders:
+                content = encoders.dumps(response_codec, resource)
+            else:
+                content = response_codec.dumps(resource)
+            response = HttpResponse(
+                content,
+                content_type=response_codec.CONTENT_TYPE,
+                status=status
+            )
+        if isinstance(resource, Error):
+            response.sub_status = resource.sub_status
+        for key, value in (headers or {}).items():
+            response[key] = value
+        return response
+
+    def error_response(self, request, status, sub_status, message, developer_message=None, meta=None,
+                       headers=None):
+        """
+        Generate an error response; expected client errors can be returned from a view using this
+        method rather than raising an ``ImmediateErrorHttpResponse``.
+        """
+        if self.canned_errors is None:
+            return self.create_response(request, Error(status, sub_status, message, developer_message, meta),
+                                        status, headers)
+        return self.canned_errors.response(request.response_codec, status, sub_status, message,
+                                           developer_message, meta, headers)
+
     def wrap_view(self, view):
         """
         This method provides the main entry point for URL mappings in the ``base_urls`` method.
         """
         @csrf_exempt
         def wrapper(request, *args, **kwargs):
-            # Resolve content type used to encode/decode request/response content.
-            response_type = self.resolve_response_type(request)
-            request_type = self.resolve_request_type(request)
-            try:
-                request.request_codec = self.registered_codecs[request_type]
-                request.response_codec = response_codec = self.registered_codecs[response_type]
-            except KeyError:
-                # This is just a plain HTTP response, we can't provide a rich response when the content type is unknown
-                return HttpResponse(content="Content cannot be returned in the format requested.", status=406)
+            if self.use_identity_map and getattr(request, 'identity_map', None) is None:
+                request.identity_map = IdentityMap()
+
+            if self.profiler is not None:
+                # Profiled requests are excluded from metrics as profiling distorts timings.
+                requested = self.profiler.should_profile(request)
+                if requested is not None:
+                    return self.profiler.profile(request, "%s-%s" % (self.api_name, view), requested,
+                                                 self.get_response, view, request, *args, **kwargs)
+
+            query_budget = self.get_query_budget(view, request)
+            if query_budget is None:
+                return self.observe_view(view, request, *args, **kwargs)
+            with query_budget:
+                return self.observe_view(view, request, *args, **kwargs)
+        return wrapper
 
-            try:
-                result = self.dispatch_to_view(view, request, *args, **kwargs)
-            except Http404 as e:
-                # Item is not found.
-                status = 404
-                resource = Error(status, 40400, str(e))
-            except ImmediateHttpResponse as e:
-                # An exception used to return a response immediately, skipping any further processing.
-                response = HttpResponse(
-                    response_codec.dumps(e.resource),
-                    content_type=response_codec.CONTENT_TYPE,
-                    status=e.status
-                )
-                for key, value in (e.headers or {}).items():
-                    response[key] = value
-                return response
-            except ValidationError as e:
-                # Validation of a resource has failed.
-                status = 400
-                if hasattr(e, 'message_dict'):
-                    resource = Error(status, 40000, "Fields failed validation.", meta=e.message_dict)
-                else:
-                    resource = Error(status, 40000, str(e))
-            except PermissionDenied as e:
-                status = 403
-                resource = Error(status, 40300, "Permission denied", str(e))
-            except NotImplementedError:
-                # A mixin method has not been implemented, as defining a mixing is explicit this is considered a server
-                # error that should be addressed.
-                status = 501
-                resource = Error(status, 50100, "This method has not been implemented.")
-            except Exception as e:
-                # Special case when a request raises a 500 error. If we are in debug mode and a default is used (ie
-                # request does not explicitly specify a content type) fall back to the Django default exception page.
-                if settings.DEBUG and getattr(response_type, 'is_default', False):
-                    raise
-                # Catch any other exceptions and pass them to the 500 handler for evaluation.
-                resource = self.handle_500(request, e)
-                status = resource.status
-            else:
-                if isinstance(result, tuple) and len(result) == 2:
-                    resource, status = result
-                else:
-                    resource = result
-                    status = 204 if result is None else 200  # Return 204 (No Content) if result is None.
-            if resource is None:
-                return HttpResponse(status=status)
-            elif isinstance(resource, HttpResponse):
-                return resource
+    def observe_view(self, view, request, *args, **kwargs):
+        """
+        Handle a request to a view recording metrics.
+        """
+        if self.metrics is None:
+            return self.get_response(view, request, *args, **kwargs)
+
+        started = timeit.default_timer()
+        response = self.get_response(view, request, *args, **kwargs)
+        self.metrics.observe_response(self.api_name, view, request, response, timeit.default_timer() - started)
+        return response
+
+    def get_response(self, view, request, *args, **kwargs):
+        """
+        Handle a request to a view (coalescing identical requests if enabled), apply the
+        ``process_response`` hook and any content-coding to the response.
+        """
+        options = self.get_route_options(view, request)
+
+        def respond():
+            response = self.handle_view(view, request, *args, **kwargs)
+            # Allow for a process_response hook, the response of which is returned
+            if hasattr(self, 'process_response'):
+                response = self.process_response(request, response)
+            return self.compress_response(request, response, options)
+
+        coalesce = options.get('coalesce', self.coalesce_requests)
+        # Embedded resources are not part of the response content so cannot be shared
+        if coalesce and request.method in ('GET', 'HEAD') and not getattr(request, 'embed_resource', False):
+            from baldr import coalescing
+            backend = coalescing.default_backend if coalesce is True else coalesce
+            key = coalescing.request_key(request, self.api_name, view, kwargs, self.resolve_response_type(request),
+                                         self.coalesce_vary_headers)
+            return backend.run(key, respond, self.coalesce_timeout)
+
+        return respond()
+
+    def compress_response(self, request, response, options):
+        """
+        Apply content-coding to a response if compression is enabled.
+        """
+        compress = options.get('compress', self.compress_responses)
+        if compress is None:
+            compress = getattr(settings, 'BALDR_COMPRESS_RESPONSES', False)
+        if compress:
+            from baldr import compression
+            response = compression.compress_response(
+                request, response, options.get('compress_min_size', self.compress_min_size), self.compress_level)
+        return response
+
+    def handle_view(self, view, request, *args, **kwargs):
+        """
+        Handle a request to a view; resolving codecs, dispatching the request and encoding the response.
+        """
+        # Resolve content type used to encode/decode request/response content.
+        response_type = self.resolve_response_type(request)
+        request_type = self.resolve_request_type(request)
+        try:
+            request.request_codec = self.registered_codecs[request_type]
+            request.response_codec = self.registered_codecs[response_type]
+        except KeyError:
+            # This is just a plain HTTP response, we can't provide a rich response when the content type is unknown
+            return HttpResponse(content=NOT_ACCEPTABLE_CONTENT, status=406)
+
+        resource, status, headers = self.dispatch_resource(view, request, *args, **kwargs)
+        if resource is None:
+            response = HttpResponse(status=status)
+            for key, value in (headers or {}).items():
+                response[key] = value
+        elif isinstance(resource, HttpResponseBase):
+            response = resource
+        else:
+            response = self.create_response(request, resource, status, headers)
+
+        preference_applied = getattr(request, 'preference_applied', None)
+        if preference_applied:
+            response['Preference-Applied'] = preference_applied
+        return response
+
+    def dispatch_resource(self, view, request, *args, **kwargs):
+        """
+        Dispatch a request to a view and convert any errors into resources.
+
+        The request codecs must already be resolved.
+
+        A view can return a resource, a tuple of ``(resource, status)`` or a tuple of
+        ``(resource, status, headers)``.
+
+        :returns: Tuple of ``(resource, status, headers)``; the resource can also be an ``HttpResponse``
+            or ``None`` if there is no content.
+
+        """
+        try:
+            result = self.dispatch_to_view(view, request, *args, **kwargs)
+        except Http404 as e:
+            # Item is not found.
+            return Error(404, 40400, str(e)), 404, None
+        except ImmediateHttpResponse as e:
+            # An exception used to return a response immediately, skipping any further processing.
+            return e.resource, e.status, e.headers
+        except ValidationError as e:
+            # Validation of a resource has failed.
+            if hasattr(e, 'message_dict'):
+                return Error(400, 40000, "Fields failed validation.", meta=e.message_dict), 400, None
             else:
-                return HttpResponse(
-                    response_codec.dumps(resource),
-                    content_type=response_codec.CONTENT_TYPE,
-                    status=status
-                )
-        return wrapper
+                return Error(400, 40000, str(e)), 400, None
+        except PermissionDenied as e:
+            return Error(403, 40300, "Permission denied", str(e)), 403, None
+        except NotImplementedError:
+            # A mixin method has not been implemented, as defining a mixing is explicit this is considered a server
+            # error that should be addressed.
+            return Error(501, 50100, "This method has not been implemented."), 501, None
+        except Exception as e:
+            # Special case when a request raises a 500 error. If we are in debug mode and a default is used (ie
+            # request does not explicitly specify a content type) fall back to the Django default exception page.
+            if settings.DEBUG and getattr(self.resolve_response_type(request), 'is_default', False):
+                raise
+            # Catch any other exceptions and pass them to the 500 handler for evaluation.
+            resource = self.handle_500(request, e)
+            return resource, resource.status, None
+
+        if isinstance(result, tuple) and len(result) == 3:
+            return result
+        elif isinstance(result, tuple) and len(result) == 2:
+            resource, status = result
+        else:
+            resource = result
+            status = 204 if result is None else 200  # Return 204 (No Content) if result is None.
+        return resource, status, None
 
 
 @deprecated(message="Will be removed in 0.9 in favour of `baldr.api2.ResourceApi`.")
@@ -484,6 +779,95 @@ class DeleteMixin(ResourceApi):
         raise NotImplementedError
 
 
+class CompiledDispatcher(object):
+    """
+    Dispatches requests to resource API's using prebuilt lookup tables rather than URL regexes.
+
+    Requests are resolved by looking up the API name, then matching the resource id and action
+    name against the API's route table so the cost of resolving a URL does not depend on the
+    number of API's. Action names are matched literally and resource ids cannot contain a ``/``.
+
+    :param resource_apis: Resource API's that provide ``compiled_routes``.
+
+    """
+    def __init__(self, resource_apis):
+        self.apis = {}
+        prefix_depths = set()
+        for resource_api in resource_apis:
+            prefix = (resource_api.url_prefix + resource_api.api_name.lower()).strip('/')
+            prefix_depths.add(prefix.count('/') + 1)
+            routes = resource_api.compiled_routes()
+            views = dict((route_key, resource_api.wrap_view(route_key))
+                         for path_routes in routes.values() for route_key in path_routes.values())
+            self.apis[prefix] = (
+                resource_api,
+                routes['collection'],
+                routes['resource'],
+                re.compile(r'^(?:%s)$' % resource_api.resource_id_regex).match,
+                views
+            )
+        self.prefix_depths = sorted(prefix_depths)
+
+    def _match(self, path):
+        if path.endswith('/'):
+            path = path[:-1]
+        segments = path.split('/')
+
+        for depth in self.prefix_depths:
+            api = self.apis.get('/'.join(segments[:depth]))
+            if api is None:
+                continue
+
+            _, collection_routes, resource_routes, match_id, _ = api
+            remaining = segments[depth:]
+            if not remaining:
+                route_key = collection_routes.get('')
+                if route_key:
+                    return api, route_key, {}
+            elif len(remaining) == 1:
+                route_key = collection_routes.get(remaining[0])
+                if route_key:
+                    return api, route_key, {}
+                route_key = resource_routes.get('')
+                if route_key and match_id(remaining[0]):
+                    return api, route_key, {'resource_id': remaining[0]}
+            elif len(remaining) == 2:
+                route_key = resource_routes.get(remaining[1])
+                if route_key and match_id(remaining[0]):
+                    return api, route_key, {'resource_id': remaining[0]}
+
+    def resolve_route(self, path):
+        """
+        Resolve a path (relative to the collection) to a route of a resource API.
+
+        :returns: Tuple of ``(resource_api, route_key, kwargs)``; or ``None`` if the path is not matched.
+
+        """
+        matched = self._match(path)
+        if matched is not None:
+            api, route_key, kwargs = matched
+            return api[0], route_key, kwargs
+
+    def resolve(self, path):
+        """
+        Resolve a path (relative to the collection) to a view.
+
+        :returns: Tuple of ``(view, kwargs)``; or ``None`` if the path is not matched.
+
+        """
+        matched = self._match(path)
+        if matched is not None:
+            api, route_key, kwargs = matched
+            return api[4][route_key], kwargs
+
+    def __call__(self, request, path):
+        resolved = self.resolve(path)
+        if resolved is None:
+            raise Http404("No API matches the given path.")
+        view, kwargs = resolved
+        return view(request, **kwargs)
+
+
 class ApiCollection(object):
     """
     Collection of several resource API's.
@@ -498,16 +882,43 @@ class ApiCollection(object):
             )
         ).patterns()
 
+    Supplying ``compiled=True`` registers a single URL pattern for the collection and dispatches
+    requests to ``api2`` resource API's using a ``CompiledDispatcher``; this is much faster for
+    collections with a large number of API's. API's that do not support compiled routes
+    continue to use their URL patterns.
+
+    Supplying ``batch=True`` adds a ``_batch`` endpoint that accepts several requests to ``api2``
+    resource API's in a single HTTP request. See ``baldr.batch``.
+
     """
     def __init__(self, *resource_apis, **kwargs):
         self.api_name = kwargs.pop('api_name', 'api')
+        self.compiled = kwargs.pop('compiled', False)
+        self.batch = kwargs.pop('batch', False)
+        self.batch_max_requests = kwargs.pop('batch_max_requests', 50)
+        self.batch_workers = kwargs.pop('batch_workers', 4)
         self.resource_apis = resource_apis
+        api_collections.add(self)
+
+    @cached_property
+    def dispatcher(self):
+        return CompiledDispatcher(a for a in self.resource_apis if hasattr(a, 'compiled_routes'))
+
+    @cached_property
+    def batch_handler(self):
+        from baldr.batch import BatchHandler
+        return BatchHandler(self.dispatcher, max_requests=self.batch_max_requests, workers=self.batch_workers)
 
     @cached_property
     def urls(self):
         urls = []
+        if self.batch:
+            urls.append(url(r'^_batch/?$', csrf_exempt(self.batch_handler)))
         for resource_api in self.resource_apis:
-            urls.extend(resource_api.urls)
+            if not (self.compiled and hasattr(resource_api, 'compiled_routes')):
+                urls.extend(resource_api.urls)
+        if self.compiled:
+            urls.append(url(r'^(?P<path>.*)$', csrf_exempt(self.dispatcher)))
         return urls
 
     def include(self, namespace=None):
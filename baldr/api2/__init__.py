@@ -1,12 +1,13 @@
 from __future__ import absolute_import
 from collections import OrderedDict
 import six
+import timeit
 from django.http import HttpResponse
 
 from .constants import *  # noqa
 from .route_decorators import *  # noqa
 from ..api import ResourceApiCommon
-from ..exceptions import ImmediateErrorHttpResponse
+from ..concurrency import make_limiter
 
 
 class ResourceApiBase(type):
@@ -58,41 +59,87 @@ class ResourceApi(ResourceApiCommon):
     # Table containing lookup information to simplify dispatch of incoming
     # requests to the appropriate views
     route_table = None
+    # Table of route options by route key and method
+    route_options = None
+    # Table of concurrency limiters by route key and method
+    route_limiters = None
+    # Concurrency limiter applied to all routes
+    concurrency_limiter = None
 
     # Respond to the options method.
     respond_to_options = True
 
-    def base_urls(self):
-        url_table = OrderedDict()
+    def build_route_table(self):
+        """
+        Build the route (and route option) tables for this API.
+
+        :returns: Ordered dict of ``(path_type, action_name)`` tuples keyed by route key.
+
+        """
+        route_paths = OrderedDict()
         route_table = {}
+        route_options = {}
+        route_limiters = {}
         for route_ in self.routes:
             route_number, path_type, methods, action_name, view = route_
             route_key = "%s-%s" % (path_type, action_name) if action_name else path_type
-
-            # Populate url_table
-            if route_key not in url_table:
-                if path_type == PATH_TYPE_COLLECTION:
-                    regex = action_name or r''
-                else:
-                    if action_name:
-                        regex = r'(?P<resource_id>%s)/%s' % (self.resource_id_regex, action_name)
-                    else:
-                        regex = r'(?P<resource_id>%s)' % self.resource_id_regex
-
-                url_table[route_key] = self.url(regex, self.wrap_view(route_key))
+            route_paths.setdefault(route_key, (path_type, action_name))
 
             # Populate route table
             method_map = route_table.setdefault(route_key, {})
+            options_map = route_options.setdefault(route_key, {})
+            limiter_map = route_limiters.setdefault(route_key, {})
+            options = getattr(getattr(self, view), 'route_options', {})
+            limiter = make_limiter(options.get('max_concurrency'), self.concurrency_queue_size,
+                                   self.concurrency_timeout)
             for method in methods:
                 method_map[method] = view
+                options_map[method] = options
+                if limiter:
+                    limiter_map[method] = limiter
 
             # Add options
             if self.respond_to_options:
                 method_map.setdefault(constants.OPTIONS, 'options_response')
 
-        # Store the route table at the same time
-        self.route_table = dict(route_table)
-        return list(url_table.values())
+        self.route_table = route_table
+        self.route_options = route_options
+        self.route_limiters = route_limiters
+        self.concurrency_limiter = make_limiter(self.max_concurrency, self.concurrency_queue_size,
+                                                self.concurrency_timeout)
+        return route_paths
+
+    def base_urls(self):
+        url_table = []
+        for route_key, (path_type, action_name) in self.build_route_table().items():
+            if path_type == PATH_TYPE_COLLECTION:
+                regex = action_name or r''
+            else:
+                if action_name:
+                    regex = r'(?P<resource_id>%s)/%s' % (self.resource_id_regex, action_name)
+                else:
+                    regex = r'(?P<resource_id>%s)' % self.resource_id_regex
+
+            url_table.append(self.url(regex, self.wrap_view(route_key)))
+        return url_table
+
+    def compiled_routes(self):
+        """
+        Route keys for this API keyed by path type and then action name (an empty string if there is
+        no action). Used by a compiled ``ApiCollection`` to dispatch requests without URL regexes.
+        """
+        table = {PATH_TYPE_COLLECTION: {}, PATH_TYPE_RESOURCE: {}}
+        for route_key, (path_type, action_name) in self.build_route_table().items():
+            if path_type != PATH_TYPE_COLLECTION:
+                path_type = PATH_TYPE_RESOURCE
+            table[path_type][action_name or ''] = route_key
+        return table
+
+    def get_route_options(self, route_key, request):
+        try:
+            return self.route_options[route_key].get(request.method, {})
+        except (KeyError, TypeError):
+            return {}
 
     def dispatch_to_view(self, route_key, request, *args, **kwargs):
         """
@@ -103,11 +150,40 @@ class ResourceApi(ResourceApiCommon):
             request_method = routes[request.method]
         except KeyError:
             allow = ','.join(routes.keys())
-            raise ImmediateErrorHttpResponse(405, 40500, "Method not allowed", headers={'Allow': allow},
-                                             meta={'allow': allow})
+            return self.error_response(request, 405, 40500, "Method not allowed", headers={'Allow': allow},
+                                       meta={'allow': allow})
         else:
             method = getattr(self, request_method, None)
 
+        # The route limiter is acquired first so requests queued on a saturated route do not hold
+        # a slot of the API limiter (and starve other routes) while they wait.
+        limiters = [limiter for limiter in (
+            self.route_limiters[route_key].get(request.method), self.concurrency_limiter
+        ) if limiter]
+        if not limiters:
+            return self.call_view(method, route_key, request, **kwargs)
+
+        acquired = []
+        for limiter in limiters:
+            if not limiter.acquire():
+                for acquired_limiter in reversed(acquired):
+                    acquired_limiter.release()
+                return self.error_response(request, 503, 50300, "Service is busy, try again later.",
+                                           headers={'Retry-After': str(self.concurrency_retry_after)})
+            acquired.append(limiter)
+
+        started = timeit.default_timer()
+        try:
+            return self.call_view(method, route_key, request, **kwargs)
+        finally:
+            duration = timeit.default_timer() - started
+            for limiter in reversed(acquired):
+                limiter.release(duration)
+
+    def call_view(self, method, route_key, request, **kwargs):
+        """
+        Call a view method applying authorisation and dispatch hooks.
+        """
         # Authorisation hook
         if hasattr(self, 'handle_authorisation'):
             self.handle_authorisation(request)
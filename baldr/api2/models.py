@@ -1,9 +1,31 @@
 from __future__ import absolute_import
+import functools
+import itertools
+import six
+import time
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
 from odin import registration
-from odin.exceptions import CodecDecodeError
+from odin.utils import getmeta
+from odin.exceptions import CodecDecodeError, ValidationError
+from odin.fields import NotProvided
 from . import ResourceApi, listing, collection, create, detail, update, patch, delete
+from .constants import POST
+from .. import decoders, ndjson_codec, resource_cache
 from ..exceptions import ImmediateErrorHttpResponse
+from ..identity_map import clear_identity_map
+from ..models import changed_fields, direct_mapped_fields, field_values, save_changes
+from ..resources import IngestError, IngestResult
+
+# Filter lookups that are supported (and can make use of an index).
+FILTER_LOOKUPS = ('exact', 'in', 'gt', 'gte', 'lt', 'lte', 'isnull', 'startswith')
+
+BOOLEAN_VALUES = {'true': True, '1': True, 'false': False, '0': False}
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
 
 
 class ModelResourceApi(ResourceApi):
@@ -21,35 +43,195 @@ class ModelResourceApi(ResourceApi):
     to_model_mapping = None
     # Mapping to use for mapping to resource
     to_resource_mapping = None
+    # Fields that listings can be filtered on using query parameters; either a sequence of field names
+    # (that allow exact matches) or a dict mapping field names to allowed lookups eg::
+    #
+    #     filter_fields = {'status': ('exact', 'in'), 'created': ('gte', 'lt')}
+    #
+    # Lookups are restricted to ``FILTER_LOOKUPS`` so filters can make use of an index.
+    filter_fields = None
+    # Fields that listings can be ordered by using the ``ordering`` query parameter; if None the
+    # ``ordering`` parameter is ignored.
+    ordering_fields = None
+    # Query parameters that are not filters (along with the ``query_param`` of the ``profiler``).
+    reserved_parameters = ('offset', 'limit', 'ordering')
+
+    # Database alias (or sequence of aliases that are used in turn) that read requests are routed
+    # to; default is ``settings.BALDR_READ_DATABASES``. Requests that make changes always use
+    # ``write_database``.
+    read_databases = None
+    write_database = DEFAULT_DB_ALIAS
+    # Time (in seconds) after a client makes a change that its reads are routed to the write database
+    # so the client reads its own writes. This is tracked using a cookie and a header (for clients that
+    # don't support cookies, the header value should be returned in subsequent requests).
+    read_your_writes_window = 5
+    read_your_writes_cookie = 'baldr_primary_until'
+    read_your_writes_header = 'X-Baldr-Primary-Until'
+
+    # Cache of resources mapped from instances (a ``MappedResourceCache``) used by listings and
+    # collections so only rows that are not cached are mapped. See ``baldr.resource_cache``.
+    resource_cache = None
 
     def __init__(self, *args, **kwargs):
         super(ModelResourceApi, self).__init__(*args, **kwargs)
 
         assert self.model, "A model has not been provided."
 
+        # Normalise and validate filter/ordering fields; these are applied to the queryset so must be
+        # fields of both the resource and the model.
+        resource_fields = getmeta(self.resource).field_map
+        model_fields = set()
+        for model_field in self.model._meta.concrete_fields:
+            model_fields.update((model_field.name, model_field.attname))
+        if self.filter_fields is not None and not isinstance(self.filter_fields, dict):
+            self.filter_fields = dict((name, ('exact',)) for name in self.filter_fields)
+        for name, lookups in (self.filter_fields or {}).items():
+            assert name in resource_fields, "Filter field %r is not a field of the resource." % name
+            assert name in model_fields, "Filter field %r is not a field of the model." % name
+            for lookup in lookups:
+                assert lookup in FILTER_LOOKUPS, "Filter lookup %r is not supported." % lookup
+        for name in (self.ordering_fields or ()):
+            assert name in resource_fields, "Ordering field %r is not a field of the resource." % name
+            assert name in model_fields, "Ordering field %r is not a field of the model." % name
+
         # Attempt to resolve mappings
         if self.to_model_mapping is None:
             self.to_model_mapping = registration.get_mapping(self.resource, self.model)
         if self.to_resource_mapping is None:
             self.to_resource_mapping = registration.get_mapping(self.model, self.resource)
 
+        read_databases = self.read_databases or getattr(settings, 'BALDR_READ_DATABASES', None)
+        if isinstance(read_databases, six.string_types):
+            read_databases = (read_databases,)
+        self._read_databases = itertools.cycle(read_databases) if read_databases else None
+
+        # The read your writes header selects the database a read uses so coalesced requests must match it
+        self._read_your_writes_meta = 'HTTP_' + self.read_your_writes_header.upper().replace('-', '_')
+        if self._read_your_writes_meta not in self.coalesce_vary_headers:
+            self.coalesce_vary_headers = tuple(self.coalesce_vary_headers) + (self._read_your_writes_meta,)
+
+    def get_database(self, request):
+        """
+        Get the database alias used by a request.
+        """
+        database = getattr(request, 'database', None)
+        if database is None:
+            if self._read_databases is None or request.method not in SAFE_METHODS or self.reads_from_primary(request):
+                database = self.write_database
+            else:
+                database = next(self._read_databases)
+            request.database = database
+        return database
+
+    def reads_from_primary(self, request):
+        """
+        Determine if a client has recently made a change so should read from the write database.
+        """
+        until = (request.META.get(self._read_your_writes_meta) or
+                 request.COOKIES.get(self.read_your_writes_cookie))
+        try:
+            return until is not None and float(until) > time.time()
+        except ValueError:
+            return False
+
+    def process_response(self, request, response):
+        if (self._read_databases is not None and self.read_your_writes_window and
+                request.method not in SAFE_METHODS and response.status_code < 400):
+            until = str(int(time.time()) + self.read_your_writes_window)
+            response.set_cookie(self.read_your_writes_cookie, until, max_age=self.read_your_writes_window,
+                                httponly=True)
+            response[self.read_your_writes_header] = until
+        return response
+
+    def get_location(self, request, instance):
+        """
+        Get the location of a new instance created by a request to the collection.
+        """
+        return '%s/%s' % (request.path.rstrip('/'), getattr(instance, self.model_id_field))
+
     def get_queryset(self, request):
-        return self.model.objects.all()
+        return self.model.objects.using(self.get_database(request))
+
+    def map_to_resources(self, request, instances):
+        """
+        Map instances to resources using the resource cache (if one is defined).
+        """
+        if self.resource_cache is None:
+            return self.to_resource_mapping.apply(instances)
+        return self.resource_cache.apply(self.to_resource_mapping, instances)
+
+    def filter_queryset(self, request, queryset):
+        """
+        Apply filters and ordering from the query parameters of a request to a queryset.
+        """
+        if self.filter_fields is not None:
+            resource_fields = getmeta(self.resource).field_map
+            profile_parameter = self.profiler.query_param if self.profiler is not None else None
+            filters = {}
+            for key, value in request.GET.items():
+                if key in self.reserved_parameters or key == profile_parameter:
+                    continue
+
+                name, _, lookup = key.partition('__')
+                lookup = lookup or 'exact'
+                if lookup not in self.filter_fields.get(name, ()):
+                    raise ImmediateErrorHttpResponse(400, 40001, "Invalid filter parameter.",
+                                                     "Filtering by %r is not supported." % key)
+
+                field = resource_fields[name]
+                try:
+                    if lookup == 'in':
+                        value = [field.clean(v) for v in value.split(',')]
+                    elif lookup == 'isnull':
+                        value = BOOLEAN_VALUES[value.lower()]
+                    else:
+                        value = field.clean(value)
+                except (KeyError, ValidationError) as ex:
+                    raise ImmediateErrorHttpResponse(400, 40002, "Invalid filter value.",
+                                                     "Invalid value for %r: %s" % (key, ex))
+                filters["%s__%s" % (name, lookup)] = value
+            if filters:
+                queryset = queryset.filter(**filters)
+
+        ordering = request.GET.get('ordering') if self.ordering_fields is not None else None
+        if ordering:
+            order_by = [o.strip() for o in ordering.split(',') if o.strip()]
+            for o in order_by:
+                if o.lstrip('-') not in self.ordering_fields:
+                    raise ImmediateErrorHttpResponse(400, 40003, "Invalid ordering.",
+                                                     "Ordering by %r is not supported." % o)
+            queryset = queryset.order_by(*order_by)
+
+        return queryset
 
     def get_instance(self, request, resource_id):
-        return get_object_or_404(self.get_queryset(request), **{
-            self.model_id_field: resource_id
-        })
+        """
+        Get the instance identified by a resource ID; instances are loaded once per request using the
+        identity map of the request.
+        """
+        return self.get_related_instance(request, self.get_queryset(request), resource_id, self.model_id_field)
 
-    def update_instance_from_body(self, request, instance, resource=None, ignore_fields=('id', 'pk')):
+    def get_related_instance(self, request, queryset, value, field='pk'):
         """
-        Get a resource that merges an instance and the request body.
-        :param request:
-        :param instance:
-        :param resource:
-        :param ignore_fields:
-        :return:
+        Get an instance from a queryset (eg of a related model) using the identity map of the request.
+
+        :param queryset: Queryset (or model) to get the instance from.
+        :param value: Value of the lookup field.
+        :param field: Field used to lookup the instance.
+        :raises Http404: If the instance does not exist.
 
+        """
+        if not hasattr(queryset, 'model'):
+            queryset = queryset.objects.using(self.get_database(request))
+        loader = functools.partial(get_object_or_404, queryset, **{field: value})
+        identity_map = getattr(request, 'identity_map', None)
+        if identity_map is None:
+            return loader()
+        return identity_map.get(queryset, field, value, loader)
+
+    def partial_resource_from_body(self, request, resource=None):
+        """
+        Get a resource from the request body; fields that are not supplied are ``NotProvided``.
         """
         resource = resource or self.resource
 
@@ -59,31 +241,109 @@ class ModelResourceApi(ResourceApi):
             raise ImmediateErrorHttpResponse(400, 40100, "Unable to decode request body.", str(ude))
 
         try:
-            resource = request.request_codec.loads(body, resource=resource, full_clean=False,
-                                                   default_to_not_supplied=True)
+            if self.compiled_decoders:
+                resource = decoders.loads(request.request_codec, body, resource, full_clean=False,
+                                          default_to_not_supplied=True)
+            else:
+                resource = request.request_codec.loads(body, resource=resource, full_clean=False,
+                                                       default_to_not_supplied=True)
         except ValueError as ve:
             raise ImmediateErrorHttpResponse(400, 40098, "Unable to load resource.", str(ve))
         except CodecDecodeError as cde:
             raise ImmediateErrorHttpResponse(400, 40096, "Unable to decode body.", str(cde))
 
+        return resource
+
+    def update_instance_from_body(self, request, instance, resource=None, ignore_fields=('id', 'pk')):
+        """
+        Get a resource that merges an instance and the request body.
+        :param request:
+        :param instance:
+        :param resource:
+        :param ignore_fields:
+        :return:
+
+        """
+        resource = self.partial_resource_from_body(request, resource)
+
         # Update only the supplied fields
-        self.to_model_mapping(resource).update(instance, ignore_fields=ignore_fields)
+        self.to_model_mapping(resource).update(instance, ignore_fields=ignore_fields, ignore_not_provided=True)
 
         return resource
 
     def save_model(self, request, instance, is_new=False):
-        instance.save()
+        """
+        Save a model instance.
+        """
+        clear_identity_map(request)
+        instance.save(using=self.get_database(request))
         return instance
 
+    def save_model_changes(self, request, instance, update_fields):
+        """
+        Save the changes made to a model instance by an update.
+
+        Only the changed columns are written and if no fields have changed the instance is not saved.
+        If ``save_model`` is overridden (and this method is not) ``save_model`` is used instead so
+        customisations are not bypassed.
+
+        :param update_fields: Fields changed by the update (see ``baldr.models.changed_fields``).
+
+        """
+        if six.get_unbound_function(type(self).save_model) is not six.get_unbound_function(
+                ModelResourceApi.save_model):
+            return self.save_model(request, instance, False)
+        clear_identity_map(request)
+        save_changes(instance, update_fields, using=self.get_database(request))
+        return instance
+
+    def save_models(self, request, instances):
+        """
+        Save a batch of new model instances.
+        """
+        clear_identity_map(request)
+        self.model.objects.using(self.get_database(request)).bulk_create(instances)
+
 
 class CollectionMixin(ModelResourceApi):
     """
     Mixin that provides a collection response.
+
+    Codecs that support streaming rows (eg ``baldr.arrow_codec``) are streamed in chunks directly from
+    the queryset.
     """
+    # Number of rows in each chunk of a streamed collection.
+    stream_chunk_size = 10000
+
     @collection
     def object_collection(self, request):
-        queryset = self.get_queryset(request)
-        return self.to_resource_mapping.apply(queryset)
+        queryset = self.filter_queryset(request, self.get_queryset(request))
+        if hasattr(request.response_codec, 'stream_rows'):
+            return self.stream_collection(request, queryset)
+        return self.map_to_resources(request, queryset)
+
+    def stream_collection(self, request, queryset):
+        """
+        Stream a collection using a codec that supports streaming rows.
+
+        If every resource field is a column of the model that ``to_resource_mapping`` copies unchanged,
+        rows are read using ``values_list`` and resources are not created.
+        """
+        codec = request.response_codec
+        fields = getmeta(self.resource).fields
+        attnames = [f.attname for f in fields]
+
+        columns = set()
+        for model_field in self.model._meta.concrete_fields:
+            columns.update((model_field.name, model_field.attname))
+        columns.intersection_update(direct_mapped_fields(self.to_resource_mapping))
+        if columns.issuperset(attnames):
+            rows = queryset.values_list(*attnames).iterator()
+        else:
+            rows = (tuple(getattr(r, a) for a in attnames) for r in self.to_resource_mapping.apply(queryset))
+
+        return StreamingHttpResponse(codec.stream_rows(rows, fields, self.stream_chunk_size),
+                                     content_type=codec.CONTENT_TYPE)
 
 
 class ListMixin(ModelResourceApi):
@@ -92,9 +352,9 @@ class ListMixin(ModelResourceApi):
     """
     @listing
     def object_list(self, request, limit, offset):
-        queryset = self.get_queryset(request)
+        queryset = self.filter_queryset(request, self.get_queryset(request))
         results = queryset[offset:offset+limit]
-        return self.to_resource_mapping.apply(results), len(queryset)
+        return self.map_to_resources(request, results), queryset.count()
 
 
 class CreateMixin(ModelResourceApi):
@@ -107,9 +367,71 @@ class CreateMixin(ModelResourceApi):
         instance = self.to_model_mapping.apply(resource)
         instance.id = None
         self.save_model(request, instance, True)
+        if self.use_return_preference(request, 'minimal'):
+            return None, 201, {'Location': self.get_location(request, instance)}
         return self.to_resource_mapping.apply(instance), 201
 
 
+class IngestMixin(ModelResourceApi):
+    """
+    Mixin that provides a bulk ingest method for newline delimited resources (``application/x-ndjson``).
+
+    The request body is read a line at a time and models are created in batches so memory use does
+    not depend on the size of the upload. Lines that fail are reported in the response.
+    """
+    # Number of models created in each batch.
+    ingest_batch_size = 500
+    # Maximum number of line errors included in the response.
+    ingest_max_errors = 100
+    # Fields excluded from validation of ingested resources (eg fields assigned by the database).
+    ingest_exclude_fields = ('id',)
+
+    def iter_body_lines(self, request):
+        """
+        Iterate over the lines of the request body.
+        """
+        if request.META.get('HTTP_CONTENT_ENCODING'):
+            # Compressed bodies need to be decompressed in full
+            return self.decode_body(request).splitlines()
+        return request
+
+    @collection(name='ingest', method=POST)
+    def object_ingest(self, request):
+        if request.request_codec is not ndjson_codec:
+            raise ImmediateErrorHttpResponse(415, 41501, "Ingest requires a %s body." % ndjson_codec.CONTENT_TYPE)
+
+        created = failed = 0
+        errors = []
+        instances = []
+        lines = ndjson_codec.iter_loads(self.iter_body_lines(request), self.resource, full_clean=False)
+        for line_number, resource, error in lines:
+            if error is None:
+                try:
+                    decoders.full_clean(resource, exclude=self.ingest_exclude_fields)
+                    instance = self.to_model_mapping.apply(resource)
+                except ValidationError as ve:
+                    error = ve
+                else:
+                    instance.id = None
+                    instances.append(instance)
+
+            if error is not None:
+                failed += 1
+                if len(errors) < self.ingest_max_errors:
+                    errors.append(IngestError(line_number, str(error), getattr(error, 'message_dict', None)))
+
+            if len(instances) >= self.ingest_batch_size:
+                self.save_models(request, instances)
+                created += len(instances)
+                instances = []
+
+        if instances:
+            self.save_models(request, instances)
+            created += len(instances)
+
+        return IngestResult(created, failed, errors)
+
+
 class DetailMixin(ModelResourceApi):
     """
     Mixin that provides a basic full detail method.
@@ -128,8 +450,11 @@ class UpdateMixin(ModelResourceApi):
     def object_update(self, request, resource_id):
         instance = self.get_instance(request, resource_id)
         resource = self.resource_from_body(request)
+        original = field_values(instance)
         self.to_model_mapping(resource).update(instance, ignore_fields=('id', 'pk'))
-        self.save_model(request, instance, False)
+        self.save_model_changes(request, instance, changed_fields(instance, original))
+        if self.use_return_preference(request, 'minimal'):
+            return
         return self.to_resource_mapping.apply(instance)
 
 
@@ -137,13 +462,87 @@ class PatchMixin(ModelResourceApi):
     """
     Mixin that provides a basic model update method.
     """
+    # Apply patches with a single ``UPDATE`` statement rather than loading, updating and saving the
+    # instance. Patches are only applied this way if every supplied field is a column of the model that
+    # ``to_model_mapping`` copies unchanged (other patches are applied to a loaded instance); ``auto_now``
+    # columns are also updated. ``save_model`` is not called so model signals are not sent, and the
+    # patched resource is only returned if requested using a ``Prefer: return=representation`` header
+    # (otherwise the response is 204 No Content).
+    patch_in_place = False
+
     @patch
     def object_update(self, request, resource_id):
+        if self.patch_in_place:
+            resource = self.partial_resource_from_body(request)
+            changes = self.column_changes(resource)
+            if changes is not None:
+                return self.update_in_place(request, resource_id, changes)
+
         instance = self.get_instance(request, resource_id)
+        original = field_values(instance)
         self.update_instance_from_body(request, instance)
-        self.save_model(request, instance, False)
+        self.save_model_changes(request, instance, changed_fields(instance, original))
+        if self.use_return_preference(request, 'minimal'):
+            return
         return self.to_resource_mapping.apply(instance)
 
+    def column_changes(self, resource, ignore_fields=('id', 'pk')):
+        """
+        Get the column values of the fields supplied in a partial resource.
+
+        :returns: Dict of column values; or ``None`` if a supplied field is not a column of the model
+            (or is not copied straight to the column by ``to_model_mapping``).
+
+        """
+        columns = set()
+        for model_field in self.model._meta.concrete_fields:
+            if not model_field.primary_key:
+                columns.update((model_field.name, model_field.attname))
+        columns.intersection_update(direct_mapped_fields(self.to_model_mapping))
+
+        changes = {}
+        for field in getmeta(resource).fields:
+            value = getattr(resource, field.attname)
+            if value is NotProvided or field.attname in ignore_fields:
+                continue
+            if field.attname not in columns:
+                return
+            changes[field.attname] = field.clean(value)
+        return changes
+
+    def update_in_place(self, request, resource_id, changes):
+        """
+        Apply changes to an instance using a single ``UPDATE`` statement (along with any ``auto_now`` fields).
+        """
+        clear_identity_map(request)
+        queryset = self.get_queryset(request).filter(**{self.model_id_field: resource_id})
+        if not changes:
+            if not queryset.exists():
+                raise Http404("No %s matches the given query." % self.model._meta.object_name)
+        else:
+            now = timezone.now()
+            changes = dict(changes)
+            for model_field in self.model._meta.concrete_fields:
+                if getattr(model_field, 'auto_now', False):
+                    changes.setdefault(model_field.attname, now)
+
+            # ``QuerySet.update`` does not send signals so cached resources are invalidated here
+            pk_field = self.model._meta.pk
+            if self.model_id_field in ('pk', pk_field.name):
+                pks = [pk_field.to_python(resource_id)]
+            elif any(resource_cache.caches):
+                pks = list(queryset.values_list('pk', flat=True))
+            else:
+                pks = []
+
+            if not queryset.update(**changes):
+                raise Http404("No %s matches the given query." % self.model._meta.object_name)
+            resource_cache.invalidate(self.model, pks)
+
+        if self.use_return_preference(request, 'representation'):
+            return self.to_resource_mapping.apply(self.get_instance(request, resource_id))
+        self.use_return_preference(request, 'minimal')
+
 
 class DeleteMixin(ModelResourceApi):
     """
@@ -151,4 +550,6 @@ class DeleteMixin(ModelResourceApi):
     """
     @delete
     def object_delete(self, request, resource_id):
-        self.get_instance(request, resource_id).delete()
+        instance = self.get_instance(request, resource_id)
+        clear_identity_map(request)
+        instance.delete(using=self.get_database(request))
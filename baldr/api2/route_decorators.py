@@ -1,6 +1,8 @@
 from __future__ import absolute_import
 import six
-from baldr.resources import Listing
+from odin.codecs import json_codec
+from baldr import encoders
+from baldr.resources import Listing, SizeLimitedListing
 from . import constants
 
 __all__ = (
@@ -19,7 +21,8 @@ _route_count = 0
 
 # Route definition decorators
 
-def route(func=None, name=None, path_type=constants.PATH_TYPE_COLLECTION, method=constants.GET, resource=None):
+def route(func=None, name=None, path_type=constants.PATH_TYPE_COLLECTION, method=constants.GET, resource=None,
+          **options):
     """
     Decorator for defining an API route. Usually one of the helpers (listing,
     create, detail, update, delete) would be used in place of the route
@@ -44,6 +47,7 @@ def route(func=None, name=None, path_type=constants.PATH_TYPE_COLLECTION, method
     :param method: HTTP method(s) this function responses to.
     :param resource: Specify the resource that this function encodes/decodes,
         default is the one specified on the ResourceAPI instance.
+    :param options: Additional options that apply to this route eg ``max_queries``.
 
     """
     if isinstance(method, six.string_types):
@@ -56,6 +60,7 @@ def route(func=None, name=None, path_type=constants.PATH_TYPE_COLLECTION, method
     def inner(func):
         func.route = (route_number, path_type, method, name)
         func.resource = resource
+        func.route_options = options
         return func
 
     return inner(func) if func else inner
@@ -63,17 +68,57 @@ def route(func=None, name=None, path_type=constants.PATH_TYPE_COLLECTION, method
 collection = collection_action = action = route
 
 
-def resource_route(func=None, name=None, method=constants.GET, resource=None):
-    return route(func, name, constants.PATH_TYPE_RESOURCE, method, resource)
+def resource_route(func=None, name=None, method=constants.GET, resource=None, **options):
+    return route(func, name, constants.PATH_TYPE_RESOURCE, method, resource, **options)
 
 detail_route = detail_action = resource = resource_action = resource_route
 
 
 # Handlers
 
-def list_response(func=None, default_offset=0, default_limit=50):
+def take_within_budget(results, max_bytes, codec=None):
+    """
+    Take results until the encoded size of the results taken would exceed a budget; at least one
+    result is always taken.
+
+    Results are encoded with the codec (using its compiled encoder if it has one) to measure their
+    size. For codecs with compiled encoders the encoded content is kept so results are only encoded
+    once (see ``baldr.encoders.EncodedList``).
+
+    :param results: Iterable of results; this is only consumed until the budget is exceeded.
+    :param max_bytes: Maximum encoded size of the results.
+    :param codec: Codec that results will be encoded with; default is JSON.
+    :returns: Tuple of the results taken and a flag indicating if results were left out.
+
+    """
+    codec = codec or json_codec
+    dumps = encoders.COMPILED_DUMPS.get(codec, codec.dumps)
+    taken = []
+    content = []
+    size = 0
+    truncated = False
+    for result in results:
+        encoded = dumps(result)
+        # Allow for a separator between each result
+        size += len(encoded) + 1
+        if taken and size > max_bytes:
+            truncated = True
+            break
+        taken.append(result)
+        content.append(encoded)
+
+    if codec in encoders.COMPILED_DUMPS:
+        taken = encoders.EncodedList(taken, codec, content)
+    return taken, truncated
+
+
+def list_response(func=None, default_offset=0, default_limit=50, max_bytes=None):
     """
     Handle processing a list. It is assumed decorator will operate on a class.
+
+    If ``max_bytes`` is supplied the results are limited to those that fit within that many bytes
+    once encoded and a ``SizeLimitedListing`` is returned that includes the offset of the next page
+    (if there are further results).
     """
     def inner(func):
         def wrapper(self, request, *args, **kwargs):
@@ -86,14 +131,21 @@ def list_response(func=None, default_offset=0, default_limit=50):
                     result, total_count = result
                 else:
                     total_count = None
-                return Listing(list(result), limit, offset, total_count)
+                if max_bytes is None:
+                    return Listing(list(result), limit, offset, total_count)
+
+                result, truncated = take_within_budget(result, max_bytes, getattr(request, 'response_codec', None))
+                next_offset = offset + len(result)
+                if not (truncated or (total_count is not None and next_offset < total_count)):
+                    next_offset = None
+                return SizeLimitedListing(result, limit, offset, total_count, next_offset)
         return wrapper
     return inner(func) if func else inner
 
 
 # Shortcut methods
 
-def listing(func=None, name=None, resource=None, default_offset=0, default_limit=50):
+def listing(func=None, name=None, resource=None, default_offset=0, default_limit=50, max_bytes=None, **options):
     """
     Decorator to indicate a listing endpoint.
 
@@ -104,13 +156,19 @@ def listing(func=None, name=None, resource=None, default_offset=0, default_limit
         instance.
     :param default_offset: Default value for the offset from the start of listing.
     :param default_limit: Default value for limiting the response size.
+    :param max_bytes: Limit the results to those that fit within this many bytes once encoded; at
+        least one result is always returned. A ``SizeLimitedListing`` is returned that includes the offset
+        of the next page.
+    :param options: Additional options that apply to this route eg ``max_queries``.
 
     """
-    return route(list_response(func, default_offset, default_limit),
-                 name, constants.PATH_TYPE_COLLECTION, constants.GET, resource)
+    def inner(func):
+        return route(list_response(func, default_offset, default_limit, max_bytes),
+                     name, constants.PATH_TYPE_COLLECTION, constants.GET, resource, **options)
+    return inner(func) if func else inner
 
 
-def create(func=None, name=None, resource=None):
+def create(func=None, name=None, resource=None, **options):
     """
     Decorator to indicate a creation endpoint.
 
@@ -119,12 +177,13 @@ def create(func=None, name=None, resource=None):
     :param resource: Specify the resource that this function
         encodes/decodes, default is the one specified on the ResourceAPI
         instance.
+    :param options: Additional options that apply to this route eg ``max_queries``.
 
     """
-    return route(func, name, constants.PATH_TYPE_COLLECTION, constants.POST, resource)
+    return route(func, name, constants.PATH_TYPE_COLLECTION, constants.POST, resource, **options)
 
 
-def detail(func=None, name=None, resource=None):
+def detail(func=None, name=None, resource=None, **options):
     """
     Decorator to indicate a detail endpoint.
 
@@ -133,12 +192,13 @@ def detail(func=None, name=None, resource=None):
     :param resource: Specify the resource that this function
         encodes/decodes, default is the one specified on the ResourceAPI
         instance.
+    :param options: Additional options that apply to this route eg ``max_queries``.
 
     """
-    return route(func, name, constants.PATH_TYPE_RESOURCE, constants.GET, resource)
+    return route(func, name, constants.PATH_TYPE_RESOURCE, constants.GET, resource, **options)
 
 
-def update(func=None, name=None, resource=None):
+def update(func=None, name=None, resource=None, **options):
     """
     Decorator to indicate an update endpoint.
 
@@ -147,12 +207,13 @@ def update(func=None, name=None, resource=None):
     :param resource: Specify the resource that this function
         encodes/decodes, default is the one specified on the ResourceAPI
         instance.
+    :param options: Additional options that apply to this route eg ``max_queries``.
 
     """
-    return route(func, name, constants.PATH_TYPE_RESOURCE, constants.PUT, resource)
+    return route(func, name, constants.PATH_TYPE_RESOURCE, constants.PUT, resource, **options)
 
 
-def patch(func=None, name=None, resource=None):
+def patch(func=None, name=None, resource=None, **options):
     """
     Decorator to indicate a patch endpoint.
 
@@ -161,12 +222,13 @@ def patch(func=None, name=None, resource=None):
     :param resource: Specify the resource that this function
         encodes/decodes, default is the one specified on the ResourceAPI
         instance.
+    :param options: Additional options that apply to this route eg ``max_queries``.
 
     """
-    return route(func, name, constants.PATH_TYPE_RESOURCE, constants.PATCH, resource)
+    return route(func, name, constants.PATH_TYPE_RESOURCE, constants.PATCH, resource, **options)
 
 
-def delete(func=None, name=None, resource=None):
+def delete(func=None, name=None, resource=None, **options):
     """
     Decorator to indicate a deletion endpoint.
 
@@ -175,6 +237,7 @@ def delete(func=None, name=None, resource=None):
     :param resource: Specify the resource that this function
         encodes/decodes, default is the one specified on the ResourceAPI
         instance.
+    :param options: Additional options that apply to this route eg ``max_queries``.
 
     """
-    return route(func, name, constants.PATH_TYPE_RESOURCE, constants.DELETE, resource)
+    return route(func, name, constants.PATH_TYPE_RESOURCE, constants.DELETE, resource, **options)
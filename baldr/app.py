@@ -5,3 +5,7 @@ from django.apps import AppConfig
 class BaldrAppConfig(AppConfig):
     name = 'baldr'
     verbose_name = 'Baldr'
+
+    def ready(self):
+        from baldr import _ensure_registration
+        _ensure_registration()
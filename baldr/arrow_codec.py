@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""
+Codec for the Apache Arrow IPC stream format (requires ``pyarrow``).
+
+Intended for exporting collections to analytics tools, rows are converted into
+columnar record batches using the field types of the resource. A
+``CollectionMixin`` streams a collection one record batch at a time directly
+from ``queryset.values_list`` (see ``stream_rows``) without building a
+resource for each row.
+
+"""
+from __future__ import absolute_import
+import datetime
+import io
+import itertools
+import odin
+import pyarrow
+import six
+from odin.resources import build_object_graph
+from odin.utils import getmeta
+from baldr.resources import Listing
+
+CONTENT_TYPE = 'application/vnd.apache.arrow.stream'
+
+# Arrow types for Odin fields, checked in order (so subclasses first).
+FIELD_TYPES = (
+    (odin.BooleanField, pyarrow.bool_()),
+    (odin.IntegerField, pyarrow.int64()),
+    (odin.FloatField, pyarrow.float64()),
+    (odin.DateTimeField, pyarrow.timestamp('us', tz='UTC')),
+    (odin.NaiveDateTimeField, pyarrow.timestamp('us')),
+    (odin.DateField, pyarrow.date32()),
+    (odin.TimeField, pyarrow.time64('us')),
+    (odin.NaiveTimeField, pyarrow.time64('us')),
+    (odin.StringField, pyarrow.string()),
+)
+
+
+def field_type(field):
+    """
+    Arrow type used for an Odin field; types that are not supported natively are converted to strings.
+    """
+    for field_class, arrow_type in FIELD_TYPES:
+        if isinstance(field, field_class):
+            return arrow_type
+    return pyarrow.string()
+
+
+def to_string(value):
+    if value is None or isinstance(value, six.text_type):
+        return value
+    if isinstance(value, bytes):
+        return value.decode('UTF8')
+    return six.text_type(value)
+
+
+def to_float(value):
+    # Decimal values (eg from a model DecimalField) are not accepted by Arrow as floats.
+    return None if value is None else float(value)
+
+
+def to_time(value):
+    # Timezone aware times are not supported by Arrow.
+    return value.replace(tzinfo=None) if isinstance(value, datetime.time) and value.tzinfo else value
+
+
+CONVERTERS = {
+    pyarrow.string(): to_string,
+    pyarrow.float64(): to_float,
+    pyarrow.time64('us'): to_time,
+}
+
+
+def schema(fields):
+    """
+    Generate an Arrow schema from Odin fields.
+    """
+    return pyarrow.schema([pyarrow.field(f.name, field_type(f), nullable=True) for f in fields])
+
+
+def record_batch(rows, arrow_schema):
+    """
+    Generate a record batch from a sequence of row tuples.
+    """
+    columns = list(zip(*rows)) if rows else [()] * len(arrow_schema)
+    arrays = []
+    for column, arrow_field in zip(columns, arrow_schema):
+        converter = CONVERTERS.get(arrow_field.type)
+        if converter:
+            column = [converter(value) for value in column]
+        arrays.append(pyarrow.array(column, type=arrow_field.type))
+    return pyarrow.RecordBatch.from_arrays(arrays, [f.name for f in arrow_schema])
+
+
+def _drain(buf):
+    data = buf.getvalue()
+    buf.seek(0)
+    buf.truncate()
+    return data
+
+
+def stream_rows(rows, fields, chunk_size=10000):
+    """
+    Encode rows as an Arrow IPC stream one record batch at a time.
+
+    :param rows: Iterable of row tuples with values in the same order as ``fields``
+        (eg ``queryset.values_list(...)``).
+    :param fields: Odin fields that describe each column.
+    :param chunk_size: Number of rows in each record batch.
+    :returns: Generator yielding chunks of the encoded stream.
+
+    """
+    arrow_schema = schema(fields)
+    buf = io.BytesIO()
+    writer = pyarrow.RecordBatchStreamWriter(buf, arrow_schema)
+
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, chunk_size))
+        if not chunk:
+            break
+        writer.write_batch(record_batch(chunk, arrow_schema))
+        yield _drain(buf)
+
+    writer.close()
+    yield _drain(buf)
+
+
+def dumps(resource, chunk_size=10000):
+    """
+    Dump a resource (or list of resources) to an Arrow IPC stream.
+
+    All resources must be of the same type, the results of a ``Listing`` are dumped.
+    """
+    if isinstance(resource, Listing):
+        resource = resource.results
+    if not isinstance(resource, (list, tuple)):
+        resource = [resource]
+
+    fields = getmeta(resource[0]).fields if resource else []
+    rows = (tuple(getattr(r, f.attname) for f in fields) for r in resource)
+    return b''.join(stream_rows(rows, fields, chunk_size))
+
+
+def loads(s, resource=None, full_clean=True, default_to_not_supplied=False):
+    """
+    Load a list of resources from an Arrow IPC stream.
+    """
+    if isinstance(s, bytes):
+        s = pyarrow.py_buffer(s)
+    table = pyarrow.ipc.open_stream(s).read_all()
+    columns = table.to_pydict()
+    rows = [dict(zip(columns, values)) for values in zip(*columns.values())]
+    return build_object_graph(rows, resource, full_clean, False, default_to_not_supplied)
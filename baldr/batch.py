@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+"""
+Batching of several API requests into a single HTTP request.
+
+A batch endpoint is enabled on an API collection::
+
+    urlpatterns += Api(
+        ApiVersion(
+            UserApi(),
+            BookApi(),
+            version='v1',
+            batch=True,
+        )
+    ).patterns()
+
+Requests are ``POST``ed to ``/api/v1/_batch`` as a list of ``BatchRequest``
+resources, eg::
+
+    [
+        {"method": "GET", "path": "books/1"},
+        {"method": "GET", "path": "users?offset=10"},
+        {"method": "PATCH", "path": "books/2", "body": {"$": "Book", "title": "Odin"}}
+    ]
+
+Each request is resolved through the route tables of the API's (api2 resource
+API's only) and dispatched in-process; the result of each request is
+returned as a list of ``BatchResult`` resources encoded in a single response.
+
+Consecutive safe requests (eg ``GET``) are dispatched concurrently using a
+bounded thread pool, other requests are dispatched sequentially in the order
+supplied. Once a request has made a change the following requests are all
+dispatched sequentially (so they read the change on the same database
+connection). Adding ``?atomic=true`` dispatches all requests sequentially in
+a transaction (on the write database of each API that is changed) that is
+rolled back if any request fails.
+
+Each request is handled as it would be outside of a batch (identity map,
+metrics, query budget, ``process_response`` hook etc) except that the
+resource is embedded in the batch response rather than encoded. Cookies set by
+a request (eg to read your writes) are sent to following requests and set on
+the batch response.
+
+"""
+from __future__ import absolute_import
+import copy
+import threading
+from multiprocessing.pool import ThreadPool
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.http import HttpResponse, QueryDict
+from django.http.cookie import SimpleCookie
+from odin.exceptions import ValidationError, CodecDecodeError
+from baldr import canned_errors, content_type_resolvers, encoders
+from baldr.api import CODECS, ResourceApiCommon
+from baldr.exceptions import ImmediateHttpResponse
+from baldr.resources import BatchRequest, BatchResult, Error
+
+__all__ = ('BatchHandler',)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class BatchHandler(object):
+    """
+    View that handles batch requests.
+
+    :param dispatcher: ``CompiledDispatcher`` used to resolve request paths.
+    :param codecs: Codecs that are supported for Encoding/Decoding resources; default is all
+        registered codecs.
+    :param max_requests: Maximum number of requests allowed in a batch.
+    :param workers: Number of threads used to dispatch safe requests concurrently.
+
+    """
+    request_type_resolvers = [
+        content_type_resolvers.content_type_header(),
+        content_type_resolvers.accepts_header(),
+        content_type_resolvers.settings_default(),
+    ]
+    response_type_resolvers = [
+        content_type_resolvers.accepts_header(),
+        content_type_resolvers.content_type_header(),
+        content_type_resolvers.settings_default(),
+    ]
+
+    def __init__(self, dispatcher, codecs=None, max_requests=50, workers=4):
+        self.dispatcher = dispatcher
+        self.codecs = codecs or CODECS
+        self.max_requests = max_requests
+        self.workers = workers
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    @property
+    def pool(self):
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ThreadPool(self.workers)
+        return self._pool
+
+    @staticmethod
+    def resolve(resolvers, request):
+        for resolver in resolvers:
+            content_type = resolver(request)
+            if content_type:
+                return content_type
+
+    def __call__(self, request):
+        try:
+            request_codec = self.codecs[self.resolve(self.request_type_resolvers, request)]
+            response_codec = self.codecs[self.resolve(self.response_type_resolvers, request)]
+        except KeyError:
+            return HttpResponse(content=b"Content cannot be returned in the format requested.", status=406)
+
+        if request.method != 'POST':
+            return canned_errors.registry.response(response_codec, 405, 40500, "Method not allowed",
+                                                   headers={'Allow': 'POST'}, meta={'allow': 'POST'})
+
+        try:
+            body = ResourceApiCommon.decode_body(request)
+        except UnicodeDecodeError as ude:
+            return canned_errors.registry.response(response_codec, 400, 40099, "Unable to decode request body.",
+                                                   str(ude))
+        except ImmediateHttpResponse as ex:
+            return canned_errors.registry.resource_response(response_codec, ex.resource, ex.status, ex.headers)
+
+        try:
+            batch = request_codec.loads(body, resource=BatchRequest)
+        except (ValueError, ValidationError, CodecDecodeError) as ex:
+            return canned_errors.registry.response(response_codec, 400, 40098, "Unable to load batch.", str(ex))
+        if not isinstance(batch, list):
+            return canned_errors.registry.response(response_codec, 400, 40097, "Expected a list of requests.")
+        if len(batch) > self.max_requests:
+            return canned_errors.registry.response(
+                response_codec, 413, 41301, "Too many requests in batch; maximum is %s." % self.max_requests)
+
+        # Cookies set by requests in the batch
+        request.batch_cookies = SimpleCookie()
+
+        atomic = request.GET.get('atomic', '').lower() in ('1', 'true', 'yes')
+        if atomic:
+            results = self.run_atomic(request, batch, request_codec, response_codec)
+        else:
+            results = self.run(request, batch, request_codec, response_codec)
+
+        response = HttpResponse(encoders.dumps(response_codec, results), content_type=response_codec.CONTENT_TYPE)
+        response.cookies.update(request.batch_cookies)
+        return response
+
+    def run(self, request, batch, request_codec, response_codec):
+        """
+        Dispatch requests; consecutive safe requests are dispatched concurrently until a change is made.
+        """
+        results = [None] * len(batch)
+        pending = []
+        changed = []
+
+        def dispatch_pending():
+            workers = min(self.workers, len(pending))
+            if workers > 1 and not changed:
+                # Each worker is given a share of the requests so database connections are only opened
+                # (and closed) once per worker.
+                shares = [pending[offset::workers] for offset in range(workers)]
+                share_results = self.pool.map(
+                    lambda share: self.dispatch_in_thread(
+                        request, [batch[idx] for idx in share], request_codec, response_codec),
+                    shares)
+                for share, share_result in zip(shares, share_results):
+                    for idx, result in zip(share, share_result):
+                        results[idx] = result
+            else:
+                for idx in pending:
+                    results[idx] = self.dispatch(request, batch[idx], request_codec, response_codec)
+            del pending[:]
+
+        for idx, batch_request in enumerate(batch):
+            if batch_request.method.upper() in SAFE_METHODS:
+                pending.append(idx)
+            else:
+                dispatch_pending()
+                results[idx] = self.dispatch(request, batch_request, request_codec, response_codec)
+                changed.append(idx)
+        dispatch_pending()
+
+        return results
+
+    def run_atomic(self, request, batch, request_codec, response_codec, databases=None):
+        """
+        Dispatch requests sequentially in a transaction on each of the databases changed by the batch.
+        """
+        if databases is None:
+            databases = self.write_databases(batch)
+        if not databases:
+            return [self.dispatch(request, r, request_codec, response_codec) for r in batch]
+
+        with transaction.atomic(using=databases[0]):
+            results = self.run_atomic(request, batch, request_codec, response_codec, databases[1:])
+            if any(result.status >= 400 for result in results):
+                transaction.set_rollback(True, using=databases[0])
+        return results
+
+    def write_databases(self, batch):
+        """
+        Database aliases that the requests of a batch that make changes are written to.
+        """
+        databases = set()
+        for batch_request in batch:
+            if batch_request.method.upper() not in SAFE_METHODS:
+                resolved = self.dispatcher.resolve_route(batch_request.path.lstrip('/').partition('?')[0])
+                if resolved is not None:
+                    databases.add(getattr(resolved[0], 'write_database', DEFAULT_DB_ALIAS))
+        return sorted(databases) or [DEFAULT_DB_ALIAS]
+
+    def dispatch_in_thread(self, request, batch_requests, request_codec, response_codec):
+        try:
+            return [self.dispatch(request, r, request_codec, response_codec) for r in batch_requests]
+        finally:
+            # Database connections are per thread, close them so they are not leaked by the pool.
+            for connection in connections.all():
+                connection.close()
+
+    def dispatch(self, request, batch_request, request_codec, response_codec):
+        """
+        Dispatch a single request from a batch.
+
+        :returns: ``BatchResult`` resource.
+
+        """
+        path, _, query_string = batch_request.path.lstrip('/').partition('?')
+        resolved = self.dispatcher.resolve_route(path)
+        if resolved is None:
+            return BatchResult(404, body=Error(404, 40400, "No API matches the given path."))
+        resource_api, route_key, kwargs = resolved
+
+        sub_request = self.make_request(request, batch_request, path, query_string, request_codec, response_codec)
+        response = resource_api.wrap_view(route_key)(sub_request, **kwargs)
+
+        if hasattr(response, 'resource'):
+            resource = response.resource
+        else:
+            # Response has already been generated (eg a canned error)
+            content = b''.join(response.streaming_content) if response.streaming else response.content
+            resource = None
+            if content:
+                if response.get('Content-Type', '').startswith(response_codec.CONTENT_TYPE):
+                    resource = response_codec.loads(content)
+                else:
+                    resource = content.decode('UTF8', 'replace')
+
+        if response.cookies and hasattr(request, 'batch_cookies'):
+            request.batch_cookies.update(response.cookies)
+
+        status = response.status_code
+        headers = dict((k, v) for k, v in response.items() if k != 'Content-Type') or None
+
+        return BatchResult(status, headers, resource)
+
+    @staticmethod
+    def make_request(request, batch_request, path, query_string, request_codec, response_codec):
+        """
+        Generate a request for a single request in a batch from the batch request.
+        """
+        method = batch_request.method.upper()
+
+        sub_request = copy.copy(request)
+        sub_request.method = method
+        sub_request.path = sub_request.path_info = request.path.rsplit('_batch', 1)[0] + path
+        sub_request.META = dict(request.META, REQUEST_METHOD=method, QUERY_STRING=query_string)
+        sub_request.META.pop('HTTP_CONTENT_ENCODING', None)
+        # Results are encoded (and compressed) as part of the batch response
+        sub_request.META.pop('HTTP_ACCEPT_ENCODING', None)
+        sub_request.embed_resource = True
+        sub_request.GET = QueryDict(query_string)
+        batch_cookies = getattr(request, 'batch_cookies', None)
+        if batch_cookies:
+            sub_request.COOKIES = dict(request.COOKIES)
+            sub_request.COOKIES.update((key, morsel.value) for key, morsel in batch_cookies.items())
+        sub_request._body = b'' if batch_request.body is None else request_codec.dumps(batch_request.body)
+        sub_request.request_codec = request_codec
+        sub_request.response_codec = response_codec
+        return sub_request
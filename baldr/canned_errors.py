@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+Pre-encoded error responses.
+
+Common errors (404, 405, 403 etc) are generated with the same content on
+every request; rather than building an ``Error`` resource and encoding it
+each time the encoded content is cached per codec and error so only a new
+``HttpResponse`` needs to be created.
+
+Views can also return an error response directly (rather than raising an
+exception) using ``ResourceApi.error_response``.
+
+"""
+from __future__ import absolute_import
+import threading
+from collections import OrderedDict
+from django.http import HttpResponse
+from baldr.resources import Error
+
+__all__ = ('CannedErrors', 'registry')
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+class CannedErrors(object):
+    """
+    Cache of encoded error responses.
+
+    :param max_entries: Maximum number of encoded errors that are cached; once reached the least
+        recently used error is evicted. This bounds memory use when error messages include request
+        data (one-off errors are evicted rather than crowding out common errors).
+
+    """
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._content = OrderedDict()
+        self._lock = threading.Lock()
+
+    def clear(self):
+        with self._lock:
+            self._content.clear()
+
+    def encode(self, codec, status, sub_status, message, developer_message=None, meta=None):
+        """
+        Get the encoded content of an error.
+        """
+        try:
+            key = (codec.CONTENT_TYPE, status, sub_status, message, developer_message, _freeze(meta))
+            with self._lock:
+                # Re-insert to mark as most recently used
+                content = self._content.pop(key, None)
+                if content is not None:
+                    self._content[key] = content
+        except TypeError:
+            # Un-hashable meta data
+            key = content = None
+
+        if content is None:
+            content = codec.dumps(Error(status, sub_status, message, developer_message, meta))
+            if isinstance(content, type(u'')):
+                content = content.encode('utf8')
+            if key is not None and self.max_entries:
+                with self._lock:
+                    self._content[key] = content
+                    while len(self._content) > self.max_entries:
+                        self._content.popitem(last=False)
+        return content
+
+    def response(self, codec, status, sub_status, message, developer_message=None, meta=None, headers=None):
+        """
+        Generate an ``HttpResponse`` for an error.
+        """
+        content = self.encode(codec, status, sub_status, message, developer_message, meta)
+        return self._response(codec, content, status, sub_status, headers)
+
+    def resource_response(self, codec, resource, status=None, headers=None):
+        """
+        Generate an ``HttpResponse`` for an ``Error`` resource.
+        """
+        content = self.encode(codec, resource.status, resource.sub_status, resource.message,
+                              resource.developer_message, resource.meta)
+        return self._response(codec, content, status or resource.status, resource.sub_status, headers)
+
+    @staticmethod
+    def _response(codec, content, status, sub_status, headers):
+        response = HttpResponse(content, content_type=codec.CONTENT_TYPE, status=status)
+        response.sub_status = sub_status
+        for key, value in (headers or {}).items():
+            response[key] = value
+        return response
+
+
+registry = CannedErrors()
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""
+Coalescing (single-flight) of identical concurrent requests.
+
+When enabled, identical ``GET`` (and ``HEAD``) requests that arrive while a
+matching request is being handled wait for that request to complete and
+share its response rather than repeating the same work::
+
+    class BookApi(ResourceApi):
+        coalesce_requests = True
+
+        @detail(coalesce=CacheBackend())
+        def book_detail(self, request, resource_id):
+            ...
+
+Requests are matched on the API, route, URL arguments, query string,
+response content type and the headers listed in ``coalesce_vary_headers``
+(by default ``Authorization``, ``Cookie`` and ``Accept-Encoding`` so
+responses are never shared between users).
+
+``LocalBackend`` coalesces requests across threads of a single process,
+``CacheBackend`` uses a Django cache to coalesce requests across processes.
+Only complete (non-streaming) responses without a server error are shared.
+
+"""
+from __future__ import absolute_import
+import hashlib
+import threading
+import time
+import uuid
+from django.core.cache import caches
+from django.http import HttpResponse
+
+__all__ = ('LocalBackend', 'CacheBackend', 'default_backend', 'request_key')
+
+
+def request_key(request, api_name, route_key, kwargs, content_type, vary_headers):
+    """
+    Generate the key that identical requests share.
+    """
+    parts = [request.method, api_name, route_key, repr(sorted(kwargs.items())),
+             request.META.get('QUERY_STRING', ''), str(content_type)]
+    parts.extend(request.META.get(header, '') for header in vary_headers)
+    return hashlib.sha1('\n'.join(parts).encode('utf8')).hexdigest()
+
+
+def freeze_response(response):
+    """
+    Snapshot a response so it can be shared; ``None`` if the response cannot be shared.
+    """
+    if response.streaming or response.status_code >= 500:
+        return
+    return (response.status_code, getattr(response, 'sub_status', None), list(response.items()),
+            response.content)
+
+
+def thaw_response(frozen):
+    """
+    Generate a new response from a snapshot.
+    """
+    status, sub_status, headers, content = frozen
+    response = HttpResponse(content, status=status)
+    response.sub_status = sub_status
+    for key, value in headers:
+        response[key] = value
+    return response
+
+
+class Flight(object):
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+
+
+class LocalBackend(object):
+    """
+    Coalesce requests handled by threads in the current process.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+
+    def run(self, key, func, timeout):
+        """
+        Run ``func`` unless a call with the same key is in flight, in which case wait for its result.
+
+        :param key: Key identifying identical calls.
+        :param func: Function that generates a response.
+        :param timeout: Maximum time to wait for the response of another call; after this (or if
+            the response cannot be shared) ``func`` is called.
+
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = Flight()
+
+        if leader:
+            try:
+                response = func()
+                flight.result = freeze_response(response)
+                return response
+            finally:
+                with self._lock:
+                    del self._flights[key]
+                flight.event.set()
+
+        if flight.event.wait(timeout) and flight.result is not None:
+            return thaw_response(flight.result)
+        return func()
+
+
+class CacheBackend(object):
+    """
+    Coalesce requests across processes using a Django cache.
+
+    The cache must support an atomic ``add`` (eg Memcached or Redis) for requests to be coalesced
+    reliably.
+
+    :param cache_alias: Name of the cache to use.
+    :param key_prefix: Prefix applied to cache keys.
+    :param lock_timeout: Expiry (in seconds) of the lock held while a request is handled.
+    :param poll_interval: Interval (in seconds) that waiting requests poll for a response.
+
+    """
+    def __init__(self, cache_alias='default', key_prefix='baldr.coalesce', lock_timeout=30, poll_interval=0.01):
+        self.cache_alias = cache_alias
+        self.key_prefix = key_prefix
+        self.lock_timeout = lock_timeout
+        self.poll_interval = poll_interval
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def run(self, key, func, timeout):
+        """
+        Run ``func`` unless a call with the same key is in flight, in which case wait for its result.
+        """
+        cache = self.cache
+        lock_key = '%s:%s' % (self.key_prefix, key)
+        token = uuid.uuid4().hex
+
+        if cache.add(lock_key, token, self.lock_timeout):
+            result_key = '%s:%s' % (lock_key, token)
+            try:
+                response = func()
+                frozen = freeze_response(response)
+                # Always store the result so waiting requests stop polling
+                cache.set(result_key, frozen or False, max(int(timeout), 1))
+                return response
+            finally:
+                cache.delete(lock_key)
+
+        deadline = time.time() + timeout
+        leader_token = cache.get(lock_key)
+        if leader_token:
+            result_key = '%s:%s' % (lock_key, leader_token)
+            while time.time() < deadline:
+                frozen = cache.get(result_key)
+                if frozen is not None:
+                    if frozen:
+                        return thaw_response(frozen)
+                    break
+                if cache.get(lock_key) != leader_token:
+                    # Lock released; check for a result stored just before release (if the leader failed
+                    # there will not be one).
+                    frozen = cache.get(result_key)
+                    if frozen:
+                        return thaw_response(frozen)
+                    break
+                time.sleep(self.poll_interval)
+        return func()
+
+
+default_backend = LocalBackend()
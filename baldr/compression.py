@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+"""
+Content-coding (compression) of responses and request bodies.
+
+Response compression is enabled for a resource API (or individual routes)::
+
+    class BookApi(ResourceApi):
+        compress_responses = True
+        compress_min_size = 1024
+
+        @listing(compress_min_size=4096)
+        def book_list(self, request, offset, limit):
+            ...
+
+The coding is negotiated from the ``Accept-Encoding`` header; ``gzip`` and
+``deflate`` are always available, ``zstd`` is available if the
+``zstandard`` package is installed. Streamed responses are compressed
+incrementally.
+
+Request bodies with a ``Content-Encoding`` header are decompressed
+transparently; to guard against decompression bombs the decompressed body is
+limited to ``settings.BALDR_MAX_DECOMPRESSION_RATIO`` (default 100) times the
+size of the compressed body.
+
+"""
+from __future__ import absolute_import
+from collections import OrderedDict
+import io
+import zlib
+from django.utils.cache import patch_vary_headers
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+__all__ = ('CODINGS', 'DecompressionError', 'DecompressionLimitExceeded', 'negotiate_coding',
+           'compress_response', 'decompress')
+
+IDENTITY = 'identity'
+
+
+class DecompressionError(ValueError):
+    """
+    Content could not be decompressed.
+    """
+
+
+class DecompressionLimitExceeded(DecompressionError):
+    """
+    Decompressed content exceeds the size limit.
+    """
+
+
+class ZlibCoding(object):
+    """
+    Coding provided by the ``zlib`` module (gzip and deflate).
+    """
+    default_level = 6
+
+    def __init__(self, name, wbits):
+        self.name = name
+        self.wbits = wbits
+
+    def compressobj(self, level=None):
+        return zlib.compressobj(level or self.default_level, zlib.DEFLATED, self.wbits)
+
+    def decompress(self, data, max_size):
+        decompressor = zlib.decompressobj(self.wbits)
+        try:
+            content = decompressor.decompress(data, max_size + 1)
+            if len(content) <= max_size:
+                content += decompressor.flush()
+        except zlib.error as ex:
+            raise DecompressionError(str(ex))
+        if len(content) > max_size:
+            raise DecompressionLimitExceeded("Decompressed content exceeds %s bytes." % max_size)
+        return content
+
+
+class ZstdCoding(object):
+    """
+    Zstandard coding provided by the ``zstandard`` package.
+    """
+    name = 'zstd'
+    default_level = 3
+
+    def compressobj(self, level=None):
+        return zstandard.ZstdCompressor(level=level or self.default_level).compressobj()
+
+    def decompress(self, data, max_size):
+        reader = zstandard.ZstdDecompressor().stream_reader(io.BytesIO(data))
+        chunks = []
+        size = 0
+        try:
+            while size <= max_size:
+                chunk = reader.read(max_size + 1 - size)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+                size += len(chunk)
+        except zstandard.ZstdError as ex:
+            raise DecompressionError(str(ex))
+        if size > max_size:
+            raise DecompressionLimitExceeded("Decompressed content exceeds %s bytes." % max_size)
+        return b''.join(chunks)
+
+
+# Supported codings in order of preference.
+CODINGS = OrderedDict()
+if zstandard is not None:
+    CODINGS['zstd'] = ZstdCoding()
+CODINGS['gzip'] = ZlibCoding('gzip', 16 + zlib.MAX_WBITS)
+CODINGS['deflate'] = ZlibCoding('deflate', zlib.MAX_WBITS)
+
+
+def parse_accept_encoding(value):
+    """
+    Parse an ``Accept-Encoding`` header into a dict of quality values keyed by coding.
+    """
+    codings = {}
+    for item in value.split(','):
+        parts = item.split(';')
+        coding = parts[0].strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in parts[1:]:
+            key, _, param_value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    quality = float(param_value)
+                except ValueError:
+                    quality = 0.0
+        codings[coding] = quality
+    return codings
+
+
+def negotiate_coding(request, codings=None):
+    """
+    Select the coding used to compress a response from the ``Accept-Encoding`` header of a request.
+
+    :returns: The selected coding; or ``None`` if the response should not be compressed.
+
+    """
+    value = request.META.get('HTTP_ACCEPT_ENCODING')
+    if not value:
+        return
+
+    codings = CODINGS if codings is None else codings
+    accepted = parse_accept_encoding(value)
+    wildcard = accepted.get('*', 0)
+    best = None
+    best_quality = 0
+    for name, coding in codings.items():
+        quality = accepted.get(name, wildcard)
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    if best is not None and best_quality >= accepted.get(IDENTITY, 0):
+        return best
+
+
+def compress_stream(coding, content, level=None):
+    """
+    Incrementally compress an iterable of byte strings.
+    """
+    compressor = coding.compressobj(level)
+    for chunk in content:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def compress_response(request, response, min_size=0, level=None, codings=None):
+    """
+    Compress a response using the coding negotiated with the client.
+
+    Responses that are already encoded, are smaller than ``min_size`` or do not have a body are not
+    compressed.
+
+    """
+    if response.status_code in (204, 304) or response.has_header('Content-Encoding'):
+        return response
+
+    patch_vary_headers(response, ('Accept-Encoding',))
+    coding = negotiate_coding(request, codings)
+    if coding is None:
+        return response
+
+    if response.streaming:
+        response.streaming_content = compress_stream(coding, response.streaming_content, level)
+        if response.has_header('Content-Length'):
+            del response['Content-Length']
+    else:
+        content = response.content
+        if len(content) < min_size:
+            return response
+        compressor = coding.compressobj(level)
+        compressed = compressor.compress(content) + compressor.flush()
+        if len(compressed) >= len(content):
+            return response
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+
+    response['Content-Encoding'] = coding.name
+    return response
+
+
+def decompress(content_encoding, data, max_ratio, max_size=None):
+    """
+    Decompress data encoded with one (or more) codings.
+
+    :param content_encoding: Value of the ``Content-Encoding`` header.
+    :param data: Compressed data.
+    :param max_ratio: Maximum ratio of decompressed to compressed size.
+    :param max_size: Absolute maximum size of decompressed data.
+    :raises KeyError: A coding is not supported.
+    :raises DecompressionError: Data could not be decompressed or exceeds size limits.
+
+    """
+    limit = len(data) * max_ratio
+    if max_size is not None:
+        limit = min(limit, max_size)
+
+    # Codings are listed in the order they were applied.
+    for name in reversed([n.strip().lower() for n in content_encoding.split(',')]):
+        if name and name != IDENTITY:
+            data = CODINGS[name].decompress(data, limit)
+    return data
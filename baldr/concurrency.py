@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""
+Limits on the number of requests handled concurrently.
+
+Limits can be applied to an entire resource API or to individual routes::
+
+    class BookApi(ResourceApi):
+        max_concurrency = 16
+
+        @listing(max_concurrency=4)
+        def book_list(self, request, offset, limit):
+            ...
+
+Once a limit is reached requests wait in a bounded queue (see
+``concurrency_queue_size`` and ``concurrency_timeout``); if the queue is full
+or the timeout expires a ``503 Service Unavailable`` response is returned
+with a ``Retry-After`` header rather than tying up a worker.
+
+An ``AdaptiveConcurrencyLimiter`` instance can be supplied in place of a
+number to tighten the limit while the observed latency of a route rises.
+
+"""
+from __future__ import absolute_import
+import threading
+import timeit
+
+__all__ = ('ConcurrencyLimiter', 'AdaptiveConcurrencyLimiter', 'make_limiter')
+
+
+class ConcurrencyLimiter(object):
+    """
+    Limit the number of concurrent calls.
+
+    :param max_concurrency: Maximum number of concurrent calls.
+    :param max_queue: Maximum number of calls that can wait for a slot.
+    :param timeout: Maximum time (in seconds) a call will wait for a slot; ``None`` to wait
+        indefinitely.
+
+    """
+    def __init__(self, max_concurrency, max_queue=0, timeout=None):
+        assert max_concurrency > 0, "max_concurrency must be at least 1"
+        self.limit = max_concurrency
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.active = 0
+        self.waiting = 0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        """
+        Acquire a slot.
+
+        :returns: ``True`` if a slot was acquired; ``False`` if the queue is full or the timeout expired.
+
+        """
+        with self._condition:
+            if self.active < self.limit:
+                self.active += 1
+                return True
+
+            if self.waiting >= self.max_queue:
+                return False
+
+            self.waiting += 1
+            try:
+                if self.timeout is not None:
+                    deadline = timeit.default_timer() + self.timeout
+                while self.active >= self.limit:
+                    if self.timeout is None:
+                        self._condition.wait()
+                    else:
+                        remaining = deadline - timeit.default_timer()
+                        if remaining <= 0:
+                            return False
+                        self._condition.wait(remaining)
+                self.active += 1
+                return True
+            finally:
+                self.waiting -= 1
+
+    def release(self, duration=None):
+        """
+        Release a slot.
+
+        :param duration: Time (in seconds) the slot was held for.
+
+        """
+        with self._condition:
+            self.active -= 1
+            self.observe(duration)
+            self._condition.notify()
+
+    def observe(self, duration):
+        """
+        Observe the duration of a call; called with the lock held.
+        """
+
+
+class AdaptiveConcurrencyLimiter(ConcurrencyLimiter):
+    """
+    Concurrency limiter that adjusts the limit using the latency of calls.
+
+    An exponentially weighted moving average of latency is maintained; once every ``limit`` calls the
+    limit is reduced by ``backoff`` if the average is more than ``latency_tolerance`` times the baseline
+    latency, otherwise it is increased by one (up to ``max_concurrency``).
+
+    The baseline is the lowest average observed over the last ``baseline_window`` adjustments (so the
+    baseline follows lasting changes in latency, eg a slower database, instead of only decreasing).
+
+    :param max_concurrency: Maximum number of concurrent calls.
+    :param min_concurrency: Lower bound of the limit.
+    :param max_queue: Maximum number of calls that can wait for a slot.
+    :param timeout: Maximum time (in seconds) a call will wait for a slot.
+    :param latency_tolerance: Ratio of the current to lowest latency at which the limit is reduced.
+    :param smoothing: Weight given to each observation in the moving average.
+    :param backoff: Factor the limit is multiplied by when reduced.
+    :param baseline_window: Number of adjustments after which the baseline is reset to the lowest
+        average observed since the previous reset.
+
+    """
+    def __init__(self, max_concurrency, min_concurrency=1, max_queue=0, timeout=None, latency_tolerance=2.0,
+                 smoothing=0.1, backoff=0.75, baseline_window=20):
+        super(AdaptiveConcurrencyLimiter, self).__init__(max_concurrency, max_queue, timeout)
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.latency_tolerance = latency_tolerance
+        self.smoothing = smoothing
+        self.backoff = backoff
+        self.baseline_window = baseline_window
+        self.latency = None
+        self.baseline_latency = None
+        self._window_latency = None
+        self._observations = 0
+        self._adjustments = 0
+
+    def observe(self, duration):
+        if duration is None:
+            return
+
+        if self.latency is None:
+            self.latency = duration
+        else:
+            self.latency = self.smoothing * duration + (1 - self.smoothing) * self.latency
+        if self.baseline_latency is None or self.latency < self.baseline_latency:
+            self.baseline_latency = self.latency
+        if self._window_latency is None or self.latency < self._window_latency:
+            self._window_latency = self.latency
+
+        self._observations += 1
+        if self._observations < self.limit:
+            return
+        self._observations = 0
+
+        if self.latency > self.baseline_latency * self.latency_tolerance:
+            self.limit = max(self.min_concurrency, int(self.limit * self.backoff))
+        elif self.limit < self.max_concurrency:
+            self.limit += 1
+            self._condition.notify()
+
+        self._adjustments += 1
+        if self._adjustments >= self.baseline_window:
+            self._adjustments = 0
+            self.baseline_latency = self._window_latency
+            self._window_latency = None
+
+
+def make_limiter(value, max_queue=0, timeout=None):
+    """
+    Make a limiter from a limit (or return a limiter instance as is).
+
+    :returns: A ``ConcurrencyLimiter``; or ``None`` if the value is not set.
+
+    """
+    if value is None or isinstance(value, ConcurrencyLimiter):
+        return value
+    return ConcurrencyLimiter(value, max_queue, timeout)
@@ -0,0 +1,316 @@
+# -*- coding: utf-8 -*-
+"""
+Compiled decoders and validators for resources.
+
+Building a resource with the Odin codecs (and validating it with
+``full_clean``) walks the field metadata of the resource for every object
+decoded; resolving the resource type, looking up defaults, clean methods
+and read-only fields as it goes.
+
+The first time a resource type is decoded (or validated) a function is
+compiled for it that has this resolved in advance; values are read from
+the decoded dict and converted (with fast paths for values that are
+already of the correct type for string, numeric and boolean fields),
+checked and assigned to the new resource directly.
+
+Decoding and validation behave the same as the Odin codecs, including the
+``message_dict`` of any ``ValidationError``::
+
+    >>> from baldr import decoders
+    >>> book = decoders.loads(json_codec, body, Book)
+
+Documents of a different type to the requested resource (eg a sub-class
+identified by the type field) and composite fields are handled by Odin.
+
+"""
+from __future__ import absolute_import
+import re
+import six
+from odin import resources
+from odin.codecs import json_codec
+from odin.exceptions import CodecDecodeError, ValidationError
+from odin.fields import BooleanField, Field, FloatField, IntegerField, NotProvided, StringField
+from odin.utils import getmeta
+
+try:
+    from odin.codecs import msgpack_codec
+    import msgpack
+except ImportError:
+    msgpack_codec = None
+
+__all__ = ('build', 'full_clean', 'get_decoder', 'get_validator', 'loads')
+
+# Value types that are returned as is by the ``to_python`` method of a field.
+FIELD_TYPES = (
+    (BooleanField, (bool,)),
+    (FloatField, (float,)),
+    (IntegerField, six.integer_types),
+    (StringField, (str, six.text_type)),
+)
+
+IDENTIFIER = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+_decoders = {}
+_validators = {}
+
+
+def _func(method):
+    return getattr(method, '__func__', method)
+
+
+def _attribute(name, attname, namespace):
+    """
+    Expression to access an attribute of a resource ``r``.
+    """
+    if IDENTIFIER.match(attname):
+        return "r.%s" % attname
+    namespace[name] = attname
+    return "getattr(r, %s)" % name
+
+
+def _to_python(field, idx, value, namespace):
+    """
+    Expression to convert a value with the ``to_python`` method of a field.
+    """
+    namespace['to_python_%s' % idx] = field.to_python
+    expression = "to_python_%s(%s)" % (idx, value)
+    for field_type, value_types in FIELD_TYPES:
+        if isinstance(field, field_type) and _func(field.__class__.to_python) is _func(field_type.to_python):
+            namespace['types_%s' % idx] = frozenset(value_types)
+            return "%s if %s.__class__ in types_%s else %s" % (value, value, idx, expression)
+    return expression
+
+
+def compile_decoder(resource_type):
+    """
+    Compile a decoder function for a resource type.
+
+    The function is called with the decoded ``dict`` and the ``default_to_not_provided`` flag.
+    """
+    meta = getmeta(resource_type)
+    namespace = {
+        'resource_type': resource_type,
+        'NotProvided': NotProvided,
+        'ValidationError': ValidationError,
+    }
+
+    lines = ["def decoder(d, default_to_not_provided):", "    errors = {}"]
+    for idx, field in enumerate(meta.init_fields):
+        value = "v%s" % idx
+        if field.use_default_if_not_provided:
+            namespace['default_%s' % idx] = field.get_default
+            default = "default_%s()" % idx
+        else:
+            default = "None"
+        lines.extend([
+            "    %s = d.get(%r, NotProvided)" % (value, field.name),
+            "    if %s is NotProvided:" % value,
+            "        if not default_to_not_provided:",
+            "            %s = %s" % (value, default),
+            "    else:",
+            "        try:",
+            "            %s = %s" % (value, _to_python(field, idx, value, namespace)),
+            "        except ValidationError as ve:",
+            "            errors[%r] = ve.error_messages" % field.name,
+        ])
+    lines.extend([
+        "    if errors:",
+        "        raise ValidationError(errors)",
+    ])
+
+    if (_func(resource_type.__init__) is _func(resources.ResourceBase.__init__) and
+            resource_type.__setattr__ is object.__setattr__):
+        lines.append("    r = resource_type.__new__(resource_type)")
+        for idx, field in enumerate(meta.init_fields):
+            attribute = _attribute('attname_%s' % idx, field.attname, namespace)
+            if attribute.startswith('r.'):
+                lines.append("    %s = v%s" % (attribute, idx))
+            else:
+                lines.append("    setattr(r, attname_%s, v%s)" % (idx, idx))
+    else:
+        lines.append("    r = resource_type(%s)" % ", ".join("v%s" % idx for idx in range(len(meta.init_fields))))
+
+    if _func(resource_type.extra_attrs) is not _func(resources.ResourceBase.extra_attrs):
+        namespace['field_names'] = frozenset(f.name for f in meta.init_fields)
+        lines.extend([
+            "    extra = dict((k, v) for k, v in d.items() if k not in field_names)",
+            "    if extra:",
+            "        r.extra_attrs(extra)",
+        ])
+    lines.append("    return r")
+
+    source = "\n".join(lines) + "\n"
+    six.exec_(compile(source, "<baldr decoder: %s>" % meta.resource_name, 'exec'), namespace)
+    return namespace['decoder']
+
+
+def compile_validator(resource_type):
+    """
+    Compile a validation (``full_clean``) function for a resource type.
+
+    The function is called with the resource, fields to exclude and the ``ignore_not_provided`` flag.
+    """
+    meta = getmeta(resource_type)
+    namespace = {
+        'NotProvided': NotProvided,
+        'ValidationError': ValidationError,
+    }
+
+    lines = ["def validator(r, exclude, ignore_not_provided):", "    errors = {}"]
+    for idx, field in enumerate(meta.fields):
+        attribute = _attribute('attname_%s' % idx, field.attname, namespace)
+        skip = "ignore_not_provided and value is NotProvided"
+        if field.null:
+            skip = "value is None or (%s)" % skip
+
+        if isinstance(field, Field) and _func(field.__class__.clean) is _func(Field.clean):
+            # Expand the clean method of the field
+            if field.use_default_if_not_provided:
+                namespace['default_%s' % idx] = field.get_default
+                default = "default_%s()" % idx
+            else:
+                default = "None"
+            namespace['validate_%s' % idx] = field.validate
+            clean = [
+                "cleaned = %s if value is NotProvided else value" % default,
+                "cleaned = %s" % _to_python(field, idx, 'cleaned', namespace),
+                "validate_%s(cleaned)" % idx,
+            ]
+            if field.validators:
+                namespace['run_validators_%s' % idx] = field.run_validators
+                clean.append("run_validators_%s(cleaned)" % idx)
+            clean.append("value = cleaned")
+        else:
+            namespace['clean_%s' % idx] = field.clean
+            clean = ["value = clean_%s(value)" % idx]
+
+        lines.extend([
+            "    if not exclude or %r not in exclude:" % field.name,
+            "        value = %s" % attribute,
+            "        if not (%s):" % skip,
+            "            try:",
+        ])
+        lines.extend("                " + line for line in clean)
+        lines.extend([
+            "            except ValidationError as e:",
+            "                errors[%r] = e.messages" % field.name,
+        ])
+
+        clean_method = getattr(resource_type, "clean_%s" % field.attname, None)
+        if callable(clean_method):
+            lines.extend([
+                "            try:",
+                "                value = r.clean_%s(value)" % field.attname,
+                "            except ValidationError as e:",
+                "                errors.setdefault(%r, []).extend(e.messages)" % field.name,
+            ])
+
+        if field not in meta.readonly_fields:
+            if attribute.startswith('r.'):
+                lines.append("            %s = value" % attribute)
+            else:
+                lines.append("            setattr(r, attname_%s, value)" % idx)
+
+    if _func(resource_type.clean) is not _func(resources.ResourceBase.clean):
+        lines.extend([
+            "    try:",
+            "        r.clean()",
+            "    except ValidationError as e:",
+            "        errors = e.update_error_dict(errors)",
+        ])
+    lines.extend([
+        "    if errors:",
+        "        raise ValidationError(errors)",
+    ])
+
+    source = "\n".join(lines) + "\n"
+    six.exec_(compile(source, "<baldr validator: %s>" % meta.resource_name, 'exec'), namespace)
+    return namespace['validator']
+
+
+def get_decoder(resource_type):
+    """
+    Get the (compiled) decoder for a resource type.
+    """
+    decoder = _decoders.get(resource_type)
+    if decoder is None:
+        decoder = _decoders[resource_type] = compile_decoder(resource_type)
+    return decoder
+
+
+def get_validator(resource_type):
+    """
+    Get the (compiled) validator for a resource type.
+    """
+    validator = _validators.get(resource_type)
+    if validator is None:
+        validator = _validators[resource_type] = compile_validator(resource_type)
+    return validator
+
+
+def full_clean(resource, exclude=None, ignore_not_provided=False):
+    """
+    Validate a resource; equivalent to ``resource.full_clean()``.
+
+    :raises ValidationError: If validation fails.
+
+    """
+    resource_type = resource.__class__
+    if _func(resource_type.full_clean) is not _func(resources.ResourceBase.full_clean) or \
+            _func(resource_type.clean_fields) is not _func(resources.ResourceBase.clean_fields):
+        # Validation has been customised
+        return resource.full_clean(exclude, ignore_not_provided)
+    get_validator(resource_type)(resource, exclude, ignore_not_provided)
+
+
+# ``build`` has an argument of the same name
+_full_clean = full_clean
+
+
+def build(d, resource, full_clean=True, default_to_not_supplied=False):
+    """
+    Build a resource (or list of resources) from decoded data; equivalent to
+    ``odin.resources.build_object_graph``.
+    """
+    if isinstance(d, list):
+        return [build(o, resource, full_clean, default_to_not_supplied) for o in d]
+    if not isinstance(d, dict):
+        return d
+
+    if not (isinstance(resource, type) and issubclass(resource, resources.ResourceBase)):
+        return resources.create_resource_from_dict(d, resource, full_clean, False, default_to_not_supplied)
+    meta = getmeta(resource)
+    document_resource_name = d.get(meta.type_field)
+    if document_resource_name and document_resource_name != meta.resource_name:
+        return resources.create_resource_from_dict(d, resource, full_clean, False, default_to_not_supplied)
+
+    new_resource = get_decoder(resource)(d, default_to_not_supplied)
+    if full_clean:
+        _full_clean(new_resource)
+    return new_resource
+
+
+def _json_loads(s, resource, full_clean, default_to_not_supplied):
+    try:
+        return build(json_codec.json.loads(s), resource, full_clean, default_to_not_supplied)
+    except (ValueError, TypeError) as ex:
+        raise CodecDecodeError(str(ex))
+
+
+def _msgpack_loads(s, resource, full_clean, default_to_not_supplied):
+    return build(msgpack.loads(s, encoding='UTF8'), resource, full_clean, default_to_not_supplied)
+
+
+COMPILED_LOADS = {json_codec: _json_loads}
+if msgpack_codec is not None:
+    COMPILED_LOADS[msgpack_codec] = _msgpack_loads
+
+
+def loads(codec, s, resource=None, full_clean=True, default_to_not_supplied=False):
+    """
+    Load a resource using compiled decoders if they are supported by the codec.
+    """
+    compiled_loads = COMPILED_LOADS.get(codec)
+    if compiled_loads is None or resource is None:
+        return codec.loads(s, resource=resource, full_clean=full_clean, default_to_not_supplied=default_to_not_supplied)
+    return compiled_loads(s, resource, full_clean, default_to_not_supplied)
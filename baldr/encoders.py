@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+"""
+Compiled encoders for resources.
+
+The Odin JSON and MessagePack codecs convert every resource (including each
+resource in a ``Listing``) by inspecting field metadata, preparing each
+value and building an intermediate dict from a generic encoder hook.
+
+The first time a resource type is encoded an encoder function is compiled
+for it; this converts a resource directly into a dict with the keys (and
+type field) in a fixed order, reads each field as a plain attribute and
+only applies converters to fields that require them (eg datetimes and
+nested resources). The dict is then encoded in a single pass by the
+underlying JSON/MessagePack encoder.
+
+Values of types the encoders do not know about are converted using the type
+registry of the codec (``json_codec.JSON_TYPES`` or
+``msgpack_codec.TYPE_SERIALIZERS``) so custom types registered with Odin are
+supported. The output of the compiled encoders is identical to that of the
+Odin codecs::
+
+    >>> from baldr import encoders
+    >>> encoders.dumps(json_codec, listing)
+
+Values that have already been encoded (eg to measure their size) can be
+supplied as an ``EncodedList``; the compiled encoder of the same codec inserts
+the encoded content into the output as is rather than encoding the values
+again.
+
+"""
+from __future__ import absolute_import
+import datetime
+import re
+import six
+import uuid
+from odin import bases, resources, serializers, ResourceAdapter
+from odin.codecs import json_codec
+from odin.exceptions import CodecEncodeError
+from odin.fields import BaseField, BooleanField, DictField, FloatField, IntegerField, ListField, StringField
+from odin.fields.composite import DictAs, DictOf, ListOf
+from odin.utils import getmeta
+
+try:
+    from odin.codecs import msgpack_codec
+    import msgpack
+except ImportError:
+    msgpack_codec = None
+
+__all__ = ('EncodedList', 'encode', 'get_encoder', 'json_dumps', 'msgpack_dumps', 'dumps')
+
+# Types that are encoded as is.
+NATIVE_TYPES = frozenset(six.string_types + six.integer_types + (float, bool, type(None), bytes))
+
+# Types converted when encoding (these match the Odin codecs).
+TYPE_SERIALIZERS = {
+    datetime.date: serializers.date_iso_format,
+    datetime.time: serializers.time_iso_format,
+    datetime.datetime: serializers.datetime_iso_format,
+    uuid.UUID: str,
+}
+
+LIST_TYPES = (list, tuple, bases.ResourceIterable)
+
+# Fields with values that can be encoded as is; any unexpected values are converted by the
+# ``default`` hook of the encoder.
+NATIVE_FIELDS = (BooleanField, FloatField, IntegerField, StringField)
+
+IDENTIFIER = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+_encoders = {}
+
+
+def _func(method):
+    return getattr(method, '__func__', method)
+
+
+class EncodedList(list):
+    """
+    List of values along with the content of each value encoded by the compiled encoder of a codec.
+
+    The compiled encoder of the codec inserts the encoded content into the output; any other encoder
+    treats this as a plain list.
+
+    :param values: Values in the list.
+    :param codec: Codec the values were encoded with.
+    :param content: Encoded content of each value.
+
+    """
+    def __init__(self, values, codec, content):
+        super(EncodedList, self).__init__(values)
+        self.codec = codec
+        self.content = content
+
+
+class _Splice(object):
+    """
+    Placeholder for an ``EncodedList`` that is replaced with the encoded content once the output has
+    been generated.
+    """
+    __slots__ = ('encoded_list', 'token')
+
+    def __init__(self, encoded_list):
+        self.encoded_list = encoded_list
+        self.token = u'\x00baldr-encoded-%s\x00' % uuid.uuid4().hex
+
+
+def convert(value):
+    """
+    Convert a value of a type that is not supported by the JSON/MessagePack encoders.
+    """
+    serializer = TYPE_SERIALIZERS.get(value.__class__)
+    return value if serializer is None else serializer(value)
+
+
+def encode(value):
+    """
+    Convert a value (resource, list of resources etc) into types that can be encoded natively.
+    """
+    if value.__class__ in NATIVE_TYPES:
+        return value
+
+    encoder = _encoders.get(value.__class__)
+    if encoder is not None:
+        return encoder(value)
+    if value.__class__ is EncodedList:
+        return _Splice(value)
+    if isinstance(value, resources.ResourceBase):
+        return get_encoder(value.__class__)(value)
+    if isinstance(value, ResourceAdapter):
+        meta = getmeta(value)
+        obj = dict((k, encode(v)) for k, v in value.to_dict().items())
+        obj[meta.type_field] = meta.resource_name
+        return obj
+    if isinstance(value, LIST_TYPES):
+        return [encode(i) for i in value]
+    if isinstance(value, dict):
+        return dict((k, encode(v)) for k, v in value.items())
+    return convert(value)
+
+
+def encode_list(value):
+    return None if value is None else [encode(i) for i in value]
+
+
+def encode_dict(value):
+    return None if value is None else dict((k, encode(v)) for k, v in value.items())
+
+
+def compile_encoder(resource_type):
+    """
+    Compile an encoder function for a resource type.
+    """
+    meta = getmeta(resource_type)
+    namespace = {
+        'encode': encode,
+        'encode_list': encode_list,
+        'encode_dict': encode_dict,
+        'convert': convert,
+    }
+
+    items = []
+    for idx, field in enumerate(meta.all_fields):
+        if (IDENTIFIER.match(field.attname) and
+                _func(field.__class__.value_from_object) is _func(BaseField.value_from_object)):
+            value = "r.%s" % field.attname
+        else:
+            namespace['value_%s' % idx] = field.value_from_object
+            value = "value_%s(r)" % idx
+
+        if _func(field.__class__.prepare) is not _func(BaseField.prepare):
+            namespace['prepare_%s' % idx] = field.prepare
+            value = "prepare_%s(%s)" % (idx, value)
+
+        if isinstance(field, ListOf):
+            value = "encode_list(%s)" % value
+        elif isinstance(field, DictOf):
+            value = "encode_dict(%s)" % value
+        elif isinstance(field, (DictAs, DictField, ListField)):
+            # Values of generic fields can contain (or be) resources
+            value = "encode(%s)" % value
+        elif not isinstance(field, NATIVE_FIELDS):
+            value = "convert(%s)" % value
+
+        items.append("%r: %s" % (str(field.name), value))
+    items.append("%r: %r" % (str(meta.type_field), meta.resource_name))
+
+    source = "def encoder(r):\n    return {%s}\n" % ", ".join(items)
+    six.exec_(compile(source, "<baldr encoder: %s>" % meta.resource_name, 'exec'), namespace)
+    return namespace['encoder']
+
+
+def get_encoder(resource_type):
+    """
+    Get the (compiled) encoder for a resource type.
+    """
+    encoder = _encoders.get(resource_type)
+    if encoder is None:
+        encoder = _encoders[resource_type] = compile_encoder(resource_type)
+    return encoder
+
+
+def _json_default(o):
+    value = encode(o)
+    if value is o:
+        serializer = json_codec.JSON_TYPES.get(o.__class__)
+        if serializer is None:
+            raise TypeError("%r is not JSON serializable" % o)
+        value = serializer(o)
+    return value
+
+
+def json_dumps(resource):
+    """
+    Dump a resource (or list of resources) to a JSON encoded string using compiled encoders.
+    """
+    splices = []
+
+    def default(o):
+        if o.__class__ is _Splice:
+            if o.encoded_list.codec is not json_codec:
+                return list(o.encoded_list)
+            splices.append(o)
+            return o.token
+        return _json_default(o)
+
+    try:
+        content = json_codec.json.dumps(encode(resource), default=default)
+    except ValueError as ex:
+        raise CodecEncodeError(str(ex))
+    for splice in splices:
+        content = content.replace(json_codec.json.dumps(splice.token),
+                                  '[%s]' % ', '.join(splice.encoded_list.content), 1)
+    return content
+
+
+def _msgpack_default(o):
+    value = encode(o)
+    if value is o:
+        serializer = msgpack_codec.TYPE_SERIALIZERS.get(o.__class__)
+        return None if serializer is None else serializer(o)
+    return value
+
+
+def msgpack_dumps(resource):
+    """
+    Dump a resource (or list of resources) to a MessagePack encoded string using compiled encoders.
+    """
+    splices = []
+
+    def default(o):
+        if o.__class__ is _Splice:
+            if o.encoded_list.codec is not msgpack_codec:
+                return list(o.encoded_list)
+            splices.append(o)
+            return o.token
+        return _msgpack_default(o)
+
+    packer = msgpack.Packer(default=default)
+    content = packer.pack(encode(resource))
+    for splice in splices:
+        items = splice.encoded_list.content
+        content = content.replace(packer.pack(splice.token), packer.pack_array_header(len(items)) + b''.join(items), 1)
+    return content
+
+
+COMPILED_DUMPS = {json_codec: json_dumps}
+if msgpack_codec is not None:
+    COMPILED_DUMPS[msgpack_codec] = msgpack_dumps
+
+
+def dumps(codec, resource):
+    """
+    Dump a resource using compiled encoders if they are supported by the codec.
+    """
+    compiled_dumps = COMPILED_DUMPS.get(codec)
+    if compiled_dumps is None:
+        return codec.dumps(resource)
+    return compiled_dumps(resource)
@@ -21,3 +21,9 @@ class ImmediateErrorHttpResponse(ImmediateHttpResponse):
             Error(status, sub_status, message, developer_message, meta),
             status, headers
         )
+
+
+class QueryBudgetExceeded(Exception):
+    """
+    A request executed more database queries than the budget for the route allows.
+    """
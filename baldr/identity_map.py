@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""
+Request scoped identity map of model instances.
+
+Action routes, permission checks and ``pre_dispatch`` hooks often load the
+same instance several times while handling a request. An ``IdentityMap`` is
+attached to each request (as ``request.identity_map``) by ``wrap_view`` and
+is consulted by ``ModelResourceApi.get_instance`` (and
+``get_related_instance``), so each instance is only loaded from the database
+once per request::
+
+    @resource_action(name='publish', method=POST)
+    def publish(self, request, resource_id):
+        book = self.get_instance(request, resource_id)  # Loaded from the database
+        ...
+        book = self.get_instance(request, resource_id)  # The same instance
+
+Instances are identified by the query (model, database alias, joins and the
+structure of the where clause, including the type of each value) along with
+the lookup field and value, so an instance loaded from an unfiltered queryset
+is never returned for a scoped one (eg the queryset from ``get_queryset``).
+Querysets that cannot be identified from their structure (eg that are sliced
+or use ``extra`` or expressions) always load the instance. The map is cleared
+whenever a
+``ModelResourceApi`` writes to the database so instances are reloaded after
+a change. Set ``use_identity_map = False`` on an API to disable the map.
+
+"""
+from __future__ import absolute_import
+import datetime
+import decimal
+import uuid
+import six
+from django.core.exceptions import ValidationError
+try:
+    from django.core.exceptions import FieldDoesNotExist
+except ImportError:
+    from django.db.models.fields import FieldDoesNotExist
+
+__all__ = ('IdentityMap', 'clear_identity_map')
+
+# Types of filter values that are part of the key of a query.
+VALUE_TYPES = frozenset(six.string_types + six.integer_types + (
+    float, bool, type(None), bytes, decimal.Decimal, datetime.date, datetime.datetime, datetime.time, uuid.UUID))
+
+
+class UnsupportedQuery(Exception):
+    """
+    The query includes a filter that cannot be identified from its structure.
+    """
+
+
+def value_key(value):
+    if value.__class__ in VALUE_TYPES:
+        return value.__class__, value
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return value.__class__, tuple(value_key(v) for v in value)
+    raise UnsupportedQuery(value)
+
+
+def where_key(node):
+    """
+    Key that identifies the structure of a where clause (and the values it compares against).
+    """
+    children = getattr(node, 'children', None)
+    if children is not None:
+        return node.__class__, node.connector, node.negated, tuple(where_key(child) for child in children)
+
+    lhs = getattr(node, 'lhs', None)
+    if lhs is None or getattr(lhs, 'target', None) is None:
+        raise UnsupportedQuery(node)
+    return node.__class__, lhs.alias, lhs.target, value_key(node.rhs)
+
+
+def query_key(query):
+    """
+    Key that identifies the rows a query can return.
+    """
+    if query.low_mark or query.high_mark is not None or query.extra or query.extra_tables:
+        raise UnsupportedQuery(query)
+    joins = tuple(
+        (alias, join.table_name, getattr(join, 'parent_alias', getattr(join, 'lhs_alias', None)),
+         getattr(join, 'join_field', None), getattr(join, 'join_type', None))
+        for alias, join in sorted(query.alias_map.items())
+    )
+    return joins, where_key(query.where)
+
+
+class IdentityMap(object):
+    """
+    Map of loaded instances.
+    """
+    def __init__(self):
+        self._instances = {}
+
+    def __len__(self):
+        return len(self._instances)
+
+    @staticmethod
+    def key(queryset, field, value):
+        """
+        Key of an instance; ``None`` if the instance cannot be identified (or the queryset can never
+        return an instance).
+        """
+        query = queryset.query
+        if query.is_empty():
+            return None
+        try:
+            query = query_key(query)
+        except UnsupportedQuery:
+            return None
+
+        # Normalise the lookup value (eg a resource ID from a URL) using the field
+        opts = queryset.model._meta
+        try:
+            value = (opts.pk if field == 'pk' else opts.get_field(field)).to_python(value)
+        except (FieldDoesNotExist, ValidationError):
+            pass
+        try:
+            value = value_key(value)
+        except UnsupportedQuery:
+            return None
+        return queryset.model, queryset.db, query, field, value
+
+    def get(self, queryset, field, value, loader):
+        """
+        Get an instance; if the instance has not been loaded it is loaded by calling ``loader``.
+
+        :param queryset: Queryset the instance is loaded from.
+        :param field: Name of the field used to lookup the instance.
+        :param value: Value of the lookup field.
+        :param loader: Callable that loads the instance.
+
+        """
+        key = self.key(queryset, field, value)
+        if key is None:
+            return loader()
+        try:
+            return self._instances[key]
+        except KeyError:
+            instance = self._instances[key] = loader()
+            return instance
+
+    def clear(self):
+        """
+        Clear all instances (eg after a write).
+        """
+        self._instances.clear()
+
+
+def clear_identity_map(request):
+    """
+    Clear the identity map of a request (if it has one).
+    """
+    identity_map = getattr(request, 'identity_map', None)
+    if identity_map is not None:
+        identity_map.clear()
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+import django
+import timeit
+from optparse import make_option
+from django.core.management.base import BaseCommand
+import baldr
+
+
+class Command(BaseCommand):
+    help = ("Warm up URL patterns, route tables, mappings and codecs of all API's (see baldr.preloading). "
+            "Use to check and time preloading; servers should call baldr.preload() in the master process.")
+
+    if django.VERSION < (1, 8):
+        # Django 1.7 does not support add_arguments
+        option_list = BaseCommand.option_list + (
+            make_option('--urlconf', dest='urlconf', default=None,
+                        help="URL conf to import; default is settings.ROOT_URLCONF."),
+            make_option('--freeze', action='store_true', dest='freeze', default=None,
+                        help="Freeze all objects with gc.freeze() (Python 3.7+)."),
+        )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--urlconf', dest='urlconf', default=None,
+                            help="URL conf to import; default is settings.ROOT_URLCONF.")
+        parser.add_argument('--freeze', action='store_true', dest='freeze', default=None,
+                            help="Freeze all objects with gc.freeze() (Python 3.7+).")
+
+    def handle(self, *args, **options):
+        start = timeit.default_timer()
+        counts = baldr.preload(options.get('urlconf'), options.get('freeze'))
+        counts['duration'] = (timeit.default_timer() - start) * 1000
+        self.stdout.write(
+            "Preloaded %(urls)s URL patterns, %(collections)s API collections, %(resource_apis)s resource API's, "
+            "%(resources)s resources and %(codecs)s codecs in %(duration).1fms (%(frozen)s objects frozen)." % counts
+        )
@@ -0,0 +1,336 @@
+# -*- coding: utf-8 -*-
+"""
+In-process request metrics.
+
+Request counts, latency and response size histograms and status/sub-status
+breakdowns are collected per API, route key and method. Each route uses a
+fixed amount of memory (histograms use fixed buckets) and updates only lock
+the route being updated.
+
+For pre-fork servers (eg Gunicorn) set ``settings.BALDR_METRICS_DIR`` (or
+supply ``multiprocess_dir``) to a directory shared by all workers, each worker
+periodically writes its metrics to a file in this directory and the files are
+merged when metrics are scraped. The directory should be emptied when the
+server is (re)started.
+
+Metrics are exposed in the Prometheus text format by including a
+``MetricsEndpoint`` in an ``ApiCollection``::
+
+    urlpatterns += Api(
+        ApiVersion(
+            UserApi(),
+            MetricsEndpoint(),
+            version='v1',
+        )
+    ).patterns()
+
+"""
+from __future__ import absolute_import, division
+import atexit
+import bisect
+import glob
+import json
+import logging
+import os
+import threading
+import timeit
+import uuid
+from django.conf import settings
+from django.conf.urls import url
+from django.http import HttpResponse
+
+__all__ = ('MetricsRegistry', 'MetricsEndpoint', 'registry')
+
+# Latency buckets in seconds
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Response size buckets in bytes
+DEFAULT_SIZE_BUCKETS = (128, 512, 2048, 8192, 32768, 131072, 524288, 2097152)
+
+# Methods reported individually, any other method is reported as OTHER to keep memory use fixed.
+KNOWN_METHODS = ('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS')
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+logger = logging.getLogger('baldr.metrics')
+
+
+class Histogram(object):
+    """
+    Histogram with fixed buckets.
+    """
+    __slots__ = ('buckets', 'counts', 'sum')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        # Final count is the +Inf bucket
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def merge(self, counts, total):
+        self.counts = [a + b for a, b in zip(self.counts, counts)]
+        self.sum += total
+
+    def cumulative_counts(self):
+        total = 0
+        for count in self.counts:
+            total += count
+            yield total
+
+
+class RouteMetrics(object):
+    """
+    Metrics for a single API route and method.
+    """
+    __slots__ = ('lock', 'requests', 'latency', 'response_size', 'statuses')
+
+    def __init__(self, latency_buckets, size_buckets):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.latency = Histogram(latency_buckets)
+        self.response_size = Histogram(size_buckets)
+        self.statuses = {}
+
+    def observe(self, status, sub_status, duration, size):
+        with self.lock:
+            self.requests += 1
+            self.latency.observe(duration)
+            if size is not None:
+                self.response_size.observe(size)
+            key = (status, sub_status)
+            self.statuses[key] = self.statuses.get(key, 0) + 1
+
+    def as_dict(self):
+        with self.lock:
+            return {
+                'requests': self.requests,
+                'latency': [list(self.latency.counts), self.latency.sum],
+                'response_size': [list(self.response_size.counts), self.response_size.sum],
+                'statuses': [[s, ss, c] for (s, ss), c in self.statuses.items()],
+            }
+
+    def merge(self, data):
+        with self.lock:
+            self.requests += data['requests']
+            self.latency.merge(*data['latency'])
+            self.response_size.merge(*data['response_size'])
+            for status, sub_status, count in data['statuses']:
+                key = (status, sub_status)
+                self.statuses[key] = self.statuses.get(key, 0) + count
+
+
+class MetricsRegistry(object):
+    """
+    Registry of request metrics.
+
+    :param latency_buckets: Upper bounds (in seconds) of latency histogram buckets.
+    :param size_buckets: Upper bounds (in bytes) of response size histogram buckets.
+    :param multiprocess_dir: Directory used to share metrics between processes; default is
+        ``settings.BALDR_METRICS_DIR``, if neither is defined metrics are only collected in process.
+    :param flush_interval: Minimum interval (in seconds) between writes of this processes metrics
+        in multiprocess mode.
+
+    """
+    def __init__(self, latency_buckets=DEFAULT_LATENCY_BUCKETS, size_buckets=DEFAULT_SIZE_BUCKETS,
+                 multiprocess_dir=None, flush_interval=5):
+        self.latency_buckets = tuple(latency_buckets)
+        self.size_buckets = tuple(size_buckets)
+        self._multiprocess_dir = multiprocess_dir
+        self.flush_interval = flush_interval
+
+        self._routes = {}
+        self._lock = threading.Lock()
+        self._next_flush = 0
+        self._atexit_registered = False
+        self._process = None
+
+    @property
+    def multiprocess_dir(self):
+        return self._multiprocess_dir or getattr(settings, 'BALDR_METRICS_DIR', None)
+
+    def _route(self, key):
+        route = self._routes.get(key)
+        if route is None:
+            with self._lock:
+                route = self._routes.get(key)
+                if route is None:
+                    route = self._routes[key] = RouteMetrics(self.latency_buckets, self.size_buckets)
+        return route
+
+    def observe(self, api_name, route_key, method, status, sub_status=None, duration=0, size=None):
+        """
+        Record a request.
+
+        :param api_name: Name of the API that handled the request.
+        :param route_key: Route key (or view name) within the API.
+        :param method: HTTP method of the request.
+        :param status: HTTP status of the response.
+        :param sub_status: Baldr sub-status of the response (if known).
+        :param duration: Time taken (in seconds) to generate the response.
+        :param size: Size of the response body in bytes (if known).
+
+        """
+        if method not in KNOWN_METHODS:
+            method = 'OTHER'
+        self._route((api_name, route_key, method)).observe(status, sub_status, duration, size)
+
+        if self.multiprocess_dir:
+            now = timeit.default_timer()
+            if now >= self._next_flush:
+                self._next_flush = now + self.flush_interval
+                self.flush()
+
+    def observe_response(self, api_name, route_key, request, response, duration):
+        """
+        Record a request from the response generated.
+        """
+        # Embedded resources (eg in a batch) are encoded as part of another response
+        size = None if response.streaming or hasattr(response, 'resource') else len(response.content)
+        self.observe(api_name, route_key, request.method, response.status_code,
+                     getattr(response, 'sub_status', None), duration, size)
+
+    def snapshot(self):
+        """
+        Snapshot of metrics collected by this process.
+
+        :returns: List of ``(key, data)`` pairs.
+        """
+        return [(key, route.as_dict()) for key, route in list(self._routes.items())]
+
+    def _worker_file(self):
+        # Files are identified by a token generated for each process (rather than just the pid) so a
+        # new worker that is assigned the pid of an old worker does not replace the old workers metrics.
+        pid = os.getpid()
+        if self._process is None or self._process[0] != pid:
+            self._process = (pid, uuid.uuid4().hex)
+        return os.path.join(self.multiprocess_dir, 'baldr-metrics-%s-%s.json' % self._process)
+
+    def flush(self):
+        """
+        Write metrics for this process to the multiprocess directory.
+        """
+        multiprocess_dir = self.multiprocess_dir
+        if not multiprocess_dir:
+            return
+
+        if not self._atexit_registered:
+            self._atexit_registered = True
+            atexit.register(self._flush_at_exit)
+
+        file_name = self._worker_file()
+        temp_name = '%s.%s.tmp' % (file_name, threading.current_thread().ident)
+        try:
+            with open(temp_name, 'w') as f:
+                json.dump([[list(key), data] for key, data in self.snapshot()], f)
+            os.rename(temp_name, file_name)
+        except (IOError, OSError):
+            # Never fail a request because metrics could not be written.
+            logger.warning("Unable to write metrics to %s", file_name, exc_info=True)
+
+    def _flush_at_exit(self):
+        if os.path.isdir(self.multiprocess_dir or ''):
+            self.flush()
+
+    def collect(self):
+        """
+        Collect metrics for all processes.
+
+        :returns: Dict of ``RouteMetrics`` objects keyed by ``(api_name, route_key, method)``.
+        """
+        merged = {}
+        for entries in self._sources():
+            for key, data in entries:
+                key = tuple(key)
+                route = merged.get(key)
+                if route is None:
+                    route = merged[key] = RouteMetrics(self.latency_buckets, self.size_buckets)
+                route.merge(data)
+        return merged
+
+    def _sources(self):
+        if not self.multiprocess_dir:
+            yield self.snapshot()
+            return
+
+        self.flush()
+        for file_name in glob.glob(os.path.join(self.multiprocess_dir, 'baldr-metrics-*.json')):
+            try:
+                with open(file_name) as f:
+                    yield json.load(f)
+            except (IOError, OSError, ValueError):
+                # File was removed or is being replaced
+                continue
+
+    def exposition(self):
+        """
+        Generate metrics in the Prometheus text exposition format.
+        """
+        routes = sorted(self.collect().items())
+
+        lines = [
+            '# HELP baldr_requests_total Total requests handled.',
+            '# TYPE baldr_requests_total counter',
+        ]
+        for key, route in routes:
+            lines.append('baldr_requests_total{%s} %s' % (_labels(key), route.requests))
+
+        lines += [
+            '# HELP baldr_responses_total Responses by status and sub-status.',
+            '# TYPE baldr_responses_total counter',
+        ]
+        for key, route in routes:
+            for (status, sub_status), count in sorted(route.statuses.items(), key=lambda i: (i[0][0], i[0][1] or 0)):
+                lines.append('baldr_responses_total{%s,status="%s",sub_status="%s"} %s' % (
+                    _labels(key), status, sub_status or '', count))
+
+        for name, help_text, attr in (
+                ('baldr_request_duration_seconds', 'Time taken to generate a response.', 'latency'),
+                ('baldr_response_size_bytes', 'Size of response bodies.', 'response_size')):
+            lines += [
+                '# HELP %s %s' % (name, help_text),
+                '# TYPE %s histogram' % name,
+            ]
+            for key, route in routes:
+                histogram = getattr(route, attr)
+                labels = _labels(key)
+                bounds = [repr(float(b)) for b in histogram.buckets] + ['+Inf']
+                count = 0
+                for bound, count in zip(bounds, histogram.cumulative_counts()):
+                    lines.append('%s_bucket{%s,le="%s"} %s' % (name, labels, bound, count))
+                lines.append('%s_sum{%s} %r' % (name, labels, float(histogram.sum)))
+                lines.append('%s_count{%s} %s' % (name, labels, count))
+
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(key):
+    return 'api="%s",route="%s",method="%s"' % key
+
+
+# Shared registry used by resource API's
+registry = MetricsRegistry()
+
+
+class MetricsEndpoint(object):
+    """
+    Endpoint that exposes metrics in the Prometheus text format.
+
+    This can be included alongside resource API's in an ``ApiCollection``.
+
+    :param api_name: Name used in the URL of the endpoint.
+    :param metrics_registry: Registry to expose; default is the shared ``registry``.
+
+    """
+    def __init__(self, api_name='metrics', metrics_registry=None):
+        self.api_name = api_name
+        self.registry = metrics_registry or registry
+
+    @property
+    def urls(self):
+        return [url(r'^%s/?$' % self.api_name, self.view)]
+
+    def view(self, request):
+        return HttpResponse(self.registry.exposition(), content_type=CONTENT_TYPE)
@@ -4,7 +4,7 @@ from django.db import models
 from odin import exceptions as odin_exceptions
 from odin.codecs import json_codec
 import six
-from baldr import form_fields
+from baldr import decoders, form_fields
 
 # Treat an empty JSON object as None.
 EMPTY_VALUES = (None, '', {}, '{}')
@@ -30,7 +30,7 @@ class ResourceFieldDescriptor(object):
 
         if isinstance(resource, six.string_types):
             try:
-                resource = self.field.codec.loads(resource, self.field.resource_type, full_clean=False)
+                resource = decoders.loads(self.field.codec, resource, self.field.resource_type, full_clean=False)
             except (odin_exceptions.ValidationError, odin_exceptions.CodecDecodeError):
                 pass
             else:
@@ -70,7 +70,7 @@ class ResourceField(models.TextField):
 
         if isinstance(value, six.string_types):
             try:
-                return self.codec.loads(value, self.resource_type, full_clean=False)
+                return decoders.loads(self.codec, value, self.resource_type, full_clean=False)
             except odin_exceptions.CodecDecodeError as cde:
                 raise django_exceptions.ValidationError(str(cde))
 
@@ -90,7 +90,7 @@ class ResourceField(models.TextField):
 
         if value.__class__ is self.resource_type or (self.allow_subclasses and isinstance(value, self.resource_type)):
             try:
-                value.full_clean()
+                decoders.full_clean(value)
             except odin_exceptions.ValidationError as ve:
                 raise django_exceptions.ValidationError(str(ve.message_dict))
 
@@ -140,7 +140,7 @@ class ResourceListField(ResourceField):
 
         if isinstance(value, six.string_types):
             try:
-                return self.codec.loads(value, self.resource_type, full_clean=False)
+                return decoders.loads(self.codec, value, self.resource_type, full_clean=False)
             except odin_exceptions.ValidationError as ve:
                 raise django_exceptions.ValidationError(str(ve.message_dict))
             except ValueError as ve:
@@ -1,19 +1,16 @@
 # -*- coding: utf-8 -*-
 import inspect
 import odin
+import six
 import sys
 from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models.query_utils import DeferredAttribute
 from odin import registration
 from odin.fields import NOT_PROVIDED
-from odin.mapping import FieldResolverBase, mapping_factory
+from odin.mapping import FieldResolverBase, MappingBase, mapping_factory
 from baldr.model_fields import ResourceField, ResourceListField
 
-try:
-    from odin.codecs import msgpack_codec
-except ImportError:
-    msgpack_codec = None
-
 
 # Register support for Django Models and Validators
 
@@ -115,13 +112,106 @@ class ModelResourceMixin(odin.Resource):
         mapping = registration.get_mapping(self.__class__, self.model)
         mapper = mapping(self, context)
 
-        if not lazy or len(mapper.diff(instance)) > 0:
-            mapper.update(instance)
-            if commit:
+        original = field_values(instance)
+        mapper.update(instance)
+        if commit:
+            if lazy:
+                save_changes(instance, changed_fields(instance, original))
+            else:
                 instance.save()
         return instance
 
 
+# Helpers for updating only changed columns.
+
+def deferred_fields(instance):
+    """
+    Get the names of the fields of a model instance that are deferred (not loaded).
+    """
+    if hasattr(instance, 'get_deferred_fields'):
+        return instance.get_deferred_fields()
+    # Django 1.7
+    return set(
+        f.attname for f in instance._meta.concrete_fields
+        if f.attname not in instance.__dict__ and
+        isinstance(instance.__class__.__dict__.get(f.attname), DeferredAttribute)
+    )
+
+
+def field_values(instance):
+    """
+    Snapshot the values of the (non primary key) fields of a model instance.
+
+    Fields that are deferred (not loaded) are not included.
+    """
+    deferred = deferred_fields(instance)
+    return dict(
+        (f.attname, getattr(instance, f.attname)) for f in instance._meta.concrete_fields
+        if not f.primary_key and f.attname not in deferred
+    )
+
+
+def changed_fields(instance, original):
+    """
+    Determine the fields of a model instance that have changed since a snapshot was taken.
+
+    :param instance: Model instance.
+    :param original: Snapshot of the instance from ``field_values``.
+    :return: Set of changed field names.
+
+    """
+    deferred = deferred_fields(instance)
+    changed = set()
+    for f in instance._meta.concrete_fields:
+        if f.primary_key or f.attname in deferred:
+            continue
+        if f.attname not in original:
+            # Deferred field that has been assigned
+            changed.add(f.attname)
+        elif getattr(instance, f.attname) != original[f.attname]:
+            changed.add(f.attname)
+    return changed
+
+
+def save_changes(instance, changed, using=None):
+    """
+    Save only the changed fields of a model instance (along with any ``auto_now`` fields).
+
+    :param instance: Model instance.
+    :param changed: Names of changed fields (see ``changed_fields``); if empty the instance is not saved.
+    :param using: Database alias to save to.
+    :return: True if the instance was saved.
+
+    """
+    if not changed:
+        return False
+    update_fields = set(changed)
+    update_fields.update(f.attname for f in instance._meta.concrete_fields if getattr(f, 'auto_now', False))
+    instance.save(using=using, update_fields=update_fields)
+    return True
+
+
+def direct_mapped_fields(mapping):
+    """
+    Determine the fields a mapping copies unchanged from the field of the same name (ie fields
+    without a custom mapping rule); fast paths that bypass a mapping are only valid for these fields.
+
+    :param mapping: Mapping class.
+    :return: Set of field names.
+
+    """
+    default_action = six.get_unbound_function(mapping.default_action)
+    copies = default_action is six.get_unbound_function(MappingBase.default_action)
+
+    fields = set()
+    for from_field, action, to_field, to_list, _, skip_if_none in mapping._mapping_rules:
+        if to_list or skip_if_none or from_field != to_field or len(to_field) != 1:
+            continue
+        if action is None or (action == 'default_action' and copies):
+            fields.add(to_field[0])
+    return fields
+
+
 def default_map(field):
     if field.default is models.NOT_PROVIDED:
         return NOT_PROVIDED
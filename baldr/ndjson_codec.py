@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+Codec for newline delimited JSON (one resource per line).
+
+Follows the interface of the Odin codecs, in addition ``iter_loads`` can be
+used to decode a stream of lines one resource at a time.
+
+"""
+from __future__ import absolute_import
+from odin.codecs import json_codec
+from odin.exceptions import CodecDecodeError, ValidationError
+from baldr import decoders
+
+CONTENT_TYPE = 'application/x-ndjson'
+
+
+def iter_loads(lines, resource=None, full_clean=True, default_to_not_supplied=False):
+    """
+    Decode lines into resources; blank lines are ignored.
+
+    Errors decoding a line do not stop decoding of the remaining lines.
+
+    :param lines: Iterable of lines (as text or UTF-8 encoded bytes).
+    :returns: Generator yielding ``(line_number, resource, error)`` tuples; if the line could
+        not be decoded ``resource`` is ``None`` and ``error`` is the exception raised.
+
+    """
+    for line_number, line in enumerate(lines, 1):
+        try:
+            if isinstance(line, bytes):
+                line = line.decode('UTF8')
+            line = line.strip()
+            if not line:
+                continue
+            yield line_number, decoders.loads(json_codec, line, resource, full_clean, default_to_not_supplied), None
+        except (ValueError, CodecDecodeError, ValidationError) as ex:
+            yield line_number, None, ex
+
+
+def loads(s, resource=None, full_clean=True, default_to_not_supplied=False):
+    """
+    Load a list of resources from a newline delimited string.
+
+    :raises ValueError: If a line cannot be decoded.
+
+    """
+    resources = []
+    for line_number, result, error in iter_loads(s.splitlines(), resource, full_clean, default_to_not_supplied):
+        if error is not None:
+            if isinstance(error, (ValidationError, CodecDecodeError)):
+                raise error
+            raise ValueError("Line %s: %s" % (line_number, error))
+        resources.append(result)
+    return resources
+
+
+def dumps(resource, **kwargs):
+    """
+    Dump a resource (or list of resources) to a newline delimited string.
+    """
+    if not isinstance(resource, (list, tuple)):
+        resource = [resource]
+    return ''.join(json_codec.dumps(r, **kwargs) + '\n' for r in resource)
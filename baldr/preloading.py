@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""
+Warm up API's before a pre-fork server forks workers.
+
+URL patterns, route tables, mappings, compiled encoders/decoders and codec
+state are all built lazily; when a pre-fork server (eg Gunicorn) forks
+workers before this has happened every worker builds them again while
+serving its first requests.
+
+Calling ``baldr.preload()`` in the master process builds all of this in
+advance, so forked workers share the memory (copy-on-write) and serve their
+first request at full speed. With Gunicorn set ``preload_app = True`` and
+call preload from the ``when_ready`` server hook (or the WSGI module)::
+
+    def when_ready(server):
+        import baldr
+        baldr.preload()
+
+On Python 3.7+ objects that exist after preloading can also be moved into a
+permanent generation with ``gc.freeze()``; this prevents garbage collection
+in workers from touching (and so copying) the shared memory. Supply
+``freeze=True`` or set ``settings.BALDR_PRELOAD_GC_FREEZE = True``.
+
+The ``baldr_preload`` management command runs the same steps and reports
+what was warmed.
+
+"""
+from __future__ import absolute_import
+import gc
+import logging
+from django.conf import settings
+from odin import registration
+from odin.resources import ResourceBase
+from baldr import api, decoders, encoders
+from baldr.resources import Error, Listing, SizeLimitedListing
+
+try:
+    from django.urls import get_resolver
+except ImportError:
+    from django.core.urlresolvers import get_resolver
+
+__all__ = ('preload',)
+
+logger = logging.getLogger('baldr.preload')
+
+
+def _is_resource(obj):
+    return isinstance(obj, type) and issubclass(obj, ResourceBase)
+
+
+def _is_model(obj):
+    return isinstance(obj, type) and hasattr(obj, '_meta') and hasattr(obj._meta, 'get_fields')
+
+
+def warm_urls(urlconf=None):
+    """
+    Import the URL conf (creating the API's defined in it) and compile all URL patterns.
+
+    :returns: Number of URL patterns compiled.
+
+    """
+    count = 0
+    resolvers = [get_resolver(urlconf)]
+    while resolvers:
+        resolver = resolvers.pop()
+        # Populate the reverse lookup tables (this also compiles the resolver regex)
+        resolver.reverse_dict
+        for pattern in resolver.url_patterns:
+            # Django 2.0+ patterns compile their regex on a ``pattern`` object
+            getattr(pattern, 'pattern', pattern).regex
+            count += 1
+            if hasattr(pattern, 'url_patterns'):
+                resolvers.append(pattern)
+    return count
+
+
+def warm_mappings(resource_api):
+    """
+    Resolve the mappings of a resource API and the resources/models they map between.
+
+    :returns: Set of resource types used by the mappings.
+
+    """
+    resource_types = set()
+    for from_name, to_name, attr in (('resource', 'model', 'to_model_mapping'),
+                                     ('model', 'resource', 'to_resource_mapping')):
+        if not hasattr(resource_api, attr):
+            continue
+        mapping = getattr(resource_api, attr)
+        if mapping is None:
+            mapping = registration.get_mapping(getattr(resource_api, from_name), getattr(resource_api, to_name))
+            setattr(resource_api, attr, mapping)
+        for obj in (mapping.from_obj, mapping.to_obj):
+            if _is_resource(obj):
+                resource_types.add(obj)
+            elif _is_model(obj):
+                obj._meta.get_fields()
+                obj._meta.concrete_fields
+    return resource_types
+
+
+def warm_resource_api(resource_api):
+    """
+    Build the route tables and resolve the mappings of a resource API.
+
+    :returns: Set of resource types used by the API.
+
+    """
+    if getattr(resource_api, 'route_table', False) is None:
+        # Route tables are usually built along with the URL patterns
+        resource_api.build_route_table()
+    resource_types = warm_mappings(resource_api)
+    if _is_resource(resource_api.resource):
+        resource_types.add(resource_api.resource)
+    return resource_types
+
+
+def warm_codecs(codecs, resource_types):
+    """
+    Compile encoders/decoders for resource types and encode with each codec.
+    """
+    for resource_type in resource_types:
+        encoders.get_encoder(resource_type)
+        decoders.get_decoder(resource_type)
+        decoders.get_validator(resource_type)
+
+    for codec in codecs:
+        encoders.dumps(codec, Listing([], 0))
+
+
+def preload(urlconf=None, freeze=None):
+    """
+    Warm up all API's so forked workers serve their first request at full speed.
+
+    :param urlconf: URL conf to import; default is ``settings.ROOT_URLCONF``.
+    :param freeze: Freeze all objects with ``gc.freeze()`` (if supported); default is
+        ``settings.BALDR_PRELOAD_GC_FREEZE``.
+    :returns: Dict of the number of items warmed.
+
+    """
+    url_count = warm_urls(urlconf)
+
+    collections = list(api.api_collections)
+    for collection in collections:
+        collection.urls
+        if collection.compiled:
+            collection.dispatcher
+        if collection.batch:
+            collection.batch_handler
+
+    resource_apis = list(api.resource_apis)
+    resource_types = {Listing, SizeLimitedListing, Error}
+    codecs = set(api.CODECS.load().values())
+    for resource_api in resource_apis:
+        resource_types.update(warm_resource_api(resource_api))
+        registered_codecs = resource_api.registered_codecs
+        if hasattr(registered_codecs, 'load'):
+            registered_codecs.load()
+        codecs.update(registered_codecs.values())
+    warm_codecs(codecs, resource_types)
+
+    gc.collect()
+    if freeze is None:
+        freeze = getattr(settings, 'BALDR_PRELOAD_GC_FREEZE', False)
+    frozen = freeze and hasattr(gc, 'freeze')
+    if frozen:
+        gc.freeze()
+
+    counts = {
+        'urls': url_count,
+        'collections': len(collections),
+        'resource_apis': len(resource_apis),
+        'resources': len(resource_types),
+        'codecs': len(codecs),
+        'frozen': gc.get_freeze_count() if frozen else 0,
+    }
+    logger.info("Preloaded %(resource_apis)s resource API's and %(resources)s resources.", counts)
+    return counts
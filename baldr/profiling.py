@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""
+On-demand profiling of individual requests.
+
+A profiler is enabled by assigning a ``RequestProfiler`` to a resource API::
+
+    class UserApi(ResourceApi):
+        resource = User
+        profiler = RequestProfiler(allowed_users=('admin',), output_dir='/var/tmp/profiles')
+
+A request is profiled if it:
+
+- includes a signed token (see ``RequestProfiler.make_token``) in the
+  ``X-Baldr-Profile`` header or ``_profile`` query parameter;
+- is made by an allowed user and includes the header or query parameter;
+- is selected by the sample rate.
+
+Requests that are not selected only pay for a couple of dictionary lookups.
+
+"""
+from __future__ import absolute_import
+import cProfile
+import logging
+import os
+import pstats
+import random
+import re
+import time
+import six
+from django.core import signing
+from django.http import HttpResponse
+
+__all__ = ('RequestProfiler',)
+
+logger = logging.getLogger('baldr.profile')
+
+SAFE_NAME = re.compile(r'[^-\w]+')
+
+
+class RequestProfiler(object):
+    """
+    Profiles requests using ``cProfile``.
+
+    :param allowed_users: Usernames that can request profiling without a signed token, or a
+        callable that accepts a request and returns ``True`` if the request can be profiled.
+    :param sample_rate: Fraction of all requests that are profiled (0 disables sampling).
+    :param output_dir: Directory ``.prof`` files are written to; if not supplied the top stats
+        are returned in place of the response body.
+    :param top: Number of entries included in stats responses.
+    :param sort_by: Sort order applied to stats.
+    :param max_age: Maximum age (in seconds) of a signed token.
+    :param header: Request header (in ``META`` format) used to trigger profiling.
+    :param query_param: Query string parameter used to trigger profiling.
+
+    """
+    salt = 'baldr.profiling'
+
+    def __init__(self, allowed_users=None, sample_rate=0, output_dir=None, top=40, sort_by='cumulative',
+                 max_age=3600, header='HTTP_X_BALDR_PROFILE', query_param='_profile'):
+        self.allowed_users = allowed_users
+        self.sample_rate = sample_rate
+        self.output_dir = output_dir
+        self.top = top
+        self.sort_by = sort_by
+        self.max_age = max_age
+        self.header = header
+        self.query_param = query_param
+
+    @classmethod
+    def make_token(cls, value='profile'):
+        """
+        Generate a signed token that triggers profiling of a request.
+        """
+        return signing.TimestampSigner(salt=cls.salt).sign(value)
+
+    def is_allowed(self, request, token):
+        """
+        Check if a request that asked to be profiled is allowed to be.
+        """
+        try:
+            signing.TimestampSigner(salt=self.salt).unsign(token, max_age=self.max_age)
+        except signing.BadSignature:
+            pass
+        else:
+            return True
+
+        allowed_users = self.allowed_users
+        if not allowed_users:
+            return False
+        if callable(allowed_users):
+            return bool(allowed_users(request))
+        user = getattr(request, 'user', None)
+        return bool(user and user.is_authenticated() and user.get_username() in allowed_users)
+
+    def should_profile(self, request):
+        """
+        Determine if a request should be profiled.
+
+        :returns: ``True`` if the profile was explicitly requested; ``False`` if the request was
+            sampled; ``None`` if the request should not be profiled.
+
+        """
+        token = request.META.get(self.header) or request.GET.get(self.query_param)
+        if token and self.is_allowed(request, token):
+            return True
+        if self.sample_rate and random.random() < self.sample_rate:
+            return False
+
+    def profile(self, request, name, requested, func, *args, **kwargs):
+        """
+        Profile a call that generates a response.
+
+        :param request: The request being profiled.
+        :param name: Name used to identify the profile.
+        :param requested: The profile was explicitly requested (as opposed to sampled).
+        :param func: Function that generates the response.
+
+        """
+        profile = cProfile.Profile()
+        response = profile.runcall(func, *args, **kwargs)
+
+        if self.output_dir:
+            file_name = self.write_profile(profile, name, request)
+            if requested and file_name:
+                response['X-Baldr-Profile'] = os.path.basename(file_name)
+            return response
+
+        if requested:
+            stats_response = HttpResponse(self.format_stats(profile), content_type='text/plain; charset=utf-8')
+            stats_response['X-Baldr-Profile-Status'] = str(response.status_code)
+            return stats_response
+
+        logger.info("Profile of %s %s\n%s", request.method, request.path, self.format_stats(profile))
+        return response
+
+    def write_profile(self, profile, name, request):
+        """
+        Write a profile to the output directory.
+
+        :returns: Name of the file written; ``None`` if the profile could not be written.
+
+        """
+        file_name = os.path.join(self.output_dir, '%s-%s-%d-%d.prof' % (
+            SAFE_NAME.sub('_', name), request.method, int(time.time() * 1000), os.getpid()))
+        try:
+            profile.dump_stats(file_name)
+        except (IOError, OSError):
+            logger.exception("Unable to write profile of %s %s to %s", request.method, request.path, file_name)
+            return None
+        return file_name
+
+    def format_stats(self, profile):
+        stream = six.StringIO()
+        pstats.Stats(profile, stream=stream).sort_stats(self.sort_by).print_stats(self.top)
+        return stream.getvalue()
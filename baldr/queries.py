@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+Counting of database queries executed while handling a request.
+
+A query budget can be declared for an API (``ResourceApi.max_queries``) or
+for individual routes::
+
+    class BookApi(ResourceApi):
+        @listing(max_queries=5)
+        def book_list(self, request, offset, limit):
+            ...
+
+Queries are counted while the request is handled, if the budget is exceeded
+the ``query_budget_action`` (default ``settings.BALDR_QUERY_BUDGET_ACTION``)
+is applied; one of ``log``, ``warn`` or ``raise``. Using ``raise`` in test
+settings is a good way to catch regressions.
+
+While counting, the same SQL statement (once literals are removed) being
+repeated is reported as a likely N+1 query pattern. Set
+``settings.BALDR_COUNT_QUERIES = True`` to count queries on all routes.
+
+"""
+from __future__ import absolute_import
+import collections
+import logging
+import re
+import warnings
+from django.conf import settings
+from django.db import connections
+from django.db.backends.utils import CursorWrapper
+from baldr.exceptions import QueryBudgetExceeded
+
+__all__ = ('QueryCounter', 'QueryBudget', 'QueryBudgetWarning', 'sql_shape')
+
+logger = logging.getLogger('baldr.queries')
+
+ACTION_LOG = 'log'
+ACTION_WARN = 'warn'
+ACTION_RAISE = 'raise'
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%s")
+_PLACEHOLDER_LIST = re.compile(r"\((?:\s*\?\s*,)+\s*\?\s*\)")
+
+
+class QueryBudgetWarning(RuntimeWarning):
+    """
+    Warning issued when a query budget is exceeded (or an N+1 pattern is detected).
+    """
+
+
+def sql_shape(sql):
+    """
+    Reduce an SQL statement to its shape by removing literal values (and normalising placeholders).
+    """
+    sql = _STRING_LITERAL.sub('?', sql)
+    sql = _NUMBER_LITERAL.sub('?', sql)
+    sql = _PLACEHOLDER.sub('?', sql)
+    return _PLACEHOLDER_LIST.sub('(...)', sql)
+
+
+class RecordingCursorWrapper(CursorWrapper):
+    """
+    Cursor that records the SQL (before parameters are applied) executed by a wrapped cursor.
+    """
+    def __init__(self, cursor, db, queries):
+        super(RecordingCursorWrapper, self).__init__(cursor, db)
+        self.queries = queries
+
+    def execute(self, sql, params=None):
+        self.queries.append(sql)
+        return self.cursor.execute(sql, params)
+
+    def executemany(self, sql, param_list):
+        self.queries.append(sql)
+        return self.cursor.executemany(sql, param_list)
+
+
+class QueryCounter(object):
+    """
+    Context manager that records the SQL executed on all database connections in the current thread.
+
+    Uses ``connection.execute_wrapper`` where supported by Django, otherwise cursors created by each
+    connection are wrapped with a ``RecordingCursorWrapper``.
+    """
+    def __init__(self):
+        self.queries = []
+        self._contexts = []
+        self._cursor_factories = []
+        self._debug_state = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append(sql)
+        return execute(sql, params, many, context)
+
+    def wrap_cursor_factory(self, connection, name):
+        factory = getattr(connection, name)
+        self._cursor_factories.append((connection, name, connection.__dict__.get(name)))
+        setattr(connection, name, lambda cursor: RecordingCursorWrapper(factory(cursor), connection, self.queries))
+
+    def __enter__(self):
+        for connection in connections.all():
+            if hasattr(connection, 'execute_wrapper'):
+                context = connection.execute_wrapper(self)
+                context.__enter__()
+                self._contexts.append(context)
+            else:
+                if hasattr(connection, 'make_cursor'):
+                    self.wrap_cursor_factory(connection, 'make_cursor')
+                else:
+                    # Django 1.7 only creates cursors with a factory when debugging
+                    debug_attr = 'use_debug_cursor'
+                    self._debug_state.append((connection, debug_attr, getattr(connection, debug_attr)))
+                    setattr(connection, debug_attr, True)
+                self.wrap_cursor_factory(connection, 'make_debug_cursor')
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        while self._contexts:
+            self._contexts.pop().__exit__(exc_type, exc_val, exc_tb)
+
+        while self._cursor_factories:
+            connection, name, previous = self._cursor_factories.pop()
+            if previous is None:
+                delattr(connection, name)
+            else:
+                setattr(connection, name, previous)
+
+        while self._debug_state:
+            connection, debug_attr, debug_value = self._debug_state.pop()
+            setattr(connection, debug_attr, debug_value)
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    def repeated_queries(self, threshold):
+        """
+        Query shapes that have been executed at least ``threshold`` times.
+
+        :returns: List of ``(shape, count)`` tuples, most repeated first.
+        """
+        counts = collections.Counter(sql_shape(sql) for sql in self.queries)
+        return [(shape, count) for shape, count in counts.most_common() if count >= threshold]
+
+
+class QueryBudget(QueryCounter):
+    """
+    Counts queries executed while handling a request and reports if a budget is exceeded.
+
+    :param name: Name of the route used in reports.
+    :param max_queries: Maximum number of queries allowed; ``None`` for no limit.
+    :param action: Action applied when the budget is exceeded; ``log``, ``warn`` or ``raise``.
+    :param n_plus_one_threshold: Number of times the same query can be repeated before being
+        reported as a likely N+1 pattern; ``None`` to disable.
+
+    """
+    def __init__(self, name, max_queries=None, action=None, n_plus_one_threshold=None):
+        super(QueryBudget, self).__init__()
+        self.name = name
+        self.max_queries = max_queries
+        self.action = action or getattr(settings, 'BALDR_QUERY_BUDGET_ACTION', ACTION_LOG)
+        self.n_plus_one_threshold = n_plus_one_threshold
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        super(QueryBudget, self).__exit__(exc_type, exc_val, exc_tb)
+        if exc_type is None:
+            self.check()
+
+    def check(self):
+        logger.debug("%s executed %s queries.", self.name, self.count)
+
+        if self.n_plus_one_threshold:
+            for shape, count in self.repeated_queries(self.n_plus_one_threshold):
+                self.report("%s repeated a query %s times (likely N+1 pattern): %s" % (self.name, count, shape))
+
+        if self.max_queries is not None and self.count > self.max_queries:
+            self.report("%s executed %s queries; budget is %s." % (self.name, self.count, self.max_queries),
+                        QueryBudgetExceeded)
+
+    def report(self, message, exception=None):
+        if self.action == ACTION_RAISE and exception:
+            raise exception(message)
+        elif self.action in (ACTION_WARN, ACTION_RAISE):
+            warnings.warn(message, QueryBudgetWarning, stacklevel=2)
+        else:
+            logger.warning(message)
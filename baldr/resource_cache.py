@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""
+Cache of resources mapped from model instances.
+
+For collections that change slowly most of the time spent generating a
+listing is mapping rows that have not changed since the last request. A
+``MappedResourceCache`` stores the resource mapped from each instance
+(keyed by model and primary key) so listings only map rows that are not
+cached::
+
+    class BookApi(ListMixin, CollectionMixin):
+        resource = Book
+        model = models.Book
+        resource_cache = MappedResourceCache(max_entries=10000, version_field='updated_at')
+
+Cached resources are invalidated when an instance is saved or deleted
+(using the ``post_save`` and ``post_delete`` signals). Code that writes
+without sending signals (eg ``QuerySet.update`` or ``bulk_update``) should
+call ``invalidate(model, pks)``; in place patches and ``ResourceFormSet`` do
+this. Signals are only sent in the process making the change; set a
+``version_field`` (eg an ``auto_now`` timestamp or a version number) to check
+cached resources against the row read by the listing so changes made
+elsewhere are picked up. The least recently used resources are evicted once
+``max_entries`` is reached.
+
+Instances invalidated while a listing is being read and mapped are not cached
+by that listing (the resource may have been mapped from the old row).
+
+Cached resources are shared between requests so must not be modified.
+
+"""
+from __future__ import absolute_import
+import threading
+import weakref
+from collections import OrderedDict
+from django.db.models.signals import post_delete, post_save
+
+__all__ = ('MappedResourceCache', 'invalidate')
+
+# All caches (so changes made without signals can be invalidated)
+caches = weakref.WeakSet()
+
+
+def invalidate(model, pks):
+    """
+    Remove the cached resources of instances from all caches.
+
+    :param model: Model of the instances.
+    :param pks: Primary keys of the instances.
+
+    """
+    for cache in list(caches):
+        cache.invalidate_pks(model, pks)
+
+
+class MappedResourceCache(object):
+    """
+    LRU cache of mapped resources.
+
+    :param max_entries: Maximum number of resources that are cached.
+    :param version_field: Model field that identifies the version of an instance; a cached resource
+        is only used if the version matches.
+
+    """
+    def __init__(self, max_entries=1024, version_field=None):
+        self.max_entries = max_entries
+        self.version_field = version_field
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Invalidation generation; this is only advanced while resources are being mapped
+        self._generation = 0
+        # Number of calls to ``apply`` in progress
+        self._active = 0
+        # Generation each key was last invalidated at while resources were being mapped
+        self._invalidated = {}
+        # Calls to ``apply`` that started before this generation do not populate the cache (used
+        # when too many keys have been invalidated to track individually)
+        self._floor = 0
+
+        post_save.connect(self.invalidate)
+        post_delete.connect(self.invalidate)
+        caches.add(self)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    @staticmethod
+    def key(instance):
+        return instance._meta.concrete_model, instance.pk
+
+    def invalidate(self, instance, **kwargs):
+        """
+        Remove the cached resource of an instance (receiver of the ``post_save`` and ``post_delete`` signals).
+        """
+        if self._entries or self._active:
+            self._invalidate_keys([self.key(instance)])
+
+    def invalidate_pks(self, model, pks):
+        """
+        Remove the cached resources of instances identified by primary key.
+        """
+        if self._entries or self._active:
+            model = model._meta.concrete_model
+            self._invalidate_keys([(model, pk) for pk in pks])
+
+    def _invalidate_keys(self, keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+            # Record the invalidation so resources being mapped are not cached
+            if self._active:
+                self._generation += 1
+                if len(self._invalidated) + len(keys) > self.max_entries:
+                    self._floor = self._generation
+                    self._invalidated.clear()
+                else:
+                    for key in keys:
+                        self._invalidated[key] = self._generation
+
+    def apply(self, mapping, instances):
+        """
+        Map instances to resources; using (and populating) the cache.
+
+        :param mapping: Mapping used to map instances that are not cached.
+        :param instances: Iterable of instances.
+        :returns: List of resources.
+
+        """
+        with self._lock:
+            started = self._generation
+            self._active += 1
+        try:
+            return self._apply(mapping, instances, started)
+        finally:
+            with self._lock:
+                self._active -= 1
+                if not self._active:
+                    self._invalidated.clear()
+
+    def _apply(self, mapping, instances, started):
+        # Instances are evaluated after the generation is recorded so rows changed while the query is
+        # running are not cached.
+        instances = list(instances)
+        version_field = self.version_field
+        entries = self._entries
+
+        results = []
+        missed = []
+        with self._lock:
+            for instance in instances:
+                key = self.key(instance)
+                version = getattr(instance, version_field) if version_field else None
+                entry = entries.pop(key, None)
+                if entry is not None and entry[0] is mapping and entry[1] == version:
+                    # Re-insert as the most recently used
+                    entries[key] = entry
+                    results.append(entry[2])
+                else:
+                    results.append(None)
+                    missed.append((len(results) - 1, key, version, instance))
+            self.hits += len(instances) - len(missed)
+            self.misses += len(missed)
+
+        if missed:
+            resources = mapping.apply([instance for _, _, _, instance in missed])
+            with self._lock:
+                cacheable = started >= self._floor
+                invalidated = self._invalidated
+                for (idx, key, version, _), resource in zip(missed, resources):
+                    results[idx] = resource
+                    if cacheable and invalidated.get(key, started) <= started:
+                        entries[key] = (mapping, version, resource)
+                while len(entries) > self.max_entries:
+                    entries.popitem(last=False)
+
+        return results
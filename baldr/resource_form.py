@@ -1,12 +1,19 @@
 from __future__ import unicode_literals
+import copy
 from collections import OrderedDict
 
 import six
+from django.db import router, transaction
 from django.forms import fields
 from django.forms.forms import DeclarativeFieldsMetaclass, BaseForm
+from django.forms.formsets import BaseFormSet, DEFAULT_MAX_NUM
 from django.forms.utils import ErrorList
 import odin
+from odin import registration
 from odin.exceptions import ValidationError
+from odin.utils import getmeta
+from baldr import decoders, resource_cache
+from baldr.models import changed_fields, field_values, save_changes
 
 ALL_FIELDS = '__all__'
 
@@ -45,12 +52,21 @@ def construct_instance(form, instance, fields=None, exclude=None):
             continue
         if exclude and f.name in exclude:
             continue
+        if f.name not in cleaned_data:
+            continue
 
         f.value_to_object(instance, cleaned_data[f.name])
 
     return instance
 
 
+def resource_data(instance):
+    """
+    Initial form data from a resource.
+    """
+    return {f.name: f.value_from_object(instance) for f in getmeta(instance).all_fields}
+
+
 def construct_field(field, **kwargs):
     if field.choices:
         form_field = fields.ChoiceField
@@ -114,6 +130,15 @@ def fields_for_resource(resource, fields=None, exclude=None, widgets=None,
     return field_dict
 
 
+class SharedFields(OrderedDict):
+    """
+    Form fields that are shared by several forms (eg the forms of a formset) rather than copied for
+    each form.
+    """
+    def __deepcopy__(self, memo):
+        return self
+
+
 class ResourceFormOptions(object):
     def __init__(self, options=None):
         self.resource = getattr(options, 'resource', None)
@@ -172,7 +197,7 @@ class ResourceFormMetaclass(DeclarativeFieldsMetaclass):
 class BaseResourceForm(BaseForm):
     def __init__(self, data=None, files=None, auto_id='id_%s', prefix=None,
                  initial=None, error_class=ErrorList, label_suffix=None,
-                 empty_permitted=False, instance=None):
+                 empty_permitted=False, instance=None, shared_fields=None, **kwargs):
         opts = self._meta
         if opts.resource is None:
             raise ValueError('ResourceForm has no resource class specified.')
@@ -182,13 +207,16 @@ class BaseResourceForm(BaseForm):
             object_data = {}
         else:
             self.instance = instance
-            object_data = instance.as_dict()
+            object_data = resource_data(instance)
         # if initial was provided, it should override the values from instance
         if initial is not None:
             object_data.update(initial)
+        if shared_fields is not None:
+            # Use the fields shared with other forms (these are not copied)
+            self.base_fields = shared_fields
 
         super(BaseResourceForm, self).__init__(data, files, auto_id, prefix, object_data,
-                                               error_class, label_suffix, empty_permitted)
+                                               error_class, label_suffix, empty_permitted, **kwargs)
 
     def _update_errors(self, errors):
         self.add_error(None, errors)
@@ -198,11 +226,141 @@ class BaseResourceForm(BaseForm):
 
         self.instance = construct_instance(self, self.instance, opts.fields, opts.exclude)
 
+        # Fields that are not on the form (or that failed validation) are not validated.
+        exclude = [f.name for f in getmeta(self.instance).fields if f.name not in self.cleaned_data]
         try:
-            self.instance.full_clean()
+            decoders.full_clean(self.instance, exclude)
         except ValidationError as e:
             self._update_errors(e)
 
 
 class ResourceForm(six.with_metaclass(ResourceFormMetaclass, BaseResourceForm)):
     pass
+
+
+class ResourceFormSet(BaseFormSet):
+    """
+    A formset for editing a list of resources, eg for bulk editing screens::
+
+        class BookFormSet(ResourceFormSet):
+            form = BookForm
+            extra = 0
+
+        formset = BookFormSet(request.POST, resources=BookResource.from_queryset(books))
+        if formset.is_valid():
+            formset.save()
+
+    Form fields are constructed once and shared by every form in the formset, and each form is
+    validated using the compiled validator of the resource (see ``baldr.decoders``). Bound data is
+    matched to resources by position.
+
+    When saved only the forms that have changed are persisted; new resources are created using
+    ``bulk_create``, changed resources update only the changed columns (using ``bulk_update``
+    where supported by Django) and deleted resources are deleted with a single query.
+
+    """
+    # Resource form used for each resource.
+    form = None
+    # Number of extra (empty) forms.
+    extra = 1
+    can_order = False
+    # Allow resources to be deleted.
+    can_delete = False
+    min_num = 0
+    max_num = DEFAULT_MAX_NUM
+    absolute_max = 2 * DEFAULT_MAX_NUM
+    validate_min = False
+    validate_max = False
+    # Model that resources are saved as; default is the ``model`` of the resource (see
+    # ``baldr.models.ModelResourceMixin``). A mapping must be registered from the resource to the model.
+    model = None
+
+    def __init__(self, data=None, files=None, auto_id='id_%s', prefix=None, resources=None, **kwargs):
+        # The order field differs for each form so cannot be shared
+        assert not self.can_order, "Ordering is not supported."
+        self.resources = list(resources or ())
+        self.shared_fields = SharedFields(copy.deepcopy(self.form.base_fields))
+        self._initial_form_count = None
+        super(ResourceFormSet, self).__init__(data, files, auto_id, prefix, **kwargs)
+
+    def initial_form_count(self):
+        if not self.is_bound:
+            return len(self.resources)
+        # Determined once rather than building the management form for every form
+        if self._initial_form_count is None:
+            self._initial_form_count = super(ResourceFormSet, self).initial_form_count()
+        return self._initial_form_count
+
+    def _construct_form(self, i, **kwargs):
+        if i < self.initial_form_count() and i < len(self.resources):
+            # The form updates a copy so the original values are retained.
+            kwargs['instance'] = copy.copy(self.resources[i])
+        kwargs['shared_fields'] = self.shared_fields
+        return super(ResourceFormSet, self)._construct_form(i, **kwargs)
+
+    def get_model(self):
+        model = self.model or getattr(self.form._meta.resource, 'model', None)
+        assert model, "A model has not been provided."
+        return model
+
+    def save(self, commit=True, using=None):
+        """
+        Save the resources of forms that have changed.
+
+        :param commit: Write changes to the database; if ``False`` the ``new_objects``,
+            ``changed_objects`` and ``deleted_objects`` are only determined.
+        :param using: Database alias to save to.
+        :returns: List of created and updated model instances.
+
+        """
+        model = self.get_model()
+        mapping = registration.get_mapping(self.form._meta.resource, model)
+
+        self.new_objects = []
+        self.changed_objects = []
+        self.deleted_objects = []
+        initial_form_count = self.initial_form_count()
+        for idx, form in enumerate(self.forms):
+            should_delete = self.can_delete and self._should_delete_form(form)
+            if idx >= initial_form_count or idx >= len(self.resources):
+                if form.has_changed() and not should_delete:
+                    self.new_objects.append(mapping.apply(form.instance))
+            elif should_delete:
+                self.deleted_objects.append(mapping.apply(self.resources[idx]))
+            elif form.has_changed():
+                instance = mapping.apply(form.instance)
+                changed = changed_fields(instance, field_values(mapping.apply(self.resources[idx])))
+                if changed:
+                    self.changed_objects.append((instance, changed))
+
+        if commit:
+            self.save_objects(model, using or router.db_for_write(model))
+        return self.new_objects + [instance for instance, _ in self.changed_objects]
+
+    def save_objects(self, model, using):
+        """
+        Write the new, changed and deleted objects to the database (and invalidate their cached resources).
+        """
+        manager = model._default_manager.db_manager(using)
+        with transaction.atomic(using=using):
+            if self.new_objects:
+                manager.bulk_create(self.new_objects)
+
+            if self.changed_objects and hasattr(manager, 'bulk_update'):
+                update_fields = set()
+                auto_now = [f for f in model._meta.concrete_fields if getattr(f, 'auto_now', False)]
+                for instance, changed in self.changed_objects:
+                    update_fields.update(changed)
+                    for f in auto_now:
+                        f.pre_save(instance, False)
+                update_fields.update(f.attname for f in auto_now)
+                manager.bulk_update([instance for instance, _ in self.changed_objects], update_fields)
+            else:
+                for instance, changed in self.changed_objects:
+                    save_changes(instance, changed, using=using)
+
+            if self.deleted_objects:
+                manager.filter(pk__in=[instance.pk for instance in self.deleted_objects]).delete()
+
+        resource_cache.invalidate(model, [instance.pk for instance, _ in self.changed_objects] +
+                                  [instance.pk for instance in self.deleted_objects])
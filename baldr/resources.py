@@ -31,6 +31,27 @@ class Listing(odin.Resource):
     )
 
 
+class SizeLimitedListing(Listing):
+    """
+    Response for listing results that are limited by their encoded size (rather than just a count);
+    this includes the offset of the next page.
+
+    """
+    class Meta:
+        namespace = None
+
+    # Wrapper to provide code completion
+    def __init__(self, results, limit, offset=0, total_count=None, next_offset=None):
+        # Fields of the subclass are ordered first so are supplied by name
+        odin.Resource.__init__(self, results=results, limit=limit, offset=offset, total_count=total_count,
+                               next_offset=next_offset)
+
+    next_offset = odin.IntegerField(
+        null=True,
+        help_text="Offset of the next page of results; null if there are no further results."
+    )
+
+
 class Error(odin.Resource):
     """
     Response returned for errors.
@@ -60,3 +81,95 @@ class Error(odin.Resource):
         null=True,
         help_text="Additional meta information that can help to solve issues."
     )
+
+
+class BatchRequest(odin.Resource):
+    """
+    A request included in a batch.
+    """
+    class Meta:
+        namespace = None
+
+    method = odin.StringField(
+        default='GET',
+        use_default_if_not_provided=True,
+        help_text="HTTP method of the request."
+    )
+    path = odin.StringField(
+        help_text="Path of the request (relative to the API collection) including any query string."
+    )
+    body = odin.DictField(
+        null=True,
+        default=None,
+        use_default_if_not_provided=True,
+        help_text="Resource sent as the body of the request."
+    )
+
+
+class BatchResult(odin.Resource):
+    """
+    Result of a request included in a batch.
+    """
+    class Meta:
+        namespace = None
+
+    # Wrapper to provide code completion
+    def __init__(self, status, headers=None, body=None):
+        super(BatchResult, self).__init__(status, headers, body)
+
+    status = odin.IntegerField(
+        help_text="HTTP status code of the response."
+    )
+    headers = odin.DictField(
+        null=True,
+        help_text="Headers of the response."
+    )
+    body = odin.DictField(
+        null=True,
+        help_text="Resource returned in the body of the response."
+    )
+
+
+class IngestError(odin.Resource):
+    """
+    Error ingesting a line of a bulk upload.
+    """
+    class Meta:
+        namespace = None
+
+    # Wrapper to provide code completion
+    def __init__(self, line, message, meta=None):
+        super(IngestError, self).__init__(line, message, meta)
+
+    line = odin.IntegerField(
+        help_text="Line number (starting from 1) of the line that failed."
+    )
+    message = odin.StringField(
+        help_text="Description of the error."
+    )
+    meta = odin.DictField(
+        null=True,
+        help_text="Fields that failed validation."
+    )
+
+
+class IngestResult(odin.Resource):
+    """
+    Result of a bulk upload.
+    """
+    class Meta:
+        namespace = None
+
+    # Wrapper to provide code completion
+    def __init__(self, created, failed, errors):
+        super(IngestResult, self).__init__(created, failed, errors)
+
+    created = odin.IntegerField(
+        help_text="Number of resources created."
+    )
+    failed = odin.IntegerField(
+        help_text="Number of lines that failed."
+    )
+    errors = odin.ArrayField(
+        help_text="Errors for lines that failed (limited to the first errors)."
+    )
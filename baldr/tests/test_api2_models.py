@@ -0,0 +1,743 @@
+from __future__ import absolute_import
+import datetime
+import json
+import odin
+import unittest
+from django import test
+from django.db import connections, models
+from django.db.models.sql.query import Query
+from django.http import Http404
+from django.test.client import RequestFactory
+from django.utils import timezone
+from baldr import ndjson_codec, resource_cache
+from baldr import api2
+from baldr.api import ApiCollection
+from baldr.api2.models import CollectionMixin, CreateMixin, IngestMixin, ListMixin, PatchMixin
+from baldr.coalescing import request_key
+from baldr.identity_map import IdentityMap
+from baldr.models import deferred_fields, field_values, model_resource_factory
+from baldr.profiling import RequestProfiler
+from baldr.queries import QueryCounter
+from baldr.resource_cache import MappedResourceCache
+
+
+class Part(models.Model):
+    name = models.CharField(max_length=50)
+    quantity = models.IntegerField()
+
+    class Meta:
+        app_label = 'baldr'
+
+
+PartResource = model_resource_factory(Part, module=__name__, resource_type_name='PartResource')
+
+
+PartSummaryResource = model_resource_factory(
+    Part, module=__name__, resource_type_name='PartSummaryResource', generate_mappings=False,
+    additional_fields={'summary': odin.StringField()}
+)
+
+
+class Gadget(models.Model):
+    name = models.CharField(max_length=50)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        app_label = 'baldr'
+
+
+GadgetResource = model_resource_factory(Gadget, module=__name__, resource_type_name='GadgetResource')
+
+
+class UpperNamePartMapping(odin.Mapping):
+    from_obj = PartResource
+    to_obj = Part
+    register_mapping = False
+
+    @odin.map_field
+    def name(self, value):
+        return value.upper()
+
+
+class PartApi(IngestMixin):
+    resource = PartResource
+    model = Part
+    metrics = None
+    ingest_batch_size = 2
+    ingest_max_errors = 1
+
+
+class IngestMixinTestCase(test.TestCase):
+    def setUp(self):
+        self.api = PartApi()
+        self.urls = self.api.urls
+        self.view = self.api.wrap_view('collection-ingest')
+        self.factory = RequestFactory()
+
+    def ingest(self, body, content_type='application/x-ndjson'):
+        request = self.factory.post('/parts/ingest', body, content_type=content_type, **{'content-type': content_type})
+        response = self.view(request)
+        return response, json.loads(response.content.decode('utf8'))
+
+    def test_ingest(self):
+        lines = ['{"name": "part %s", "quantity": %s}' % (idx, idx) for idx in range(5)]
+        lines.insert(1, '')
+        lines.insert(2, '{"name": "bad", "quantity": "many"}')
+        lines.insert(3, '{not json')
+
+        response, result = self.ingest('\n'.join(lines))
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(5, result['created'])
+        self.assertEqual(2, result['failed'])
+        self.assertEqual(1, len(result['errors']))
+        self.assertEqual(3, result['errors'][0]['line'])
+        self.assertIn('quantity', result['errors'][0]['meta'])
+        self.assertEqual(5, Part.objects.count())
+
+    def test_requires_ndjson(self):
+        response, result = self.ingest('[]', 'application/json')
+
+        self.assertEqual(415, response.status_code)
+
+
+class PartListApi(ListMixin):
+    resource = PartResource
+    model = Part
+    metrics = None
+    filter_fields = {'quantity': ('exact', 'gte', 'in'), 'name': ('exact', 'startswith')}
+    ordering_fields = ('quantity', 'name')
+
+
+class FilterQuerysetTestCase(test.TestCase):
+    def setUp(self):
+        Part.objects.bulk_create(Part(name='part %s' % idx, quantity=idx) for idx in range(5))
+        self.api = PartListApi()
+        self.urls = self.api.urls
+        self.view = self.api.wrap_view('collection')
+        self.factory = RequestFactory()
+
+    def get(self, **params):
+        response = self.view(self.factory.get('/parts', params))
+        return response, json.loads(response.content.decode('utf8'))
+
+    def test_filter(self):
+        response, result = self.get(quantity__gte='2', ordering='-quantity')
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(3, result['total_count'])
+        self.assertEqual([4, 3, 2], [p['quantity'] for p in result['results']])
+
+    def test_filter_in(self):
+        response, result = self.get(quantity__in='1,3', name__startswith='part')
+
+        self.assertEqual([1, 3], sorted(p['quantity'] for p in result['results']))
+
+    def test_invalid_parameters(self):
+        self.assertEqual(40001, self.get(quantity__lt='2')[1]['sub_status'])
+        self.assertEqual(40001, self.get(unknown='2')[1]['sub_status'])
+        self.assertEqual(40002, self.get(quantity='many')[1]['sub_status'])
+        self.assertEqual(40003, self.get(ordering='id')[1]['sub_status'])
+
+    def test_ordering_not_declared(self):
+        self.api.ordering_fields = None
+
+        response, result = self.get(ordering='id')
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(5, result['total_count'])
+
+    def test_invalid_spec(self):
+        class BadApi(PartListApi):
+            filter_fields = ('colour',)
+
+        with self.assertRaises(AssertionError):
+            BadApi()
+
+    def test_resource_only_field(self):
+        class BadApi(PartListApi):
+            resource = PartSummaryResource
+            ordering_fields = ('summary',)
+
+        with self.assertRaises(AssertionError):
+            BadApi()
+
+    def test_profiler_parameter_reserved(self):
+        self.api.profiler = RequestProfiler(query_param='_trace')
+
+        self.assertEqual(5, self.get(_trace='token')[1]['total_count'])
+        self.assertEqual(40001, self.get(_profile='token')[1]['sub_status'])
+
+
+class CachedPartListApi(ListMixin):
+    resource = PartResource
+    model = Part
+    metrics = None
+    ordering_fields = ('quantity',)
+
+
+class ResourceCacheTestCase(test.TestCase):
+    def setUp(self):
+        Part.objects.bulk_create(Part(name='part %s' % idx, quantity=idx) for idx in range(3))
+        self.api = CachedPartListApi()
+        self.api.resource_cache = self.cache = MappedResourceCache(max_entries=10, version_field='quantity')
+        self.urls = self.api.urls
+        self.view = self.api.wrap_view('collection')
+        self.factory = RequestFactory()
+
+    def get(self, **params):
+        params.setdefault('ordering', 'quantity')
+        response = self.view(self.factory.get('/parts', params))
+        return [(p['name'], p['quantity']) for p in json.loads(response.content.decode('utf8'))['results']]
+
+    def test_cached(self):
+        expected = [('part 0', 0), ('part 1', 1), ('part 2', 2)]
+        self.assertEqual(expected, self.get())
+        self.assertEqual(expected, self.get())
+        self.assertEqual((3, 3), (self.cache.hits, self.cache.misses))
+
+    def test_invalidated_by_save(self):
+        self.get()
+        part = Part.objects.get(name='part 1')
+        part.name = 'renamed'
+        part.save()
+
+        self.assertEqual([('part 0', 0), ('renamed', 1), ('part 2', 2)], self.get())
+        self.assertEqual(4, self.cache.misses)
+
+    def test_invalidated_by_patch_in_place(self):
+        self.get()
+        part = Part.objects.get(name='part 1')
+        api = PartInPlacePatchApi()
+        api.urls
+        request = self.factory.patch('/parts/%s' % part.pk, '{"name": "renamed"}', content_type='application/json')
+        self.assertEqual(204, api.wrap_view('resource')(request, resource_id=str(part.pk)).status_code)
+
+        self.assertEqual([('part 0', 0), ('renamed', 1), ('part 2', 2)], self.get())
+        self.assertEqual(4, self.cache.misses)
+
+    def test_invalidate(self):
+        self.get()
+        # Updates do not send signals
+        Part.objects.filter(name='part 2').update(name='renamed')
+        resource_cache.invalidate(Part, Part.objects.filter(name='renamed').values_list('pk', flat=True))
+
+        self.assertEqual([('part 0', 0), ('part 1', 1), ('renamed', 2)], self.get())
+        self.assertEqual(4, self.cache.misses)
+
+    def test_version_changed(self):
+        self.get()
+        # Updates do not send signals
+        Part.objects.filter(name='part 2').update(quantity=5)
+
+        self.assertEqual([('part 0', 0), ('part 1', 1), ('part 2', 5)], self.get())
+        self.assertEqual(4, self.cache.misses)
+
+    def test_invalidated_while_mapping(self):
+        mapping = self.api.to_resource_mapping
+        parts = list(Part.objects.order_by('quantity'))
+
+        class InvalidatingMapping(object):
+            @staticmethod
+            def apply(instances):
+                resources = mapping.apply(instances)
+                resource_cache.invalidate(Part, [parts[1].pk])
+                return resources
+
+        self.cache.apply(InvalidatingMapping, parts)
+
+        self.assertEqual(2, len(self.cache))
+        self.assertNotIn((Part, parts[1].pk), self.cache._entries)
+        self.assertFalse(self.cache._invalidated)
+
+    def test_invalidated_while_reading(self):
+        parts = list(Part.objects.order_by('quantity'))
+
+        def read():
+            for part in parts:
+                yield part
+            parts[0].save()
+
+        self.cache.apply(self.api.to_resource_mapping, read())
+
+        self.assertNotIn((Part, parts[0].pk), self.cache._entries)
+        self.assertIn((Part, parts[1].pk), self.cache._entries)
+
+    def test_least_recently_used_evicted(self):
+        self.cache.max_entries = 2
+        self.get(limit=1)
+        self.get(offset=1)
+
+        self.assertEqual(2, len(self.cache))
+        self.get(limit=1)
+        self.assertEqual((0, 4), (self.cache.hits, self.cache.misses))
+
+
+class ReplicaPartApi(ListMixin, CreateMixin):
+    resource = PartResource
+    model = Part
+    metrics = None
+    read_databases = ('replica',)
+
+
+class ReadReplicaTestCase(test.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super(ReadReplicaTestCase, cls).setUpClass()
+        connections.databases['replica'] = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'}
+        connections.ensure_defaults('replica')
+        with connections['replica'].schema_editor() as editor:
+            editor.create_model(Part)
+
+    @classmethod
+    def tearDownClass(cls):
+        connections['replica'].close()
+        del connections.databases['replica']
+        del connections._connections.replica
+        super(ReadReplicaTestCase, cls).tearDownClass()
+
+    def setUp(self):
+        Part.objects.using('replica').create(name='replica', quantity=1)
+        self.api = ReplicaPartApi()
+        self.urls = self.api.urls
+        self.view = self.api.wrap_view('collection')
+        self.factory = RequestFactory()
+
+    def tearDown(self):
+        Part.objects.using('replica').all().delete()
+
+    def names(self, response):
+        return [p['name'] for p in json.loads(response.content.decode('utf8'))['results']]
+
+    def test_read_your_writes(self):
+        self.assertEqual(['replica'], self.names(self.view(self.factory.get('/parts'))))
+
+        response = self.view(self.factory.post('/parts', '{"name": "primary", "quantity": 2}',
+                                               content_type='application/json'))
+        self.assertEqual(201, response.status_code)
+        until = response['X-Baldr-Primary-Until']
+        self.assertEqual(until, response.cookies['baldr_primary_until'].value)
+
+        request = self.factory.get('/parts')
+        request.COOKIES['baldr_primary_until'] = until
+        self.assertEqual(['primary'], self.names(self.view(request)))
+
+        request = self.factory.get('/parts', HTTP_X_BALDR_PRIMARY_UNTIL=until)
+        self.assertEqual(['primary'], self.names(self.view(request)))
+
+        request = self.factory.get('/parts', HTTP_X_BALDR_PRIMARY_UNTIL='1')
+        self.assertEqual(['replica'], self.names(self.view(request)))
+
+    def test_coalesce_varies_on_read_your_writes_header(self):
+        def key(request):
+            return request_key(request, 'parts', 'collection', {}, 'application/json',
+                               self.api.coalesce_vary_headers)
+
+        self.assertNotEqual(key(self.factory.get('/parts')),
+                            key(self.factory.get('/parts', HTTP_X_BALDR_PRIMARY_UNTIL='1')))
+
+    def test_batch_read_your_writes(self):
+        view = ApiCollection(ReplicaPartApi(api_name='parts'), batch=True).batch_handler
+        part = {'$': 'baldr.models.PartResource', 'name': 'primary', 'quantity': 2}
+        response = view(self.factory.post('/api/_batch', json.dumps([
+            {'method': 'GET', 'path': 'parts'},
+            {'method': 'POST', 'path': 'parts', 'body': part},
+            {'method': 'GET', 'path': 'parts'},
+            {'method': 'GET', 'path': 'parts'},
+        ]), content_type='application/json'))
+
+        results = json.loads(response.content.decode('utf8'))
+        self.assertEqual([200, 201, 200, 200], [r['status'] for r in results])
+        # Requests following a change are dispatched in turn (the test databases are per thread)
+        self.assertEqual([['replica'], ['primary'], ['primary']],
+                         [[p['name'] for p in r['body']['results']] for r in results if r['status'] == 200])
+        until = results[1]['headers']['X-Baldr-Primary-Until']
+        self.assertEqual(until, response.cookies['baldr_primary_until'].value)
+
+    def test_batch_atomic_uses_write_database(self):
+        class ReplicaWriteApi(ReplicaPartApi):
+            read_databases = None
+            write_database = 'replica'
+
+        view = ApiCollection(ReplicaWriteApi(api_name='parts'), batch=True).batch_handler
+        part = {'$': 'baldr.models.PartResource', 'name': 'primary', 'quantity': 2}
+        response = view(self.factory.post('/api/_batch?atomic=true', json.dumps([
+            {'method': 'POST', 'path': 'parts', 'body': part},
+            {'method': 'POST', 'path': 'parts', 'body': dict(part, quantity='many')},
+        ]), content_type='application/json'))
+
+        results = json.loads(response.content.decode('utf8'))
+        self.assertEqual([201, 400], [r['status'] for r in results])
+        self.assertEqual(['replica'], [p.name for p in Part.objects.using('replica').all()])
+
+
+class PartPatchApi(PatchMixin):
+    resource = PartResource
+    model = Part
+    metrics = None
+
+
+class UpdateFieldsTestCase(test.TestCase):
+    def setUp(self):
+        self.part = Part.objects.create(name='part', quantity=1)
+        self.api = PartPatchApi()
+        self.urls = self.api.urls
+        self.view = self.api.wrap_view('resource')
+        self.factory = RequestFactory()
+
+    def patch(self, body):
+        request = self.factory.patch('/parts/%s' % self.part.pk, body, content_type='application/json')
+        with QueryCounter() as counter:
+            response = self.view(request, resource_id=str(self.part.pk))
+        self.assertEqual(200, response.status_code)
+        return [sql for sql in counter.queries if sql.startswith('UPDATE')]
+
+    def test_only_changed_columns_are_written(self):
+        updates = self.patch('{"quantity": 2}')
+
+        self.assertEqual(1, len(updates))
+        self.assertIn('"quantity"', updates[0])
+        self.assertNotIn('"name"', updates[0])
+        self.assertEqual(2, Part.objects.get(pk=self.part.pk).quantity)
+
+    def test_unchanged_is_not_written(self):
+        self.assertEqual([], self.patch('{"quantity": 1, "name": "part"}'))
+
+    def test_save_model_override(self):
+        class LegacyApi(PartPatchApi):
+            def save_model(self, request, instance, is_new=False):
+                instance.name = 'saved'
+                return super(LegacyApi, self).save_model(request, instance, is_new)
+
+        self.api = LegacyApi()
+        self.urls = self.api.urls
+        self.view = self.api.wrap_view('resource')
+        self.patch('{"quantity": 2}')
+
+        self.assertEqual(('saved', 2), Part.objects.values_list('name', 'quantity').get(pk=self.part.pk))
+
+    def test_deferred_fields(self):
+        part = Part.objects.only('name').get(pk=self.part.pk)
+
+        self.assertEqual({'quantity'}, set(deferred_fields(part)))
+        self.assertEqual({'name': 'part'}, field_values(part))
+
+
+class PartIdentityApi(PatchMixin):
+    resource = PartResource
+    model = Part
+    metrics = None
+
+    @api2.resource_action(name='restock', method=api2.POST)
+    def restock(self, request, resource_id):
+        # Loaded by permission checks, the action and to generate the response
+        part = self.get_instance(request, resource_id)
+        self.get_instance(request, int(resource_id)).quantity += 10
+        self.save_model(request, part)
+        return self.to_resource_mapping.apply(self.get_instance(request, resource_id))
+
+
+class IdentityMapTestCase(test.TestCase):
+    def setUp(self):
+        self.part = Part.objects.create(name='part', quantity=1)
+        self.api = PartIdentityApi()
+        self.urls = self.api.urls
+        self.factory = RequestFactory()
+
+    def test_instance_loaded_once_per_request(self):
+        view = self.api.wrap_view('resource-restock')
+        request = self.factory.post('/parts/%s/restock' % self.part.pk, content_type='application/json')
+        with QueryCounter() as counter:
+            response = view(request, resource_id=str(self.part.pk))
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(11, json.loads(response.content.decode('utf8'))['quantity'])
+        selects = [sql for sql in counter.queries if sql.startswith('SELECT')]
+        # Loaded once before the write and reloaded after
+        self.assertEqual(2, len(selects))
+        self.assertEqual(11, Part.objects.get(pk=self.part.pk).quantity)
+
+    def test_request_without_identity_map(self):
+        request = self.factory.get('/parts/%s' % self.part.pk)
+        self.assertIsNot(self.api.get_instance(request, self.part.pk), self.api.get_instance(request, self.part.pk))
+
+    def test_filtered_queryset_not_shared(self):
+        request = self.factory.get('/parts/%s' % self.part.pk)
+        request.identity_map = IdentityMap()
+
+        part = self.api.get_related_instance(request, Part, self.part.pk)
+        self.assertIs(part, self.api.get_related_instance(request, Part.objects.all(), self.part.pk))
+        with self.assertRaises(Http404):
+            self.api.get_related_instance(request, Part.objects.filter(quantity__gt=5), self.part.pk)
+        with self.assertRaises(Http404):
+            self.api.get_related_instance(request, Part.objects.none(), self.part.pk)
+
+
+class IdentityMapKeyTestCase(unittest.TestCase):
+    def setUp(self):
+        # Keys are generated from the structure of the query, not the SQL
+        self.sql_with_params = Query.sql_with_params
+        Query.sql_with_params = None
+
+    def tearDown(self):
+        Query.sql_with_params = self.sql_with_params
+
+    def test_same_scope(self):
+        self.assertEqual(IdentityMap.key(Part.objects.all(), 'pk', '1'), IdentityMap.key(Part.objects.all(), 'pk', 1))
+        self.assertEqual(IdentityMap.key(Part.objects.filter(quantity__gt=5), 'pk', 1),
+                         IdentityMap.key(Part.objects.filter(quantity__gt=5), 'pk', 1))
+
+    def test_scoped(self):
+        unscoped = IdentityMap.key(Part.objects.all(), 'pk', 1)
+
+        self.assertNotEqual(unscoped, IdentityMap.key(Part.objects.filter(quantity__gt=5), 'pk', 1))
+        self.assertNotEqual(unscoped, IdentityMap.key(Part.objects.exclude(quantity__gt=5), 'pk', 1))
+        self.assertNotEqual(IdentityMap.key(Part.objects.filter(quantity__gt=5), 'pk', 1),
+                            IdentityMap.key(Part.objects.filter(quantity__gt=6), 'pk', 1))
+        self.assertNotEqual(IdentityMap.key(Part.objects.filter(name='1'), 'pk', 1),
+                            IdentityMap.key(Part.objects.filter(name__startswith='1'), 'pk', 1))
+        self.assertNotEqual(unscoped, IdentityMap.key(Part.objects.using('other'), 'pk', 1))
+
+    def test_not_identified(self):
+        self.assertIsNone(IdentityMap.key(Part.objects.none(), 'pk', 1))
+        self.assertIsNone(IdentityMap.key(Part.objects.all()[:5], 'pk', 1))
+        self.assertIsNone(IdentityMap.key(Part.objects.extra(where=['1 = 1']), 'pk', 1))
+        self.assertIsNone(IdentityMap.key(Part.objects.filter(name__in=Part.objects.values('name')), 'pk', 1))
+
+
+class PartInPlacePatchApi(PatchMixin):
+    resource = PartResource
+    model = Part
+    metrics = None
+    patch_in_place = True
+
+
+class PatchInPlaceTestCase(test.TestCase):
+    def setUp(self):
+        self.part = Part.objects.create(name='part', quantity=1)
+        self.api = PartInPlacePatchApi()
+        self.urls = self.api.urls
+        self.view = self.api.wrap_view('resource')
+        self.factory = RequestFactory()
+
+    def patch(self, body, resource_id=None, **extra):
+        resource_id = str(resource_id or self.part.pk)
+        request = self.factory.patch('/parts/%s' % resource_id, body, content_type='application/json', **extra)
+        with QueryCounter() as counter:
+            response = self.view(request, resource_id=resource_id)
+        return response, counter.queries
+
+    def test_single_update(self):
+        response, queries = self.patch('{"quantity": 2}')
+
+        self.assertEqual(204, response.status_code)
+        self.assertEqual(1, len(queries))
+        self.assertTrue(queries[0].startswith('UPDATE'))
+        self.assertEqual(2, Part.objects.get(pk=self.part.pk).quantity)
+
+    def test_representation(self):
+        response, queries = self.patch('{"name": "patched"}', HTTP_PREFER='return=representation')
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual('patched', json.loads(response.content.decode('utf8'))['name'])
+
+    def test_not_found(self):
+        response, _ = self.patch('{"quantity": 2}', resource_id=self.part.pk + 1)
+
+        self.assertEqual(404, response.status_code)
+
+    def test_invalid(self):
+        response, _ = self.patch('{"name": null}')
+
+        self.assertEqual(400, response.status_code)
+
+
+class UpperNamePartPatchApi(PartInPlacePatchApi):
+    to_model_mapping = UpperNamePartMapping
+
+
+class GadgetPatchApi(PatchMixin):
+    resource = GadgetResource
+    model = Gadget
+    metrics = None
+    patch_in_place = True
+
+
+class PatchInPlaceMappingTestCase(test.TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def patch(self, api, instance, body):
+        api.urls
+        request = self.factory.patch('/items/%s' % instance.pk, body, content_type='application/json')
+        with QueryCounter() as counter:
+            response = api.wrap_view('resource')(request, resource_id=str(instance.pk))
+        self.assertLess(response.status_code, 300)
+        return counter.queries
+
+    def test_auto_now_updated(self):
+        gadget = Gadget.objects.create(name='gadget')
+        updated = timezone.now() - datetime.timedelta(days=1)
+        Gadget.objects.filter(pk=gadget.pk).update(updated=updated)
+
+        queries = self.patch(GadgetPatchApi(), gadget, '{"name": "patched"}')
+
+        self.assertEqual(1, len(queries))
+        gadget = Gadget.objects.get(pk=gadget.pk)
+        self.assertEqual('patched', gadget.name)
+        self.assertGreater(gadget.updated, updated)
+
+    def test_custom_mapping_applied(self):
+        part = Part.objects.create(name='part', quantity=1)
+
+        queries = self.patch(UpperNamePartPatchApi(), part, '{"name": "patched"}')
+
+        self.assertTrue(queries[0].startswith('SELECT'))
+        self.assertEqual('PATCHED', Part.objects.get(pk=part.pk).name)
+
+    def test_uncustomised_fields_in_place(self):
+        part = Part.objects.create(name='part', quantity=1)
+
+        queries = self.patch(UpperNamePartPatchApi(), part, '{"quantity": 2}')
+
+        self.assertEqual(1, len(queries))
+        self.assertEqual(2, Part.objects.get(pk=part.pk).quantity)
+
+
+class PartWriteApi(CreateMixin, PatchMixin):
+    resource = PartResource
+    model = Part
+    metrics = None
+
+
+class ReturnPreferenceTestCase(test.TestCase):
+    def setUp(self):
+        self.api = PartWriteApi()
+        self.urls = self.api.urls
+        self.factory = RequestFactory()
+
+    def test_create_minimal(self):
+        request = self.factory.post('/parts', '{"name": "part", "quantity": 1}', content_type='application/json',
+                                    HTTP_PREFER='return=minimal')
+        response = self.api.wrap_view('collection')(request)
+
+        part = Part.objects.get()
+        self.assertEqual(201, response.status_code)
+        self.assertEqual(b'', response.content)
+        self.assertEqual('/parts/%s' % part.pk, response['Location'])
+        self.assertEqual('return=minimal', response['Preference-Applied'])
+
+    def test_patch_minimal(self):
+        part = Part.objects.create(name='part', quantity=1)
+        request = self.factory.patch('/parts/%s' % part.pk, '{"quantity": 2}', content_type='application/json',
+                                     HTTP_PREFER='return=minimal')
+        response = self.api.wrap_view('resource')(request, resource_id=str(part.pk))
+
+        self.assertEqual(204, response.status_code)
+        self.assertEqual('return=minimal', response['Preference-Applied'])
+        self.assertEqual(2, Part.objects.get().quantity)
+
+    def test_no_preference(self):
+        request = self.factory.post('/parts', '{"name": "part", "quantity": 1}', content_type='application/json')
+        response = self.api.wrap_view('collection')(request)
+
+        self.assertEqual(201, response.status_code)
+        self.assertEqual('part', json.loads(response.content.decode('utf8'))['name'])
+        self.assertNotIn('Preference-Applied', response)
+
+    def test_get_return_preference(self):
+        for header, expected in (
+            ('return=minimal', 'minimal'),
+            ('respond-async, return="representation"; foo=bar', 'representation'),
+            ('return=other', None),
+            ('', None),
+        ):
+            request = self.factory.get('/parts', HTTP_PREFER=header)
+            self.assertEqual(expected, self.api.get_return_preference(request))
+
+
+class NdjsonCodecTestCase(test.SimpleTestCase):
+    def test_round_trip(self):
+        parts = [PartResource(id=1, name='a', quantity=1), PartResource(id=2, name='b', quantity=2)]
+
+        actual = ndjson_codec.loads(ndjson_codec.dumps(parts), PartResource)
+
+        self.assertEqual(['a', 'b'], [p.name for p in actual])
+
+    def test_iter_loads(self):
+        results = list(ndjson_codec.iter_loads([b'{"id": 1, "name": "a", "quantity": 1}\n', b'\n', b'{'],
+                                               PartResource))
+
+        self.assertEqual([1, 3], [line_number for line_number, _, _ in results])
+        self.assertEqual('a', results[0][1].name)
+        self.assertIsNotNone(results[1][2])
+
+
+try:
+    from baldr import arrow_codec
+except ImportError:
+    arrow_codec = None
+
+
+class PartCollectionApi(CollectionMixin):
+    resource = PartResource
+    model = Part
+    metrics = None
+    api_name = 'part-collection'
+    stream_chunk_size = 2
+
+
+class UpperNamePartResourceMapping(odin.Mapping):
+    from_obj = Part
+    to_obj = PartResource
+    register_mapping = False
+
+    @odin.map_field
+    def name(self, value):
+        return value.upper()
+
+
+class RowsCodec(object):
+    CONTENT_TYPE = 'application/x-rows'
+
+    @staticmethod
+    def stream_rows(rows, fields, chunk_size):
+        return [json.dumps(list(rows)).encode('utf8')]
+
+
+class StreamCollectionTestCase(test.TestCase):
+    def setUp(self):
+        Part.objects.bulk_create(Part(name='part %s' % idx, quantity=idx) for idx in range(2))
+        self.request = RequestFactory().get('/part-collection')
+        self.request.response_codec = RowsCodec
+
+    def stream(self, api):
+        response = api.stream_collection(self.request, Part.objects.order_by('quantity'))
+        rows = json.loads(b''.join(response.streaming_content).decode('utf8'))
+        return [tuple(row[1:]) for row in rows]
+
+    def test_values_list(self):
+        self.assertEqual([('part 0', 0), ('part 1', 1)], self.stream(PartCollectionApi()))
+
+    def test_custom_mapping_applied(self):
+        api = PartCollectionApi()
+        api.to_resource_mapping = UpperNamePartResourceMapping
+
+        rows = self.stream(api)
+
+        self.assertEqual([('PART 0', 0), ('PART 1', 1)], rows)
+
+
+@unittest.skipIf(arrow_codec is None, "pyarrow is not installed")
+class ArrowCollectionTestCase(test.TestCase):
+    def test_stream(self):
+        Part.objects.bulk_create(Part(name='part %s' % idx, quantity=idx) for idx in range(5))
+        api = PartCollectionApi()
+        api.base_urls()
+        request = RequestFactory().get('/part-collection', **{'accepts': arrow_codec.CONTENT_TYPE})
+
+        response = api.wrap_view('collection')(request)
+
+        self.assertTrue(response.streaming)
+        parts = arrow_codec.loads(b''.join(response.streaming_content), PartResource)
+        self.assertEqual(['part %s' % idx for idx in range(5)], [p.name for p in parts])
@@ -0,0 +1,118 @@
+from __future__ import absolute_import
+import json
+import unittest
+from django.http import Http404
+from django.test.client import RequestFactory
+from baldr import api2
+from baldr.api import ApiCollection
+from baldr.metrics import MetricsRegistry
+from baldr.tests.test_metrics import Widget
+
+
+class GizmoApi(api2.ResourceApi):
+    resource = Widget
+    api_name = 'gizmos'
+    resource_id_regex = r'[a-z]+'
+
+    @api2.listing
+    def gizmo_list(self, request, offset, limit):
+        return [Widget(name='a')]
+
+    @api2.detail
+    def gizmo_detail(self, request, resource_id):
+        return Widget(name=resource_id)
+
+    @api2.collection_action(name='summary')
+    def summary(self, request):
+        return Widget(name='summary')
+
+    @api2.resource_action(name='colour')
+    def colour(self, request, resource_id):
+        return Widget(name='%s-colour' % resource_id)
+
+
+class CompiledDispatcherTestCase(unittest.TestCase):
+    def setUp(self):
+        self.target = ApiCollection(GizmoApi(), compiled=True)
+        self.factory = RequestFactory()
+
+    def assertResolves(self, path, expected_kwargs):
+        view, kwargs = self.target.dispatcher.resolve(path)
+        self.assertEqual(expected_kwargs, kwargs)
+        return view
+
+    def test_resolve(self):
+        self.assertResolves('gizmos', {})
+        self.assertResolves('gizmos/', {})
+        self.assertResolves('gizmos/summary', {})
+        self.assertResolves('gizmos/abc/', {'resource_id': 'abc'})
+        self.assertResolves('gizmos/abc/colour', {'resource_id': 'abc'})
+
+    def test_resolve_unmatched(self):
+        dispatcher = self.target.dispatcher
+        self.assertIsNone(dispatcher.resolve('widgets/'))
+        self.assertIsNone(dispatcher.resolve('gizmos/123/'))
+        self.assertIsNone(dispatcher.resolve('gizmos/abc/shape'))
+        self.assertIsNone(dispatcher.resolve('gizmos/abc/colour/more'))
+
+    def test_single_url(self):
+        self.assertEqual(1, len(self.target.urls))
+
+    def test_dispatch(self):
+        response = self.target.dispatcher(self.factory.get('/api/gizmos/abc/colour'), 'gizmos/abc/colour')
+
+        self.assertEqual(200, response.status_code)
+        self.assertIn(b'abc-colour', response.content)
+
+    def test_dispatch_not_found(self):
+        with self.assertRaises(Http404):
+            self.target.dispatcher(self.factory.get('/api/gizmos/123'), 'gizmos/123')
+
+
+class BatchTestCase(unittest.TestCase):
+    def setUp(self):
+        self.target = ApiCollection(GizmoApi(), batch=True, batch_max_requests=5)
+        self.view = self.target.batch_handler
+        self.factory = RequestFactory()
+
+    def post(self, batch, path='/api/_batch'):
+        response = self.view(self.factory.post(path, json.dumps(batch), content_type='application/json'))
+        return response, json.loads(response.content.decode('utf8'))
+
+    def test_batch(self):
+        response, results = self.post([
+            {'path': 'gizmos/abc'},
+            {'method': 'GET', 'path': 'gizmos/def/colour'},
+            {'path': 'gizmos/summary?offset=1'},
+            {'method': 'POST', 'path': 'gizmos/abc'},
+            {'path': 'unknown/abc'},
+        ])
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual([200, 200, 200, 405, 404], [r['status'] for r in results])
+        self.assertEqual('abc', results[0]['body']['name'])
+        self.assertEqual('def-colour', results[1]['body']['name'])
+        self.assertEqual(40500, results[3]['body']['sub_status'])
+        self.assertIn('Allow', results[3]['headers'])
+
+    def test_batch_handled_as_requests(self):
+        metrics = self.target.dispatcher.resolve_route('gizmos')[0].metrics = MetricsRegistry()
+
+        response, results = self.post([{'path': 'gizmos/abc'}, {'path': 'gizmos/def'}, {'path': 'gizmos/summary'}])
+
+        self.assertEqual([200, 200, 200], [r['status'] for r in results])
+        self.assertEqual(3, sum(data['requests'] for _, data in metrics.snapshot()))
+
+    def test_batch_url(self):
+        self.assertEqual(1, len([u for u in self.target.urls if '_batch' in u.regex.pattern]))
+
+    def test_too_many_requests(self):
+        response, result = self.post([{'path': 'gizmos/abc'}] * 6)
+
+        self.assertEqual(413, response.status_code)
+
+    def test_not_a_list(self):
+        response, result = self.post({'path': 'gizmos/abc'})
+
+        self.assertEqual(400, response.status_code)
+        self.assertEqual(40097, result['sub_status'])
@@ -0,0 +1,85 @@
+from __future__ import absolute_import
+import json
+import unittest
+from django.test.client import RequestFactory
+from odin.codecs import json_codec
+from baldr import api2
+from baldr.canned_errors import CannedErrors
+from baldr.tests.test_metrics import WidgetApi
+
+
+class UnfinishedWidgetApi(WidgetApi):
+    @api2.collection_action(name='summary')
+    def summary(self, request):
+        raise NotImplementedError()
+
+
+class CannedErrorsTestCase(unittest.TestCase):
+    def test_encoded_once(self):
+        target = CannedErrors()
+
+        first = target.encode(json_codec, 404, 40400, "Not found")
+        second = target.encode(json_codec, 404, 40400, "Not found")
+
+        self.assertIs(first, second)
+        self.assertEqual(40400, json.loads(first.decode('utf8'))['sub_status'])
+
+    def test_meta(self):
+        target = CannedErrors()
+
+        first = target.encode(json_codec, 405, 40500, "Method not allowed", meta={'allow': 'GET'})
+        second = target.encode(json_codec, 405, 40500, "Method not allowed", meta={'allow': 'GET'})
+        other = target.encode(json_codec, 405, 40500, "Method not allowed", meta={'allow': 'POST'})
+
+        self.assertIs(first, second)
+        self.assertNotEqual(first, other)
+
+    def test_max_entries(self):
+        target = CannedErrors(max_entries=2)
+
+        common = target.encode(json_codec, 404, 40400, "Not found")
+        target.encode(json_codec, 400, 40000, "Bad request", "one-off a")
+        self.assertIs(common, target.encode(json_codec, 404, 40400, "Not found"))
+        target.encode(json_codec, 400, 40000, "Bad request", "one-off b")
+
+        self.assertEqual(2, len(target._content))
+        self.assertIs(common, target.encode(json_codec, 404, 40400, "Not found"))
+
+    def test_response(self):
+        target = CannedErrors()
+
+        response = target.response(json_codec, 405, 40500, "Method not allowed", headers={'Allow': 'GET'})
+
+        self.assertEqual(405, response.status_code)
+        self.assertEqual(40500, response.sub_status)
+        self.assertEqual('GET', response['Allow'])
+
+
+class ApiCannedErrorsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.api = UnfinishedWidgetApi()
+        self.api.metrics = None
+        self.api.canned_errors = CannedErrors()
+        self.urls = self.api.urls
+        self.factory = RequestFactory()
+
+    def test_method_not_allowed(self):
+        view = self.api.wrap_view('resource')
+
+        first = view(self.factory.delete('/widgets/1'), resource_id='1')
+        second = view(self.factory.delete('/widgets/1'), resource_id='1')
+
+        self.assertEqual(405, first.status_code)
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(1, len(self.api.canned_errors._content))
+        self.assertEqual({'allow': second['Allow']}, json.loads(second.content.decode('utf8'))['meta'])
+
+    def test_not_implemented(self):
+        view = self.api.wrap_view('collection-summary')
+
+        first = view(self.factory.get('/widgets/summary'))
+        second = view(self.factory.get('/widgets/summary'))
+
+        self.assertEqual(501, first.status_code)
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(1, len(self.api.canned_errors._content))
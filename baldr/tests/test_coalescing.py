@@ -0,0 +1,104 @@
+from __future__ import absolute_import
+import threading
+import time
+import unittest
+from django.http import HttpResponse
+from django.test.client import RequestFactory
+from baldr import api2
+from baldr.coalescing import LocalBackend, CacheBackend, freeze_response, request_key
+from baldr.tests.test_metrics import Widget
+
+
+class CoalescedApi(api2.ResourceApi):
+    resource = Widget
+    api_name = 'coalesced'
+    metrics = None
+    coalesce_requests = True
+
+    calls = 0
+
+    @api2.detail
+    def coalesced_detail(self, request, resource_id):
+        self.calls += 1
+        return Widget(name=resource_id)
+
+
+class LocalBackendTestCase(unittest.TestCase):
+    def test_coalesce(self):
+        target = LocalBackend()
+        release = threading.Event()
+        calls = []
+
+        def func():
+            calls.append(1)
+            release.wait(5)
+            return HttpResponse(b'shared', status=200)
+
+        responses = []
+
+        def request():
+            responses.append(target.run('key', func, 5))
+
+        threads = [threading.Thread(target=request)]
+        threads[0].start()
+        while 'key' not in target._flights:
+            time.sleep(0.001)
+        for _ in range(4):
+            thread = threading.Thread(target=request)
+            thread.start()
+            threads.append(thread)
+        time.sleep(0.05)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(1, len(calls))
+        self.assertEqual([b'shared'] * 5, [r.content for r in responses])
+        self.assertEqual({}, target._flights)
+
+    def test_not_shared(self):
+        self.assertIsNone(freeze_response(HttpResponse(status=500)))
+
+
+class CacheBackendTestCase(unittest.TestCase):
+    def test_leader(self):
+        target = CacheBackend(key_prefix='test.leader')
+
+        response = target.run('key', lambda: HttpResponse(b'leader'), 1)
+
+        self.assertEqual(b'leader', response.content)
+        self.assertIsNone(target.cache.get('test.leader:key'))
+
+    def test_follower(self):
+        target = CacheBackend(key_prefix='test.follower')
+        target.cache.set('test.follower:key', 'abc')
+        target.cache.set('test.follower:key:abc', freeze_response(HttpResponse(b'from leader', status=201)))
+        try:
+            response = target.run('key', lambda: HttpResponse(b'follower'), 1)
+        finally:
+            target.cache.delete_many(['test.follower:key', 'test.follower:key:abc'])
+
+        self.assertEqual(201, response.status_code)
+        self.assertEqual(b'from leader', response.content)
+
+
+class ApiCoalescingTestCase(unittest.TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def test_request_key(self):
+        key = request_key(self.factory.get('/a', {'b': 1}), 'api', 'resource', {'resource_id': '1'},
+                          'application/json', ('HTTP_AUTHORIZATION',))
+        other_user = request_key(self.factory.get('/a', {'b': 1}, HTTP_AUTHORIZATION='x'), 'api', 'resource',
+                                 {'resource_id': '1'}, 'application/json', ('HTTP_AUTHORIZATION',))
+
+        self.assertNotEqual(key, other_user)
+
+    def test_wrap_view(self):
+        api = CoalescedApi()
+        api.base_urls()
+
+        response = api.wrap_view('resource')(self.factory.get('/coalesced/1'), resource_id='1')
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(1, api.calls)
@@ -0,0 +1,126 @@
+from __future__ import absolute_import
+import gzip
+import io
+import json
+import unittest
+import zlib
+from django.http import StreamingHttpResponse
+from django.test.client import RequestFactory
+from baldr import api2, compression
+from baldr.exceptions import ImmediateErrorHttpResponse
+from baldr.tests.test_metrics import Widget
+
+
+def gzip_compress(data):
+    buf = io.BytesIO()
+    with gzip.GzipFile(fileobj=buf, mode='wb') as f:
+        f.write(data)
+    return buf.getvalue()
+
+
+class SprocketApi(api2.ResourceApi):
+    resource = Widget
+    api_name = 'sprockets'
+    compress_responses = True
+    compress_min_size = 500
+    metrics = None
+
+    @api2.listing
+    def sprocket_list(self, request, offset, limit):
+        return [Widget(name='sprocket %s' % idx) for idx in range(limit)]
+
+    @api2.detail(compress=False)
+    def sprocket_detail(self, request, resource_id):
+        return Widget(name=resource_id * 200)
+
+    @api2.create
+    def sprocket_create(self, request):
+        return self.resource_from_body(request), 201
+
+
+class NegotiateCodingTestCase(unittest.TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def assertNegotiated(self, expected, accept_encoding):
+        coding = compression.negotiate_coding(self.factory.get('/', HTTP_ACCEPT_ENCODING=accept_encoding),
+                                              {'gzip': compression.CODINGS['gzip'],
+                                               'deflate': compression.CODINGS['deflate']})
+        self.assertEqual(expected, coding and coding.name)
+
+    def test_negotiate(self):
+        self.assertNegotiated('gzip', 'gzip, deflate')
+        self.assertNegotiated('deflate', 'gzip;q=0.5, deflate')
+        self.assertNegotiated('deflate', 'deflate, gzip;q=0')
+        self.assertNegotiated('gzip', '*')
+        self.assertNegotiated(None, 'br')
+        self.assertNegotiated(None, 'gzip;q=0.5, identity')
+        self.assertNegotiated(None, '')
+
+    def test_decompress(self):
+        data = b'x' * 1000
+        self.assertEqual(data, compression.decompress('gzip', gzip_compress(data), 100))
+        self.assertEqual(data, compression.decompress('deflate', zlib.compress(data), 100))
+
+    def test_decompress_limit(self):
+        data = gzip_compress(b'x' * 100000)
+        with self.assertRaises(compression.DecompressionLimitExceeded):
+            compression.decompress('gzip', data, 10)
+
+    def test_decompress_corrupt(self):
+        with self.assertRaises(compression.DecompressionError):
+            compression.decompress('gzip', b'not gzip', 10)
+
+    def test_streaming(self):
+        response = StreamingHttpResponse(iter([b'a' * 1000, b'b' * 1000]))
+        request = self.factory.get('/', HTTP_ACCEPT_ENCODING='gzip')
+
+        compression.compress_response(request, response)
+
+        self.assertEqual('gzip', response['Content-Encoding'])
+        self.assertEqual(b'a' * 1000 + b'b' * 1000, zlib.decompress(b''.join(response.streaming_content), 31))
+
+
+class ApiCompressionTestCase(unittest.TestCase):
+    def setUp(self):
+        self.api = SprocketApi()
+        self.urls = self.api.urls
+        self.factory = RequestFactory()
+
+    def test_compressed_listing(self):
+        request = self.factory.get('/sprockets', HTTP_ACCEPT_ENCODING='gzip')
+
+        response = self.api.wrap_view('collection')(request)
+
+        self.assertEqual('gzip', response['Content-Encoding'])
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(50, len(json.loads(zlib.decompress(response.content, 31).decode('utf8'))['results']))
+
+    def test_below_min_size(self):
+        request = self.factory.get('/sprockets', {'limit': 1}, HTTP_ACCEPT_ENCODING='gzip')
+
+        response = self.api.wrap_view('collection')(request)
+
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_route_disabled(self):
+        request = self.factory.get('/sprockets/a', HTTP_ACCEPT_ENCODING='gzip')
+
+        response = self.api.wrap_view('resource')(request, resource_id='a')
+
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_compressed_body(self):
+        request = self.factory.post('/sprockets', gzip_compress(b'{"$": "baldr.tests.metrics.Widget", "name": "a"}'),
+                                    content_type='application/json', HTTP_CONTENT_ENCODING='gzip')
+
+        response = self.api.wrap_view('collection')(request)
+
+        self.assertEqual(201, response.status_code)
+
+    def test_unsupported_body_encoding(self):
+        request = self.factory.post('/sprockets', b'abc', content_type='application/json', HTTP_CONTENT_ENCODING='lzma')
+
+        with self.assertRaises(ImmediateErrorHttpResponse) as ctx:
+            self.api.decode_body(request)
+        self.assertEqual(415, ctx.exception.status)
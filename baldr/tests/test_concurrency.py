@@ -0,0 +1,142 @@
+from __future__ import absolute_import
+import threading
+import unittest
+from django.test.client import RequestFactory
+from baldr import api2
+from baldr.concurrency import ConcurrencyLimiter, AdaptiveConcurrencyLimiter
+from baldr.tests.test_metrics import Widget
+
+
+class ThrottledApi(api2.ResourceApi):
+    resource = Widget
+    api_name = 'throttled'
+    metrics = None
+    concurrency_retry_after = 5
+
+    @api2.listing(max_concurrency=1)
+    def throttled_list(self, request, offset, limit):
+        return []
+
+    @api2.detail
+    def throttled_detail(self, request, resource_id):
+        return Widget(name=resource_id)
+
+
+class ConcurrencyLimiterTestCase(unittest.TestCase):
+    def test_limit(self):
+        target = ConcurrencyLimiter(2)
+
+        self.assertTrue(target.acquire())
+        self.assertTrue(target.acquire())
+        self.assertFalse(target.acquire())
+        target.release()
+        self.assertTrue(target.acquire())
+
+    def test_queue_timeout(self):
+        target = ConcurrencyLimiter(1, max_queue=1, timeout=0.01)
+        target.acquire()
+
+        self.assertFalse(target.acquire())
+        self.assertEqual(0, target.waiting)
+
+    def test_queue_released(self):
+        target = ConcurrencyLimiter(1, max_queue=1, timeout=5)
+        target.acquire()
+        timer = threading.Timer(0.01, target.release)
+        timer.start()
+
+        self.assertTrue(target.acquire())
+        timer.join()
+
+    def test_adaptive(self):
+        target = AdaptiveConcurrencyLimiter(8, min_concurrency=2, smoothing=1)
+
+        for _ in range(8):
+            target.acquire()
+            target.release(0.01)
+        self.assertEqual(8, target.limit)
+
+        for _ in range(8):
+            target.acquire()
+            target.release(0.1)
+        self.assertEqual(6, target.limit)
+
+        for _ in range(30):
+            target.acquire()
+            target.release(0.1)
+        self.assertEqual(2, target.limit)
+
+    def test_adaptive_baseline_follows_latency(self):
+        target = AdaptiveConcurrencyLimiter(8, min_concurrency=2, smoothing=1, baseline_window=2)
+
+        for duration in [0.01] * 8 + [0.1] * 8:
+            target.acquire()
+            target.release(duration)
+        self.assertEqual(6, target.limit)
+        self.assertEqual(0.01, target.baseline_latency)
+
+        # Latency has stayed high for a window so becomes the baseline; the limit recovers
+        for _ in range(20):
+            target.acquire()
+            target.release(0.1)
+        self.assertEqual(0.1, target.baseline_latency)
+        self.assertGreater(target.limit, 4)
+
+
+class ApiConcurrencyTestCase(unittest.TestCase):
+    def setUp(self):
+        self.api = ThrottledApi()
+        self.urls = self.api.urls
+        self.factory = RequestFactory()
+
+    def test_shed(self):
+        limiter = self.api.route_limiters['collection']['GET']
+        limiter.timeout = 0
+        limiter.acquire()
+        try:
+            response = self.api.wrap_view('collection')(self.factory.get('/throttled'))
+        finally:
+            limiter.release()
+
+        self.assertEqual(503, response.status_code)
+        self.assertEqual('5', response['Retry-After'])
+
+        response = self.api.wrap_view('collection')(self.factory.get('/throttled'))
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(0, limiter.active)
+
+    def test_other_routes_unaffected(self):
+        limiter = self.api.route_limiters['collection']['GET']
+        limiter.acquire()
+        try:
+            response = self.api.wrap_view('resource')(self.factory.get('/throttled/1'), resource_id='1')
+        finally:
+            limiter.release()
+
+        self.assertEqual(200, response.status_code)
+
+    def test_queued_request_does_not_hold_api_limiter(self):
+        self.api.concurrency_limiter = api_limiter = ConcurrencyLimiter(1)
+        limiter = self.api.route_limiters['collection']['GET']
+        limiter.max_queue = 1
+        limiter.timeout = 5
+        limiter.acquire()
+
+        responses = []
+        thread = threading.Thread(target=lambda: responses.append(
+            self.api.wrap_view('collection')(self.factory.get('/throttled'))
+        ))
+        thread.start()
+        try:
+            while not limiter.waiting:
+                thread.join(0.001)
+            self.assertEqual(0, api_limiter.active)
+            response = self.api.wrap_view('resource')(self.factory.get('/throttled/1'), resource_id='1')
+        finally:
+            limiter.release()
+            thread.join()
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(200, responses[0].status_code)
+        self.assertEqual(0, api_limiter.active)
+        self.assertEqual(0, limiter.active)
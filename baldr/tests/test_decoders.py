@@ -0,0 +1,92 @@
+from __future__ import absolute_import
+import copy
+import json
+import unittest
+import odin
+from odin.codecs import json_codec
+from odin.exceptions import ValidationError
+from odin.fields import NotProvided
+from baldr import decoders
+
+
+class Author(odin.Resource):
+    class Meta:
+        namespace = 'tests.decoders'
+
+    name = odin.StringField(max_length=5)
+
+
+class Book(odin.Resource):
+    class Meta:
+        namespace = 'tests.decoders'
+
+    id = odin.IntegerField(null=True)
+    title = odin.StringField(max_length=10)
+    genre = odin.StringField(choices=(('sci-fi', 'Science Fiction'), ('fantasy', 'Fantasy')), null=True)
+    price = odin.FloatField(null=True, min_value=0)
+    in_print = odin.BooleanField(default=True, use_default_if_not_provided=True)
+    published = odin.DateTimeField(null=True)
+    author = odin.DictAs(Author, null=True)
+
+    def clean_title(self, value):
+        if value == 'bad':
+            raise ValidationError("Bad title")
+        return value
+
+
+DOCUMENTS = [
+    {'id': 1, 'title': "Odin", 'genre': 'fantasy', 'price': 1, 'published': '2016-01-01T00:00:00Z',
+     'author': {'name': "Tim"}},
+    {'id': '2', 'title': 3, 'in_print': 'yes'},
+    {'id': 'x', 'title': "A title that is too long", 'genre': 'horror', 'price': -1},
+    {'title': 'bad', 'in_print': None},
+    {'title': "Odin", 'author': {'name': "Too long"}},
+    [{'title': "Odin"}, {'title': "Baldr"}],
+    {},
+]
+
+
+def outcome(func):
+    try:
+        result = func()
+    except ValidationError as ve:
+        return 'error', ve.error_messages
+    return as_dict(result)
+
+
+def as_dict(value):
+    if isinstance(value, list):
+        return [as_dict(v) for v in value]
+    if isinstance(value, odin.Resource):
+        return dict((k, as_dict(v)) for k, v in value.to_dict().items())
+    return value
+
+
+class DecodersTestCase(unittest.TestCase):
+    def test_loads(self):
+        for document in DOCUMENTS:
+            body = json.dumps(document)
+            for full_clean in (True, False):
+                for default_to_not_supplied in (True, False):
+                    expected = outcome(lambda: json_codec.loads(body, Book, full_clean, default_to_not_supplied))
+                    actual = outcome(lambda: decoders.loads(json_codec, body, Book, full_clean,
+                                                            default_to_not_supplied))
+                    self.assertEqual(expected, actual)
+
+    def test_full_clean(self):
+        resources = [
+            Book(1, "Odin", 'fantasy', 1.0),
+            Book('2', "A title that is too long", 'horror', -1, None),
+            Book(title='bad', in_print='yes'),
+            Book(title=NotProvided, genre=NotProvided),
+        ]
+        for resource in resources:
+            for kwargs in ({}, {'exclude': ('title',)}, {'ignore_not_provided': True}):
+                expected = copy.copy(resource)
+                actual = copy.copy(resource)
+                self.assertEqual(outcome(lambda: expected.full_clean(**kwargs) or expected),
+                                 outcome(lambda: decoders.full_clean(actual, **kwargs) or actual))
+
+    def test_compiled_once(self):
+        self.assertIs(decoders.get_decoder(Book), decoders.get_decoder(Book))
+        self.assertIs(decoders.get_validator(Book), decoders.get_validator(Book))
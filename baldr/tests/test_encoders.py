@@ -0,0 +1,111 @@
+from __future__ import absolute_import
+import datetime
+import decimal
+import json
+import unittest
+import uuid
+import odin
+from odin.codecs import json_codec
+from odin.datetimeutil import utc
+from baldr import encoders
+from baldr.resources import Listing
+
+try:
+    from odin.codecs import msgpack_codec
+    import msgpack
+except ImportError:
+    msgpack_codec = None
+
+
+class Author(odin.Resource):
+    class Meta:
+        namespace = 'tests.encoders'
+
+    name = odin.StringField()
+    born = odin.DateField(null=True)
+
+
+class Book(odin.Resource):
+    class Meta:
+        namespace = 'tests.encoders'
+
+    id = odin.IntegerField()
+    title = odin.StringField()
+    published = odin.DateTimeField(null=True)
+    isbn = odin.UUIDField(null=True)
+    tags = odin.TypedListField(odin.StringField(), null=True)
+    author = odin.DictAs(Author, null=True)
+    editors = odin.ListOf(Author, null=True)
+    extra = odin.DictField(null=True)
+    upper_title = odin.CalculatedField(lambda o: o.title.upper())
+
+
+def make_books():
+    return [
+        Book(1, "Odin", datetime.datetime(2016, 1, 2, 3, 4, 5, tzinfo=utc), uuid.uuid4(), ['a', 'b'],
+             Author("Tim", datetime.date(1980, 1, 1)), [Author("Jo")], {'reviewed': datetime.date(2016, 2, 1)}),
+        Book(2, "Baldr"),
+    ]
+
+
+class EncodersTestCase(unittest.TestCase):
+    def assertSameEncoding(self, expected, actual, loads):
+        # Keys are only ordered consistently where dicts are ordered.
+        self.assertEqual(loads(expected), loads(actual))
+        if isinstance(actual, type(u'')) and list(dict(a=1, b=2, c=3)) == ['a', 'b', 'c']:
+            self.assertEqual(expected, actual)
+
+    def test_json(self):
+        for resource in (make_books(), make_books()[0], Listing(make_books(), 10, 0, 2)):
+            self.assertSameEncoding(json_codec.dumps(resource), encoders.json_dumps(resource), json.loads)
+
+    @unittest.skipIf(msgpack_codec is None, "msgpack is not installed")
+    def test_msgpack(self):
+        resource = Listing(make_books(), 10, 0, 2)
+        self.assertSameEncoding(msgpack_codec.dumps(resource), encoders.msgpack_dumps(resource), msgpack.unpackb)
+
+    def test_registered_type(self):
+        resource = Listing([Book(1, "Odin", extra={'price': decimal.Decimal('1.5')})], 1)
+        json_codec.JSON_TYPES[decimal.Decimal] = str
+        try:
+            self.assertSameEncoding(json_codec.dumps(resource), encoders.dumps(json_codec, resource), json.loads)
+        finally:
+            del json_codec.JSON_TYPES[decimal.Decimal]
+
+    @unittest.skipIf(msgpack_codec is None, "msgpack is not installed")
+    def test_msgpack_registered_type(self):
+        resource = Book(1, "Odin", extra={'price': decimal.Decimal('1.5')})
+        msgpack_codec.TYPE_SERIALIZERS[decimal.Decimal] = str
+        try:
+            self.assertSameEncoding(msgpack_codec.dumps(resource), encoders.dumps(msgpack_codec, resource),
+                                    msgpack.unpackb)
+        finally:
+            del msgpack_codec.TYPE_SERIALIZERS[decimal.Decimal]
+
+    def test_encoded_list(self):
+        books = make_books()
+        resource = Listing(encoders.EncodedList(books, json_codec, [u'{"spliced": true}'] * 2), 10)
+
+        self.assertEqual([{'spliced': True}] * 2, json.loads(encoders.json_dumps(resource))['results'])
+        # Other codecs encode the values
+        self.assertEqual(json.loads(json_codec.dumps(Listing(books, 10))), json.loads(json_codec.dumps(resource)))
+
+    @unittest.skipIf(msgpack_codec is None, "msgpack is not installed")
+    def test_msgpack_encoded_list(self):
+        books = make_books()
+        content = [encoders.msgpack_dumps(book) for book in books]
+        resource = Listing(encoders.EncodedList(books, msgpack_codec, content), 10, 0, 2)
+
+        self.assertEqual(encoders.msgpack_dumps(Listing(books, 10, 0, 2)), encoders.msgpack_dumps(resource))
+        self.assertSameEncoding(json_codec.dumps(Listing(books, 10, 0, 2)), encoders.json_dumps(resource), json.loads)
+
+    def test_compiled_once(self):
+        self.assertIs(encoders.get_encoder(Book), encoders.get_encoder(Book))
+
+    def test_unsupported_codec(self):
+        class Codec(object):
+            @staticmethod
+            def dumps(resource):
+                return 'dumped'
+
+        self.assertEqual('dumped', encoders.dumps(Codec, make_books()))
@@ -0,0 +1,49 @@
+from __future__ import absolute_import
+import os
+import subprocess
+import sys
+import unittest
+
+PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def imported_modules(statement, modules):
+    """
+    Execute an import statement in a new interpreter and return which of the modules were imported.
+    """
+    code = "import sys; %s; print(','.join(m for m in %r if m in sys.modules))" % (statement, modules)
+    output = subprocess.check_output([sys.executable, '-c', code], cwd=PACKAGE_ROOT)
+    return [m for m in output.decode('utf8').strip().split(',') if m]
+
+
+class LazyImportTestCase(unittest.TestCase):
+    def test_resources_do_not_import_orm(self):
+        modules = imported_modules("import baldr.resources", ('baldr.models', 'baldr.api', 'django.db.models'))
+        self.assertEqual([], modules)
+
+    def test_api_does_not_import_optional_features(self):
+        modules = imported_modules(
+            "from django.conf import settings; settings.configure(); import baldr.api",
+            ('baldr.arrow_codec', 'pyarrow', 'baldr.coalescing', 'baldr.compression'))
+        self.assertEqual([], modules)
+
+    def test_registered_when_app_is_ready(self):
+        modules = imported_modules(
+            "from django.conf import settings; settings.configure(INSTALLED_APPS=['baldr']); "
+            "import django; django.setup()", ('baldr.models',))
+        self.assertEqual(['baldr.models'], modules)
+
+
+class CodecRegistryTestCase(unittest.TestCase):
+    def test_lazy_codecs(self):
+        from odin.codecs import json_codec
+        from baldr.api import CodecRegistry
+
+        target = CodecRegistry({}, {'application/x-lazy': 'odin.codecs.json_codec', 'application/x-missing': 'baldr.x'})
+
+        self.assertNotIn('application/x-lazy', target)
+        self.assertIs(json_codec, target['application/x-lazy'])
+        self.assertIn('application/x-lazy', target)
+        with self.assertRaises(KeyError):
+            target['application/x-missing']
+        self.assertEqual(['application/x-lazy'], list(target.load()))
@@ -0,0 +1,103 @@
+from __future__ import absolute_import
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from django.test.client import RequestFactory
+import odin
+from baldr import api2
+from baldr.metrics import MetricsRegistry, MetricsEndpoint
+
+
+class Widget(odin.Resource):
+    class Meta:
+        namespace = 'baldr.tests.metrics'
+    name = odin.StringField()
+
+
+class WidgetApi(api2.ResourceApi):
+    resource = Widget
+    api_name = 'widgets'
+
+    @api2.detail
+    def widget_detail(self, request, resource_id):
+        return Widget(name=resource_id)
+
+
+class MetricsRegistryTestCase(unittest.TestCase):
+    def test_observe(self):
+        target = MetricsRegistry(latency_buckets=(0.1, 1), size_buckets=(10,))
+        target.observe('widgets', 'resource', 'GET', 200, None, 0.05, 5)
+        target.observe('widgets', 'resource', 'GET', 404, 40400, 0.5, 50)
+        target.observe('widgets', 'resource', 'FOO', 405, 40500, 2, 50)
+
+        metrics = target.collect()
+        route = metrics[('widgets', 'resource', 'GET')]
+        self.assertEqual(2, route.requests)
+        self.assertEqual([1, 1, 0], route.latency.counts)
+        self.assertEqual([1, 1], route.response_size.counts)
+        self.assertEqual({(200, None): 1, (404, 40400): 1}, route.statuses)
+        self.assertIn(('widgets', 'resource', 'OTHER'), metrics)
+
+    def test_exposition(self):
+        target = MetricsRegistry(latency_buckets=(0.1, 1), size_buckets=(10,))
+        target.observe('widgets', 'resource', 'GET', 404, 40400, 0.5, 50)
+
+        actual = target.exposition()
+
+        self.assertIn('baldr_requests_total{api="widgets",route="resource",method="GET"} 1', actual)
+        self.assertIn('baldr_responses_total{api="widgets",route="resource",method="GET",status="404",'
+                      'sub_status="40400"} 1', actual)
+        self.assertIn('baldr_request_duration_seconds_bucket{api="widgets",route="resource",method="GET",'
+                      'le="0.1"} 0', actual)
+        self.assertIn('baldr_request_duration_seconds_bucket{api="widgets",route="resource",method="GET",'
+                      'le="+Inf"} 1', actual)
+
+    def test_multiprocess_merge(self):
+        multiprocess_dir = tempfile.mkdtemp()
+        try:
+            # Metrics written by another (exited) worker that had the same pid
+            with open(os.path.join(multiprocess_dir, 'baldr-metrics-%s-0.json' % os.getpid()), 'w') as f:
+                json.dump([[['widgets', 'resource', 'GET'], {
+                    'requests': 2, 'latency': [[2, 0, 0], 0.1], 'response_size': [[2, 0], 10],
+                    'statuses': [[200, None, 2]],
+                }]], f)
+
+            target = MetricsRegistry(latency_buckets=(0.1, 1), size_buckets=(10,), multiprocess_dir=multiprocess_dir)
+            target.observe('widgets', 'resource', 'GET', 200, None, 0.05, 5)
+
+            route = target.collect()[('widgets', 'resource', 'GET')]
+            self.assertEqual(3, route.requests)
+            self.assertEqual([3, 0, 0], route.latency.counts)
+            self.assertEqual({(200, None): 3}, route.statuses)
+        finally:
+            shutil.rmtree(multiprocess_dir)
+
+
+class WrapViewMetricsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.registry = MetricsRegistry()
+        self.api = WidgetApi()
+        self.api.metrics = self.registry
+        self.urls = self.api.urls
+        self.factory = RequestFactory()
+
+    def test_metrics_recorded(self):
+        view = self.api.wrap_view('resource')
+
+        view(self.factory.get('/widgets/1'), resource_id='1')
+        view(self.factory.post('/widgets/1'), resource_id='1')
+
+        metrics = self.registry.collect()
+        self.assertEqual({(200, None): 1}, metrics[('widgets', 'resource', 'GET')].statuses)
+        self.assertEqual({(405, 40500): 1}, metrics[('widgets', 'resource', 'POST')].statuses)
+
+    def test_endpoint(self):
+        self.api.wrap_view('resource')(self.factory.get('/widgets/1'), resource_id='1')
+        target = MetricsEndpoint(metrics_registry=self.registry)
+
+        response = target.view(self.factory.get('/metrics'))
+
+        self.assertEqual(200, response.status_code)
+        self.assertIn(b'baldr_requests_total{api="widgets",route="resource",method="GET"} 1', response.content)
@@ -0,0 +1,30 @@
+from __future__ import absolute_import
+import unittest
+from django.core.management import call_command
+from django.utils.six import StringIO
+import baldr
+from baldr import api, decoders, encoders
+from baldr.tests.test_api2_models import PartApi, PartResource
+
+
+class PreloadTestCase(unittest.TestCase):
+    def test_preload(self):
+        resource_api = PartApi()
+        self.assertIsNone(resource_api.route_table)
+        encoders._encoders.pop(PartResource, None)
+        decoders._decoders.pop(PartResource, None)
+
+        counts = baldr.preload(freeze=False)
+
+        self.assertIn(resource_api, api.resource_apis)
+        self.assertIn('collection-ingest', resource_api.route_table)
+        self.assertIn(PartResource, encoders._encoders)
+        self.assertIn(PartResource, decoders._decoders)
+        self.assertIn(PartResource, decoders._validators)
+        self.assertGreaterEqual(counts['resource_apis'], 1)
+        self.assertEqual(0, counts['frozen'])
+
+    def test_command(self):
+        out = StringIO()
+        call_command('baldr_preload', stdout=out)
+        self.assertIn("Preloaded", out.getvalue())
@@ -0,0 +1,71 @@
+from __future__ import absolute_import
+import os
+import shutil
+import tempfile
+import unittest
+from django.test.client import RequestFactory
+from baldr.profiling import RequestProfiler
+from .test_metrics import WidgetApi
+
+
+class RequestProfilerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.api = WidgetApi()
+        self.api.metrics = None
+        self.urls = self.api.urls
+        self.view = self.api.wrap_view('resource')
+
+    def test_not_triggered(self):
+        self.api.profiler = RequestProfiler()
+
+        response = self.view(self.factory.get('/widgets/1'), resource_id='1')
+
+        self.assertEqual('application/json', response['Content-Type'])
+        self.assertFalse(response.has_header('X-Baldr-Profile-Status'))
+
+    def test_invalid_token(self):
+        self.api.profiler = RequestProfiler()
+
+        response = self.view(self.factory.get('/widgets/1', {'_profile': 'profile:abc:123'}), resource_id='1')
+
+        self.assertFalse(response.has_header('X-Baldr-Profile-Status'))
+
+    def test_signed_header_returns_stats(self):
+        self.api.profiler = RequestProfiler(top=5)
+        request = self.factory.get('/widgets/1', HTTP_X_BALDR_PROFILE=RequestProfiler.make_token())
+
+        response = self.view(request, resource_id='1')
+
+        self.assertEqual('200', response['X-Baldr-Profile-Status'])
+        self.assertIn(b'function calls', response.content)
+
+    def test_allowed_users_callable(self):
+        self.api.profiler = RequestProfiler(allowed_users=lambda r: True)
+
+        response = self.view(self.factory.get('/widgets/1', {'_profile': '1'}), resource_id='1')
+
+        self.assertEqual('200', response['X-Baldr-Profile-Status'])
+
+    def test_sampled_request_written_to_output_dir(self):
+        output_dir = tempfile.mkdtemp()
+        try:
+            self.api.profiler = RequestProfiler(sample_rate=1, output_dir=output_dir)
+
+            response = self.view(self.factory.get('/widgets/1'), resource_id='1')
+
+            self.assertEqual('application/json', response['Content-Type'])
+            files = os.listdir(output_dir)
+            self.assertEqual(1, len(files))
+            self.assertTrue(files[0].startswith('widgets-resource-GET-'))
+        finally:
+            shutil.rmtree(output_dir)
+
+    def test_unwritable_output_dir(self):
+        output_dir = os.path.join(tempfile.gettempdir(), 'baldr-missing', 'profiles')
+        self.api.profiler = RequestProfiler(sample_rate=1, output_dir=output_dir)
+
+        response = self.view(self.factory.get('/widgets/1'), resource_id='1')
+
+        self.assertEqual(200, response.status_code)
+        self.assertFalse(response.has_header('X-Baldr-Profile'))
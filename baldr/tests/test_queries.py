@@ -0,0 +1,94 @@
+from __future__ import absolute_import
+import warnings
+from django import test
+from django.db import connection
+from django.test.client import RequestFactory
+import odin
+from baldr import api2
+from baldr.exceptions import QueryBudgetExceeded
+from baldr.queries import QueryBudget, QueryBudgetWarning, QueryCounter, sql_shape
+
+
+def execute_queries(count):
+    cursor = connection.cursor()
+    for idx in range(count):
+        cursor.execute("SELECT %s", [idx])
+
+
+class Gadget(odin.Resource):
+    class Meta:
+        namespace = 'baldr.tests.queries'
+    name = odin.StringField()
+
+
+class GadgetApi(api2.ResourceApi):
+    resource = Gadget
+    api_name = 'gadgets'
+    metrics = None
+    query_budget_action = 'raise'
+
+    @api2.listing(max_queries=2)
+    def gadget_list(self, request, offset, limit):
+        execute_queries(int(request.GET.get('queries', 1)))
+        return []
+
+    @api2.detail
+    def gadget_detail(self, request, resource_id):
+        execute_queries(10)
+        return Gadget(name=resource_id)
+
+
+class SqlShapeTestCase(test.SimpleTestCase):
+    def test_literals_removed(self):
+        self.assertEqual(
+            'SELECT "a" FROM "t" WHERE "t"."id" = ? AND "t"."name" = ? AND "t"."x" IN (...)',
+            sql_shape('SELECT "a" FROM "t" WHERE "t"."id" = 12 AND "t"."name" = \'it\'\'s\' AND "t"."x" IN (1, 2, 3)')
+        )
+
+    def test_placeholders_normalised(self):
+        self.assertEqual('SELECT "a" FROM "t" WHERE "t"."id" = ? AND "t"."x" IN (...)',
+                         sql_shape('SELECT "a" FROM "t" WHERE "t"."id" = %s AND "t"."x" IN (%s, %s)'))
+
+
+class QueryCounterTestCase(test.TestCase):
+    def test_count(self):
+        with QueryCounter() as target:
+            execute_queries(3)
+        self.assertEqual(3, target.count)
+        self.assertEqual(['SELECT %s'] * 3, target.queries)
+        self.assertEqual([('SELECT ?', 3)], target.repeated_queries(2))
+
+    def test_budget_warn(self):
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            with QueryBudget('test', max_queries=1, action='warn'):
+                execute_queries(2)
+        self.assertEqual(1, len(caught))
+        self.assertTrue(issubclass(caught[0].category, QueryBudgetWarning))
+
+    def test_n_plus_one_reported(self):
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            with QueryBudget('test', action='warn', n_plus_one_threshold=3):
+                execute_queries(3)
+        self.assertEqual(1, len(caught))
+        self.assertIn('N+1', str(caught[0].message))
+
+
+class RouteQueryBudgetTestCase(test.TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.api = GadgetApi()
+        self.urls = self.api.urls
+
+    def test_within_budget(self):
+        response = self.api.wrap_view('collection')(self.factory.get('/gadgets', {'queries': 2}))
+        self.assertEqual(200, response.status_code)
+
+    def test_budget_exceeded(self):
+        view = self.api.wrap_view('collection')
+        self.assertRaises(QueryBudgetExceeded, view, self.factory.get('/gadgets', {'queries': 3}))
+
+    def test_no_budget_on_route(self):
+        response = self.api.wrap_view('resource')(self.factory.get('/gadgets/1'), resource_id='1')
+        self.assertEqual(200, response.status_code)
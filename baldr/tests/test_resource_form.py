@@ -0,0 +1,71 @@
+from __future__ import absolute_import
+from django import test
+from baldr.queries import QueryCounter
+from baldr.resource_form import ResourceForm, ResourceFormSet
+from baldr.tests.test_api2_models import Part, PartResource
+
+
+class PartForm(ResourceForm):
+    class Meta:
+        resource = PartResource
+        fields = ('name', 'quantity')
+
+
+class PartFormSet(ResourceFormSet):
+    form = PartForm
+    can_delete = True
+
+
+class ResourceFormSetTestCase(test.TestCase):
+    def setUp(self):
+        Part.objects.bulk_create(Part(name='part %s' % idx, quantity=idx) for idx in range(3))
+        self.resources = PartResource.from_queryset(Part.objects.order_by('pk'))
+
+    def post_data(self, rows):
+        data = {
+            'form-TOTAL_FORMS': str(len(rows)),
+            'form-INITIAL_FORMS': str(len(self.resources)),
+            'form-MIN_NUM_FORMS': '0',
+            'form-MAX_NUM_FORMS': '1000',
+        }
+        for idx, row in enumerate(rows):
+            data.update(('form-%s-%s' % (idx, k), v) for k, v in row.items())
+        return data
+
+    def test_unbound(self):
+        formset = PartFormSet(resources=self.resources)
+
+        self.assertEqual(4, len(formset.forms))
+        self.assertEqual('part 1', formset.forms[1].initial['name'])
+        # Fields are shared between forms
+        self.assertIs(formset.forms[0].fields, formset.forms[1].fields)
+
+    def test_save_changed(self):
+        formset = PartFormSet(self.post_data([
+            {'name': 'part 0', 'quantity': '0'},
+            {'name': 'part 1', 'quantity': '10'},
+            {'name': 'part 2', 'quantity': '2', 'DELETE': 'on'},
+            {'name': 'new part', 'quantity': '5'},
+        ]), resources=self.resources)
+
+        self.assertTrue(formset.is_valid(), formset.errors)
+        with QueryCounter() as counter:
+            saved = formset.save()
+
+        statements = [sql.split(' ', 1)[0] for sql in counter.queries]
+        self.assertEqual(['INSERT', 'UPDATE', 'DELETE'], [s for s in statements if s in ('INSERT', 'UPDATE', 'DELETE')])
+        self.assertEqual(2, len(saved))
+        self.assertEqual([(self.resources[1].id, {'quantity'})],
+                         [(i.pk, changed) for i, changed in formset.changed_objects])
+        self.assertEqual([('new part', 5), ('part 0', 0), ('part 1', 10)],
+                         sorted(Part.objects.values_list('name', 'quantity')))
+
+    def test_invalid(self):
+        formset = PartFormSet(self.post_data([
+            {'name': 'part 0', 'quantity': 'many'},
+            {'name': 'part 1', 'quantity': '1'},
+            {'name': 'part 2', 'quantity': '2'},
+        ]), resources=self.resources)
+
+        self.assertFalse(formset.is_valid())
+        self.assertIn('quantity', formset.errors[0])
@@ -0,0 +1,95 @@
+from __future__ import absolute_import
+import json
+import odin
+import unittest
+from django.test.client import RequestFactory
+from odin.codecs import json_codec
+from baldr import api2, encoders
+from baldr.api2.route_decorators import take_within_budget
+
+
+class Gadget(odin.Resource):
+    class Meta:
+        namespace = 'baldr.tests.route_decorators'
+
+    name = odin.StringField()
+
+
+class SizedGadgetApi(api2.ResourceApi):
+    resource = Gadget
+    api_name = 'gadgets'
+    metrics = None
+
+    # Gadgets of increasing size; a total of 10
+    gadgets = [Gadget(name='g' * (idx * 100)) for idx in range(10)]
+
+    @api2.listing(max_bytes=1000)
+    def gadget_list(self, request, offset, limit):
+        return self.gadgets[offset:offset + limit], len(self.gadgets)
+
+    @api2.listing(name='all')
+    def all_gadgets(self, request, offset, limit):
+        return self.gadgets[offset:offset + limit], len(self.gadgets)
+
+
+class ListingMaxBytesTestCase(unittest.TestCase):
+    def setUp(self):
+        api = SizedGadgetApi()
+        api.build_route_table()
+        self.view = api.wrap_view('collection')
+        self.factory = RequestFactory()
+
+    def get_listing(self, offset):
+        response = self.view(self.factory.get('/gadgets/', {'offset': offset}))
+        self.assertEqual(200, response.status_code)
+        return response, json.loads(response.content.decode('utf8'))
+
+    def test_limited_by_size(self):
+        response, listing = self.get_listing(0)
+
+        self.assertLessEqual(len(response.content), 1200)
+        self.assertEqual(4, len(listing['results']))
+        self.assertEqual(4, listing['next_offset'])
+        self.assertEqual(10, listing['total_count'])
+        self.assertEqual('SizeLimitedListing', listing['$'])
+
+    def test_at_least_one_result(self):
+        response, listing = self.get_listing(8)
+
+        self.assertEqual(1, len(listing['results']))
+        self.assertEqual(9, listing['next_offset'])
+
+    def test_last_page(self):
+        response, listing = self.get_listing(9)
+
+        self.assertEqual(1, len(listing['results']))
+        self.assertIsNone(listing['next_offset'])
+
+    def test_not_limited(self):
+        api = SizedGadgetApi()
+        api.build_route_table()
+        response = api.wrap_view('collection-all')(self.factory.get('/gadgets/all'))
+        listing = json.loads(response.content.decode('utf8'))
+
+        self.assertEqual(10, len(listing['results']))
+        self.assertNotIn('next_offset', listing)
+
+
+class TakeWithinBudgetTestCase(unittest.TestCase):
+    def test_encoded_once(self):
+        results, truncated = take_within_budget(SizedGadgetApi.gadgets, 1000, json_codec)
+
+        self.assertTrue(truncated)
+        self.assertIsInstance(results, encoders.EncodedList)
+        self.assertEqual([encoders.json_dumps(r) for r in results], results.content)
+
+    def test_measured_with_codec(self):
+        class Codec(object):
+            @staticmethod
+            def dumps(resource):
+                return 'x' * 500
+
+        results, truncated = take_within_budget(SizedGadgetApi.gadgets[:3], 1000, Codec)
+
+        self.assertEqual(SizedGadgetApi.gadgets[:1], results)
+        self.assertTrue(truncated)
@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark suite for the Baldr request pipeline.
+
+Drives the ``api2`` resource API's through Django's ``RequestFactory`` against
+an in-memory SQLite database and reports throughput and latency percentiles as
+JSON so results can be compared between releases::
+
+    python benchmarks/__main__.py --output results.json
+
+"""
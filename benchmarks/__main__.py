@@ -0,0 +1,72 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Wrapper for executing the benchmark suite against a standalone Django environment.
+"""
+import json
+import os
+import sys
+from optparse import OptionParser
+import django
+from django.conf import settings
+
+
+def main():
+    """
+    The entry point for the script::
+
+        python benchmarks/__main__.py [--iterations N] [--output results.json]
+
+    A Django environment is bootstrapped using an in-memory SQLite database,
+    the suite is executed and results are written as JSON to stdout (or the
+    file supplied with ``--output``).
+    """
+    parser = OptionParser()
+    parser.add_option("--iterations", dest="iterations", type="int", default=200)
+    parser.add_option("--warmup", dest="warmup", type="int", default=20)
+    parser.add_option("--rows", dest="rows", type="int", default=500)
+    parser.add_option("--filter", dest="name_filter", default=None)
+    parser.add_option("--codec", dest="codecs", action="append", default=None)
+    parser.add_option("--output", dest="output", default=None)
+
+    options, _ = parser.parse_args()
+
+    # Ensure both baldr and the benchmarks package can be imported.
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    settings.configure(**{
+        "DEBUG": False,
+        "USE_TZ": True,
+        "DATABASES": {
+            'default': {
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': ':memory:',
+            }
+        },
+        "MIDDLEWARE_CLASSES": [],
+        "SECRET_KEY": "Benchmark Key",
+        "ROOT_URLCONF": "benchmarks.urls",
+        "INSTALLED_APPS": (
+            "django.contrib.contenttypes",
+            "baldr",
+            "benchmarks",
+        ),
+    })
+
+    # This is to ensure that Django 1.7's app registry is populated prior to running.
+    if hasattr(django, 'setup'):
+        django.setup()
+
+    from benchmarks import suite
+    results = suite.run(options.iterations, options.warmup, options.rows, options.name_filter, options.codecs)
+
+    if options.output:
+        with open(options.output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    else:
+        json.dump(results, sys.stdout, indent=2, sort_keys=True)
+        sys.stdout.write('\n')
+
+
+if __name__ == "__main__":
+    main()
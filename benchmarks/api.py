@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+from baldr.api2.models import ListMixin, CollectionMixin, CreateMixin, DetailMixin, PatchMixin
+from baldr.models import model_resource_factory
+from baldr.resource_cache import MappedResourceCache
+from .models import Book
+
+BookResource = model_resource_factory(Book, module=__name__)
+
+
+class BookApi(ListMixin, CreateMixin, DetailMixin, PatchMixin):
+    resource = BookResource
+    model = Book
+
+
+class BookCollectionApi(CollectionMixin):
+    resource = BookResource
+    model = Book
+    api_name = 'book-collection'
+
+
+class CachedBookApi(ListMixin):
+    resource = BookResource
+    model = Book
+    api_name = 'cached-books'
+    resource_cache = MappedResourceCache(max_entries=10000)
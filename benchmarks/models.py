@@ -0,0 +1,15 @@
+# -*- coding: utf-8 -*-
+from django.db import models
+
+
+class Book(models.Model):
+    title = models.CharField(max_length=200)
+    author = models.CharField(max_length=100)
+    summary = models.TextField(blank=True)
+    num_pages = models.IntegerField(default=0)
+    rrp = models.FloatField(default=0)
+    in_print = models.BooleanField(default=True)
+    published = models.DateTimeField()
+
+    class Meta:
+        app_label = 'benchmarks'
@@ -0,0 +1,326 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark scenarios and the runner used to time them.
+"""
+from __future__ import absolute_import, division
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import timeit
+import django
+from django.db import connection
+from django.test.client import RequestFactory
+from django.utils.timezone import utc
+import odin
+from odin.codecs import json_codec
+import baldr
+from baldr import decoders, encoders
+from baldr.api import CODECS, ApiCollection
+from baldr.models import model_resource_factory
+from baldr.resources import Listing
+from .api import BookApi, BookResource
+from .models import Book
+
+try:
+    from django.urls import resolve
+except ImportError:
+    from django.core.urlresolvers import resolve
+
+API_ROOT = '/api/v1/'
+PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LIST_PAGE_SIZES = (10, 100, 500)
+PERCENTILES = (50, 90, 99)
+
+
+def setup_database(rows):
+    """
+    Create the benchmark schema and populate it with ``rows`` books.
+    """
+    with connection.schema_editor() as editor:
+        editor.create_model(Book)
+
+    published = datetime.datetime(2016, 1, 1, tzinfo=utc)
+    Book.objects.bulk_create(
+        Book(title="Book %s" % idx, author="Author %s" % (idx % 50), summary="Summary of book %s. " % idx * 4,
+             num_pages=100 + idx, rrp=9.95 + idx, in_print=bool(idx % 2),
+             published=published + datetime.timedelta(days=idx))
+        for idx in range(rows)
+    )
+
+
+class Scenario(object):
+    """
+    A single benchmarked operation.
+
+    :param name: Name of the scenario.
+    :param operation: Callable that performs one iteration and returns an ``HttpResponse`` (or ``None``).
+    :param expected_status: Status code every response must return for the run to be valid.
+    :param codec: Content type used to encode the response (if applicable).
+
+    """
+    def __init__(self, name, operation, expected_status=None, codec=None):
+        self.name = name
+        self.operation = operation
+        self.expected_status = expected_status
+        self.codec = codec
+
+    def __call__(self):
+        response = self.operation()
+        if self.expected_status is not None and response.status_code != self.expected_status:
+            raise AssertionError("Scenario %s returned status %s; expected %s.\n%s" % (
+                self.name, response.status_code, self.expected_status, response.content[:500]))
+
+
+def request_scenarios(factory, content_type, rows):
+    """
+    Generate the request pipeline scenarios for a particular response codec.
+    """
+    # Request bodies are always JSON (the request content type is resolved before the accepts header).
+    headers = {'accepts': content_type, 'content-type': json_codec.CONTENT_TYPE}
+
+    def call(request):
+        match = resolve(request.path_info)
+        return match.func(request, *match.args, **match.kwargs)
+
+    def detail():
+        return call(factory.get(API_ROOT + 'books/%s' % (rows // 2), **headers))
+
+    def listing(limit, api_name='books'):
+        def inner():
+            return call(factory.get(API_ROOT + api_name, {'limit': limit}, **headers))
+        return inner
+
+    def collection():
+        return call(factory.get(API_ROOT + 'book-collection', **headers))
+
+    create_body = json.dumps({
+        'title': "New book", 'author': "An Author", 'summary': "A new book.", 'num_pages': 321,
+        'rrp': 19.95, 'in_print': True, 'published': '2016-06-01T00:00:00.000Z',
+    })
+
+    def create():
+        return call(factory.post(API_ROOT + 'books', create_body, json_codec.CONTENT_TYPE, **headers))
+
+    patch_body = json.dumps({'title': "Patched book", 'num_pages': 123})
+
+    def patch():
+        return call(factory.generic('PATCH', API_ROOT + 'books/%s' % (rows // 3), patch_body,
+                                    json_codec.CONTENT_TYPE, **headers))
+
+    yield Scenario('detail', detail, 200, content_type)
+    for limit in LIST_PAGE_SIZES:
+        yield Scenario('list-%s' % limit, listing(limit), 200, content_type)
+    yield Scenario('list-cached-%s' % LIST_PAGE_SIZES[-1], listing(LIST_PAGE_SIZES[-1], 'cached-books'), 200,
+                   content_type)
+    yield Scenario('collection', collection, 200, content_type)
+    yield Scenario('create', create, 201, content_type)
+    yield Scenario('patch', patch, 200, content_type)
+
+
+def startup_scenarios():
+    """
+    Generate scenarios that measure start up costs.
+    """
+    class Response(object):
+        status_code = None
+
+    def resource_factory():
+        model_resource_factory(Book, module=__name__, resource_type_name='BenchmarkBook')
+        return Response
+
+    yield Scenario('model_resource_factory', resource_factory)
+
+    def import_module(name):
+        # Start up time of a new process (eg a management command or worker) that imports a module.
+        def inner():
+            subprocess.check_call([sys.executable, '-c', 'import %s' % name], cwd=PACKAGE_ROOT)
+            return Response
+        return inner
+
+    yield Scenario('import_resources', import_module('baldr.resources'))
+    yield Scenario('import_api', import_module('baldr.api'))
+
+
+def routing_scenarios(api_count=150):
+    """
+    Generate scenarios that compare URL regex resolution with the compiled dispatcher.
+
+    Paths for the last API registered are resolved as these are the worst case for regex resolution.
+    """
+    class Response(object):
+        status_code = None
+
+    apis = [BookApi(api_name='books%s' % idx) for idx in range(api_count)]
+    paths = ['books%s/' % (api_count - 1), 'books%s/42/' % (api_count - 1)]
+
+    urlconf = type('RoutingUrls', (object,), {'urlpatterns': ApiCollection(*apis).urls})
+
+    def regex():
+        for path in paths:
+            resolve('/' + path, urlconf)
+        return Response
+
+    dispatcher = ApiCollection(*apis, compiled=True).dispatcher
+
+    def compiled():
+        for path in paths:
+            dispatcher.resolve(path)
+        return Response
+
+    yield Scenario('routing-regex-%s' % api_count, regex)
+    yield Scenario('routing-compiled-%s' % api_count, compiled)
+
+
+def encoding_scenarios(size=500):
+    """
+    Generate scenarios that compare the Odin codecs with compiled encoders encoding a listing.
+    """
+    class Response(object):
+        status_code = None
+
+    resources = BookApi().to_resource_mapping.apply(Book.objects.all()[:size])
+    listing = Listing(list(resources), size, 0, size)
+
+    def codec_dumps(codec):
+        def inner():
+            codec.dumps(listing)
+            return Response
+        return inner
+
+    def compiled_dumps(codec):
+        def inner():
+            encoders.dumps(codec, listing)
+            return Response
+        return inner
+
+    for codec in encoders.COMPILED_DUMPS:
+        yield Scenario('encode-odin-%s' % size, codec_dumps(codec), codec=codec.CONTENT_TYPE)
+        yield Scenario('encode-compiled-%s' % size, compiled_dumps(codec), codec=codec.CONTENT_TYPE)
+
+
+def decoding_scenarios(size=500):
+    """
+    Generate scenarios that compare the Odin codecs with compiled decoders decoding (and validating)
+    a list of resources.
+    """
+    class Response(object):
+        status_code = None
+
+    resources = list(BookApi().to_resource_mapping.apply(Book.objects.all()[:size]))
+
+    def codec_loads(codec, body):
+        def inner():
+            codec.loads(body, BookResource)
+            return Response
+        return inner
+
+    def compiled_loads(codec, body):
+        def inner():
+            decoders.loads(codec, body, BookResource)
+            return Response
+        return inner
+
+    for codec in decoders.COMPILED_LOADS:
+        body = codec.dumps(resources)
+        yield Scenario('decode-odin-%s' % size, codec_loads(codec, body), codec=codec.CONTENT_TYPE)
+        yield Scenario('decode-compiled-%s' % size, compiled_loads(codec, body), codec=codec.CONTENT_TYPE)
+
+
+def percentile(samples, pct):
+    """
+    Nearest-rank percentile of a sorted list of samples.
+    """
+    idx = max(int(round(pct / 100 * len(samples))) - 1, 0)
+    return samples[min(idx, len(samples) - 1)]
+
+
+def time_scenario(scenario, iterations, warmup):
+    """
+    Time a scenario and summarise the results.
+    """
+    timer = timeit.default_timer
+    for _ in range(warmup):
+        scenario()
+
+    samples = []
+    started = timer()
+    for _ in range(iterations):
+        start = timer()
+        scenario()
+        samples.append(timer() - start)
+    elapsed = timer() - started
+
+    samples.sort()
+    latency = {
+        'min': samples[0],
+        'mean': sum(samples) / len(samples),
+        'max': samples[-1],
+    }
+    latency.update(('p%s' % pct, percentile(samples, pct)) for pct in PERCENTILES)
+
+    return {
+        'name': scenario.name,
+        'codec': scenario.codec,
+        'iterations': iterations,
+        'throughput': iterations / elapsed if elapsed else None,
+        'latency_ms': {key: round(value * 1000, 4) for key, value in latency.items()},
+    }
+
+
+def environment():
+    """
+    Details of the environment the benchmarks were executed in.
+    """
+    return {
+        'baldr': baldr.__version__,
+        'django': django.get_version(),
+        'odin': getattr(odin, '__version__', None),
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'timestamp': datetime.datetime.utcnow().isoformat() + 'Z',
+    }
+
+
+def run(iterations=200, warmup=20, rows=500, name_filter=None, codecs=None, stream=sys.stderr):
+    """
+    Execute the benchmark suite.
+
+    :param iterations: Number of timed iterations for each scenario.
+    :param warmup: Number of un-timed iterations to run before timing.
+    :param rows: Number of rows to populate the database with.
+    :param name_filter: Only run scenarios whose name contains this string.
+    :param codecs: Content types to benchmark; default is every registered codec.
+    :param stream: Stream that progress is reported to.
+    :returns: Results as a JSON serialisable ``dict``.
+
+    """
+    setup_database(rows)
+    factory = RequestFactory()
+
+    scenarios = list(startup_scenarios())
+    scenarios.extend(routing_scenarios())
+    scenarios.extend(encoding_scenarios(min(rows, 500)))
+    scenarios.extend(decoding_scenarios(min(rows, 500)))
+    for content_type in (codecs or sorted(CODECS.load())):
+        scenarios.extend(request_scenarios(factory, content_type, rows))
+
+    results = []
+    for scenario in scenarios:
+        if name_filter and name_filter not in scenario.name:
+            continue
+        result = time_scenario(scenario, iterations, warmup)
+        if stream:
+            stream.write("%-24s %-24s %10.1f/s  p50 %8.3fms  p99 %8.3fms\n" % (
+                result['name'], result['codec'] or '-', result['throughput'] or 0,
+                result['latency_ms']['p50'], result['latency_ms']['p99']))
+        results.append(result)
+
+    return {
+        'environment': environment(),
+        'config': {'iterations': iterations, 'warmup': warmup, 'rows': rows},
+        'results': results,
+    }
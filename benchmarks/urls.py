@@ -0,0 +1,12 @@
+# -*- coding: utf-8 -*-
+from baldr.api import Api, ApiVersion
+from .api import BookApi, BookCollectionApi, CachedBookApi
+
+urlpatterns = Api(
+    ApiVersion(
+        BookApi(),
+        BookCollectionApi(),
+        CachedBookApi(),
+        version='v1',
+    )
+).patterns()